@@ -0,0 +1,9 @@
+-- 008_qse_backup_watermark_index.sql
+-- Keyset index for incremental QSE backups (recycle/scripts/backup_qse_docs.py --incremental)
+-- Created: 2026-10-16
+-- Reason: Delta backups select rows past a (updated_at, asset_uid, version) high-water mark;
+--         without an index every nightly run scans all assets to find a handful of changes
+
+CREATE INDEX IF NOT EXISTS idx_assets_qse_watermark
+  ON public.assets ((COALESCE(updated_at, created_at)), asset_uid, version)
+  WHERE metadata->>'category' = 'qse';
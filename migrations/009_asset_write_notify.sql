@@ -0,0 +1,45 @@
+-- 009_asset_write_notify.sql
+-- NOTIFY on asset writes so verification scripts can wait on events instead of polling
+-- Created: 2026-10-16
+-- Reason: recycle/scripts verifiers re-ran their lookup every 0.5s for up to 30s; they now
+--         LISTEN on asset_written and re-query only when a write lands for a matching project_id.
+--         Statement-level over the transition table, so a COPY-staged bulk load sends one
+--         notification per (project_id, type) instead of one per row.
+
+CREATE OR REPLACE FUNCTION public.notify_assets_written()
+RETURNS trigger AS $fn$
+BEGIN
+  -- Delivered on commit; identical payloads within one transaction are collapsed by Postgres
+  PERFORM pg_notify(
+    'asset_written',
+    json_build_object('project_id', w.project_id, 'type', w.type)::text
+  )
+  FROM (SELECT DISTINCT project_id, type FROM new_assets) w;
+  RETURN NULL;
+END;
+$fn$ LANGUAGE plpgsql;
+
+-- Transition tables allow only one event per trigger
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_trigger WHERE tgname='trg_assets_notify_written_ins'
+  ) THEN
+    CREATE TRIGGER trg_assets_notify_written_ins
+    AFTER INSERT ON public.assets
+    REFERENCING NEW TABLE AS new_assets
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notify_assets_written();
+  END IF;
+END$$;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_trigger WHERE tgname='trg_assets_notify_written_upd'
+  ) THEN
+    CREATE TRIGGER trg_assets_notify_written_upd
+    AFTER UPDATE ON public.assets
+    REFERENCING NEW TABLE AS new_assets
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notify_assets_written();
+  END IF;
+END$$;
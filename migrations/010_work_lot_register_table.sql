@@ -0,0 +1,225 @@
+-- 010_work_lot_register_table.sql
+-- Materialized work_lot_register maintained incrementally from assets/asset_edges
+-- Created: 2026-10-16
+-- Reason: The work_lot_register view (001, dropped in 007) joined asset_edges with an OR on
+--         from/to, which bypassed idx_edges_type_from/idx_edges_type_to, and re-aggregated every
+--         test_result on each read. The register is now a table keyed by lot; writes queue the
+--         lots they affect and a statement-level trigger recomputes only those rows, so the
+--         register page is a plain lookup by project_id.
+
+CREATE TABLE IF NOT EXISTS public.work_lot_register (
+  lot_asset_id uuid PRIMARY KEY,
+  project_id uuid,
+  organization_id uuid NOT NULL,
+  asset_uid uuid NOT NULL,
+  version int NOT NULL,
+  lot_name text NOT NULL,
+  lot_number text,
+  lot_status text,
+  approval_state text,
+  itp_document_asset_id text,
+  inspection_points jsonb NOT NULL DEFAULT '[]'::jsonb,
+  test_results jsonb NOT NULL DEFAULT '[]'::jsonb,
+  refreshed_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS idx_work_lot_register_project ON public.work_lot_register(project_id);
+
+-- Lots touched by the current transaction, drained at the end of each statement.
+-- No unique key on purpose: concurrent writers never wait on each other's queue rows.
+CREATE UNLOGGED TABLE IF NOT EXISTS public.work_lot_register_queue (
+  txid bigint NOT NULL DEFAULT txid_current(),
+  lot_asset_id uuid NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_work_lot_register_queue_txid ON public.work_lot_register_queue(txid);
+
+-- Recompute the register rows for the given lot ids (ids that are not current lots are removed)
+CREATE OR REPLACE FUNCTION public.refresh_work_lot_register(p_lot_ids uuid[]) RETURNS void AS $fn$
+DECLARE
+  v_lot uuid;
+BEGIN
+  -- Serialise refreshes of the same lot; the queries below then see the other writer's commit
+  FOR v_lot IN SELECT DISTINCT u FROM unnest(p_lot_ids) AS u ORDER BY u LOOP
+    PERFORM pg_advisory_xact_lock(hashtextextended('work_lot_register:' || v_lot::text, 0));
+  END LOOP;
+
+  DELETE FROM public.work_lot_register r
+  WHERE r.lot_asset_id = ANY(p_lot_ids)
+    AND NOT EXISTS (
+      SELECT 1 FROM public.assets l
+      WHERE l.id = r.lot_asset_id AND l.type='lot' AND l.is_current AND NOT l.is_deleted
+    );
+
+  INSERT INTO public.work_lot_register (
+    lot_asset_id, project_id, organization_id, asset_uid, version, lot_name, lot_number,
+    lot_status, approval_state, itp_document_asset_id, inspection_points, test_results, refreshed_at
+  )
+  SELECT l.id,
+         l.project_id,
+         l.organization_id,
+         l.asset_uid,
+         l.version,
+         l.name,
+         l.content->>'lot_number',
+         l.content->>'status',
+         l.approval_state,
+         l.content->>'itp_document_asset_id',
+         COALESCE(hp_wp.inspection_points, '[]'::jsonb),
+         COALESCE(trs.test_results, '[]'::jsonb),
+         now()
+  FROM public.assets l
+  LEFT JOIN LATERAL (
+    SELECT jsonb_agg(DISTINCT jsonb_build_object(
+             'inspection_point_id', ip.id,
+             'code', ip.content->>'code',
+             'title', ip.content->>'title',
+             'point_type', ip.content->>'point_type',
+             'sla_due_at', ip.content->>'sla_due_at',
+             'notified_at', ip.content->>'notified_at',
+             'released_at', ip.content->>'released_at',
+             'approval_state', ip.approval_state
+           )) AS inspection_points
+    FROM (
+      -- One index probe per direction instead of an OR across from/to
+      SELECT e.to_asset_id AS ip_id FROM public.asset_edges e
+      WHERE e.edge_type IN ('BLOCKED_BY','REFERENCES') AND e.from_asset_id = l.id
+      UNION
+      SELECT e.from_asset_id FROM public.asset_edges e
+      WHERE e.edge_type IN ('BLOCKED_BY','REFERENCES') AND e.to_asset_id = l.id
+    ) linked
+    JOIN public.assets ip ON ip.id = linked.ip_id
+    WHERE ip.type='inspection_point' AND ip.is_current AND NOT ip.is_deleted
+  ) hp_wp ON true
+  LEFT JOIN LATERAL (
+    SELECT jsonb_agg(tr.content) AS test_results
+    FROM public.assets tr
+    WHERE tr.type='test_result' AND tr.is_current AND NOT tr.is_deleted
+      AND tr.content->>'lot_asset_id' = l.id::text
+  ) trs ON true
+  WHERE l.id = ANY(p_lot_ids) AND l.type='lot' AND l.is_current AND NOT l.is_deleted
+  ON CONFLICT (lot_asset_id) DO UPDATE SET
+    project_id = EXCLUDED.project_id,
+    organization_id = EXCLUDED.organization_id,
+    asset_uid = EXCLUDED.asset_uid,
+    version = EXCLUDED.version,
+    lot_name = EXCLUDED.lot_name,
+    lot_number = EXCLUDED.lot_number,
+    lot_status = EXCLUDED.lot_status,
+    approval_state = EXCLUDED.approval_state,
+    itp_document_asset_id = EXCLUDED.itp_document_asset_id,
+    inspection_points = EXCLUDED.inspection_points,
+    test_results = EXCLUDED.test_results,
+    refreshed_at = EXCLUDED.refreshed_at;
+END;
+$fn$ LANGUAGE plpgsql;
+
+-- Queue the lots an asset row feeds into: the lot itself, a test_result's lot, or lots linked to an inspection point
+CREATE OR REPLACE FUNCTION public.queue_work_lots_for_asset(p_id uuid, p_type text, p_content jsonb) RETURNS void AS $fn$
+BEGIN
+  IF p_type = 'lot' THEN
+    INSERT INTO public.work_lot_register_queue (lot_asset_id) VALUES (p_id);
+  ELSIF p_type = 'test_result' THEN
+    IF p_content->>'lot_asset_id' ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$' THEN
+      INSERT INTO public.work_lot_register_queue (lot_asset_id) VALUES ((p_content->>'lot_asset_id')::uuid);
+    END IF;
+  ELSIF p_type = 'inspection_point' THEN
+    INSERT INTO public.work_lot_register_queue (lot_asset_id)
+    SELECT e.from_asset_id FROM public.asset_edges e
+    WHERE e.edge_type IN ('BLOCKED_BY','REFERENCES') AND e.to_asset_id = p_id
+    UNION
+    SELECT e.to_asset_id FROM public.asset_edges e
+    WHERE e.edge_type IN ('BLOCKED_BY','REFERENCES') AND e.from_asset_id = p_id;
+  END IF;
+END;
+$fn$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.queue_work_lot_register_from_asset() RETURNS trigger AS $fn$
+BEGIN
+  IF TG_OP IN ('UPDATE','DELETE') AND OLD.type IN ('lot','test_result','inspection_point') THEN
+    PERFORM public.queue_work_lots_for_asset(OLD.id, OLD.type, OLD.content);
+  END IF;
+  IF TG_OP IN ('INSERT','UPDATE') AND NEW.type IN ('lot','test_result','inspection_point') THEN
+    PERFORM public.queue_work_lots_for_asset(NEW.id, NEW.type, NEW.content);
+  END IF;
+  RETURN NULL;
+END;
+$fn$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.queue_work_lot_register_from_edge() RETURNS trigger AS $fn$
+BEGIN
+  -- Both endpoints are queued; refresh ignores ids that are not lots
+  IF TG_OP IN ('UPDATE','DELETE') AND OLD.edge_type IN ('BLOCKED_BY','REFERENCES') THEN
+    INSERT INTO public.work_lot_register_queue (lot_asset_id) VALUES (OLD.from_asset_id), (OLD.to_asset_id);
+  END IF;
+  IF TG_OP IN ('INSERT','UPDATE') AND NEW.edge_type IN ('BLOCKED_BY','REFERENCES') THEN
+    INSERT INTO public.work_lot_register_queue (lot_asset_id) VALUES (NEW.from_asset_id), (NEW.to_asset_id);
+  END IF;
+  RETURN NULL;
+END;
+$fn$ LANGUAGE plpgsql;
+
+-- Runs once per statement, after the row triggers above, so a bulk load refreshes each lot once
+CREATE OR REPLACE FUNCTION public.drain_work_lot_register_queue() RETURNS trigger AS $fn$
+DECLARE
+  v_ids uuid[];
+BEGIN
+  WITH drained AS (
+    DELETE FROM public.work_lot_register_queue
+    WHERE txid = txid_current()
+    RETURNING lot_asset_id
+  )
+  SELECT array_agg(DISTINCT lot_asset_id) INTO v_ids FROM drained;
+  IF v_ids IS NOT NULL THEN
+    PERFORM public.refresh_work_lot_register(v_ids);
+  END IF;
+  RETURN NULL;
+END;
+$fn$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_trigger WHERE tgname='trg_assets_queue_work_lot_register'
+  ) THEN
+    CREATE TRIGGER trg_assets_queue_work_lot_register
+    AFTER INSERT OR UPDATE OR DELETE ON public.assets
+    FOR EACH ROW EXECUTE FUNCTION public.queue_work_lot_register_from_asset();
+  END IF;
+END$$;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_trigger WHERE tgname='trg_assets_refresh_work_lot_register'
+  ) THEN
+    CREATE TRIGGER trg_assets_refresh_work_lot_register
+    AFTER INSERT OR UPDATE OR DELETE ON public.assets
+    FOR EACH STATEMENT EXECUTE FUNCTION public.drain_work_lot_register_queue();
+  END IF;
+END$$;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_trigger WHERE tgname='trg_asset_edges_queue_work_lot_register'
+  ) THEN
+    CREATE TRIGGER trg_asset_edges_queue_work_lot_register
+    AFTER INSERT OR UPDATE OR DELETE ON public.asset_edges
+    FOR EACH ROW EXECUTE FUNCTION public.queue_work_lot_register_from_edge();
+  END IF;
+END$$;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_trigger WHERE tgname='trg_asset_edges_refresh_work_lot_register'
+  ) THEN
+    CREATE TRIGGER trg_asset_edges_refresh_work_lot_register
+    AFTER INSERT OR UPDATE OR DELETE ON public.asset_edges
+    FOR EACH STATEMENT EXECUTE FUNCTION public.drain_work_lot_register_queue();
+  END IF;
+END$$;
+
+-- Backfill
+SELECT public.refresh_work_lot_register(
+  ARRAY(SELECT id FROM public.assets WHERE type='lot' AND is_current AND NOT is_deleted)
+);
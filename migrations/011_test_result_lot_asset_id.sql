@@ -0,0 +1,162 @@
+-- 011_test_result_lot_asset_id.sql
+-- Promote test_result content->>'lot_asset_id' to a typed, trigger-maintained, indexed column
+-- Created: 2026-10-16
+-- Reason: Lot register queries grouped test results on (content->>'lot_asset_id')::uuid, which no
+--         index covers, so every refresh scanned and parsed all test results. The column is kept
+--         in sync like the compute_asset_timestamps columns and has a partial index on test_result.
+
+ALTER TABLE public.assets ADD COLUMN IF NOT EXISTS lot_asset_id uuid;
+
+-- NULL instead of an error for malformed ids, so a bad payload can't block the write
+CREATE OR REPLACE FUNCTION public.try_uuid(p_value text) RETURNS uuid AS $fn$
+  SELECT CASE
+    WHEN p_value ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$' THEN p_value::uuid
+  END;
+$fn$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION public.compute_asset_lot_asset_id() RETURNS trigger AS $fn$
+BEGIN
+  NEW.lot_asset_id := CASE
+    WHEN NEW.type = 'test_result' THEN public.try_uuid(NEW.content->>'lot_asset_id')
+  END;
+  RETURN NEW;
+END;
+$fn$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_trigger WHERE tgname='trg_assets_compute_lot_asset_id'
+  ) THEN
+    -- Also fires for rows that still carry a lot_asset_id, so a type change clears it
+    CREATE TRIGGER trg_assets_compute_lot_asset_id
+    BEFORE INSERT OR UPDATE ON public.assets
+    FOR EACH ROW
+    WHEN (NEW.type = 'test_result' OR NEW.lot_asset_id IS NOT NULL)
+    EXECUTE FUNCTION public.compute_asset_lot_asset_id();
+  END IF;
+END$$;
+
+-- Register maintenance (010) now keys test results on the typed column
+DROP FUNCTION IF EXISTS public.queue_work_lots_for_asset(uuid, text, jsonb);
+
+CREATE OR REPLACE FUNCTION public.queue_work_lots_for_asset(p_id uuid, p_type text, p_lot_asset_id uuid) RETURNS void AS $fn$
+BEGIN
+  IF p_type = 'lot' THEN
+    INSERT INTO public.work_lot_register_queue (lot_asset_id) VALUES (p_id);
+  ELSIF p_type = 'test_result' THEN
+    IF p_lot_asset_id IS NOT NULL THEN
+      INSERT INTO public.work_lot_register_queue (lot_asset_id) VALUES (p_lot_asset_id);
+    END IF;
+  ELSIF p_type = 'inspection_point' THEN
+    INSERT INTO public.work_lot_register_queue (lot_asset_id)
+    SELECT e.from_asset_id FROM public.asset_edges e
+    WHERE e.edge_type IN ('BLOCKED_BY','REFERENCES') AND e.to_asset_id = p_id
+    UNION
+    SELECT e.to_asset_id FROM public.asset_edges e
+    WHERE e.edge_type IN ('BLOCKED_BY','REFERENCES') AND e.from_asset_id = p_id;
+  END IF;
+END;
+$fn$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.queue_work_lot_register_from_asset() RETURNS trigger AS $fn$
+BEGIN
+  IF TG_OP IN ('UPDATE','DELETE') AND OLD.type IN ('lot','test_result','inspection_point') THEN
+    PERFORM public.queue_work_lots_for_asset(OLD.id, OLD.type, OLD.lot_asset_id);
+  END IF;
+  IF TG_OP IN ('INSERT','UPDATE') AND NEW.type IN ('lot','test_result','inspection_point') THEN
+    PERFORM public.queue_work_lots_for_asset(NEW.id, NEW.type, NEW.lot_asset_id);
+  END IF;
+  RETURN NULL;
+END;
+$fn$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.refresh_work_lot_register(p_lot_ids uuid[]) RETURNS void AS $fn$
+DECLARE
+  v_lot uuid;
+BEGIN
+  -- Serialise refreshes of the same lot; the queries below then see the other writer's commit
+  FOR v_lot IN SELECT DISTINCT u FROM unnest(p_lot_ids) AS u ORDER BY u LOOP
+    PERFORM pg_advisory_xact_lock(hashtextextended('work_lot_register:' || v_lot::text, 0));
+  END LOOP;
+
+  DELETE FROM public.work_lot_register r
+  WHERE r.lot_asset_id = ANY(p_lot_ids)
+    AND NOT EXISTS (
+      SELECT 1 FROM public.assets l
+      WHERE l.id = r.lot_asset_id AND l.type='lot' AND l.is_current AND NOT l.is_deleted
+    );
+
+  INSERT INTO public.work_lot_register (
+    lot_asset_id, project_id, organization_id, asset_uid, version, lot_name, lot_number,
+    lot_status, approval_state, itp_document_asset_id, inspection_points, test_results, refreshed_at
+  )
+  SELECT l.id,
+         l.project_id,
+         l.organization_id,
+         l.asset_uid,
+         l.version,
+         l.name,
+         l.content->>'lot_number',
+         l.content->>'status',
+         l.approval_state,
+         l.content->>'itp_document_asset_id',
+         COALESCE(hp_wp.inspection_points, '[]'::jsonb),
+         COALESCE(trs.test_results, '[]'::jsonb),
+         now()
+  FROM public.assets l
+  LEFT JOIN LATERAL (
+    SELECT jsonb_agg(DISTINCT jsonb_build_object(
+             'inspection_point_id', ip.id,
+             'code', ip.content->>'code',
+             'title', ip.content->>'title',
+             'point_type', ip.content->>'point_type',
+             'sla_due_at', ip.content->>'sla_due_at',
+             'notified_at', ip.content->>'notified_at',
+             'released_at', ip.content->>'released_at',
+             'approval_state', ip.approval_state
+           )) AS inspection_points
+    FROM (
+      -- One index probe per direction instead of an OR across from/to
+      SELECT e.to_asset_id AS ip_id FROM public.asset_edges e
+      WHERE e.edge_type IN ('BLOCKED_BY','REFERENCES') AND e.from_asset_id = l.id
+      UNION
+      SELECT e.from_asset_id FROM public.asset_edges e
+      WHERE e.edge_type IN ('BLOCKED_BY','REFERENCES') AND e.to_asset_id = l.id
+    ) linked
+    JOIN public.assets ip ON ip.id = linked.ip_id
+    WHERE ip.type='inspection_point' AND ip.is_current AND NOT ip.is_deleted
+  ) hp_wp ON true
+  LEFT JOIN LATERAL (
+    -- idx_assets_test_result_lot
+    SELECT jsonb_agg(tr.content) AS test_results
+    FROM public.assets tr
+    WHERE tr.type='test_result' AND tr.is_current AND NOT tr.is_deleted
+      AND tr.lot_asset_id = l.id
+  ) trs ON true
+  WHERE l.id = ANY(p_lot_ids) AND l.type='lot' AND l.is_current AND NOT l.is_deleted
+  ON CONFLICT (lot_asset_id) DO UPDATE SET
+    project_id = EXCLUDED.project_id,
+    organization_id = EXCLUDED.organization_id,
+    asset_uid = EXCLUDED.asset_uid,
+    version = EXCLUDED.version,
+    lot_name = EXCLUDED.lot_name,
+    lot_number = EXCLUDED.lot_number,
+    lot_status = EXCLUDED.lot_status,
+    approval_state = EXCLUDED.approval_state,
+    itp_document_asset_id = EXCLUDED.itp_document_asset_id,
+    inspection_points = EXCLUDED.inspection_points,
+    test_results = EXCLUDED.test_results,
+    refreshed_at = EXCLUDED.refreshed_at;
+END;
+$fn$ LANGUAGE plpgsql;
+
+CREATE INDEX IF NOT EXISTS idx_assets_test_result_lot
+  ON public.assets(lot_asset_id)
+  WHERE type = 'test_result' AND is_current AND NOT is_deleted;
+
+-- Backfill; the register triggers refresh the lots these test results belong to
+UPDATE public.assets
+SET lot_asset_id = public.try_uuid(content->>'lot_asset_id')
+WHERE type = 'test_result'
+  AND lot_asset_id IS DISTINCT FROM public.try_uuid(content->>'lot_asset_id');
@@ -0,0 +1,201 @@
+-- 012_asset_closure.sql
+-- Transitive closure of PARENT_OF edges, maintained on edge insert/update/delete
+-- Created: 2026-10-16
+-- Reason: prevent_parent_cycle() only rejected direct 2-cycles, so deeper WBS/LBS cycles got
+--         through, and subtree reads needed a recursive CTE. With asset_closure a cycle check is
+--         one primary-key probe and "all descendants of X" is one indexed range scan.
+
+CREATE TABLE IF NOT EXISTS public.asset_closure (
+  ancestor uuid NOT NULL REFERENCES public.assets(id) ON DELETE CASCADE,
+  descendant uuid NOT NULL REFERENCES public.assets(id) ON DELETE CASCADE,
+  depth int NOT NULL,  -- shortest PARENT_OF path length
+  PRIMARY KEY (ancestor, descendant)
+);
+CREATE INDEX IF NOT EXISTS idx_asset_closure_descendant ON public.asset_closure(descendant, ancestor);
+
+-- Closure rows plus direct edges; used to re-derive paths after a delete
+CREATE OR REPLACE VIEW public.asset_parent_reach AS
+SELECT ancestor, descendant, depth FROM public.asset_closure
+UNION ALL
+SELECT from_asset_id, to_asset_id, 1 FROM public.asset_edges WHERE edge_type='PARENT_OF';
+
+-- Serialise closure maintenance across transactions. Two writers adding A->B and B->C at the
+-- same time would otherwise each miss the other's uncommitted rows and never write (A,C); once
+-- the lock is held, the statements below see every closure change committed before it.
+CREATE OR REPLACE FUNCTION public.lock_asset_closure() RETURNS void AS $fn$
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtextextended('asset_closure', 0));
+END;
+$fn$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.asset_closure_add_edge(p_parent uuid, p_child uuid) RETURNS void AS $fn$
+BEGIN
+  IF p_parent = p_child THEN
+    RAISE EXCEPTION 'PARENT_OF cannot be reflexive';
+  END IF;
+  PERFORM public.lock_asset_closure();
+  IF EXISTS (SELECT 1 FROM public.asset_closure WHERE ancestor = p_child AND descendant = p_parent) THEN
+    RAISE EXCEPTION 'Cycle detected in PARENT_OF';
+  END IF;
+
+  -- Every ancestor of the parent (and the parent) now reaches every descendant of the child (and the child)
+  INSERT INTO public.asset_closure (ancestor, descendant, depth)
+  SELECT a.id, d.id, a.depth + 1 + d.depth
+  FROM (
+    SELECT ancestor AS id, depth FROM public.asset_closure WHERE descendant = p_parent
+    UNION ALL
+    SELECT p_parent, 0
+  ) a
+  CROSS JOIN (
+    SELECT descendant AS id, depth FROM public.asset_closure WHERE ancestor = p_child
+    UNION ALL
+    SELECT p_child, 0
+  ) d
+  ON CONFLICT (ancestor, descendant) DO UPDATE SET depth = LEAST(public.asset_closure.depth, EXCLUDED.depth);
+END;
+$fn$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.asset_closure_remove_edge(p_parent uuid, p_child uuid) RETURNS void AS $fn$
+DECLARE
+  v_anc uuid[];
+  v_des uuid[];
+BEGIN
+  PERFORM public.lock_asset_closure();
+
+  -- A duplicate PARENT_OF edge between the same pair keeps every path
+  IF EXISTS (
+    SELECT 1 FROM public.asset_edges
+    WHERE edge_type='PARENT_OF' AND from_asset_id = p_parent AND to_asset_id = p_child
+  ) THEN
+    RETURN;
+  END IF;
+
+  v_anc := ARRAY(SELECT ancestor FROM public.asset_closure WHERE descendant = p_parent) || p_parent;
+  v_des := ARRAY(SELECT descendant FROM public.asset_closure WHERE ancestor = p_child) || p_child;
+
+  -- Only pairs from the parent's ancestry into the child's subtree can have used the edge
+  DELETE FROM public.asset_closure
+  WHERE ancestor = ANY(v_anc) AND descendant = ANY(v_des);
+
+  -- Trees (one parent per node) end here: nothing else leads into the child's subtree
+  IF NOT EXISTS (
+    SELECT 1 FROM public.asset_edges e
+    WHERE e.edge_type='PARENT_OF' AND e.to_asset_id = ANY(v_des) AND NOT (e.from_asset_id = ANY(v_des))
+  ) THEN
+    RETURN;
+  END IF;
+
+  -- DAGs: re-derive the surviving pairs. Any remaining path is at most three
+  -- segments of untouched closure rows or direct edges (Dong et al., incremental closure).
+  INSERT INTO public.asset_closure (ancestor, descendant, depth)
+  SELECT ancestor, descendant, min(depth)
+  FROM (
+    SELECT r1.ancestor, r1.descendant, r1.depth
+    FROM public.asset_parent_reach r1
+    WHERE r1.ancestor = ANY(v_anc) AND r1.descendant = ANY(v_des)
+    UNION ALL
+    SELECT r1.ancestor, r2.descendant, r1.depth + r2.depth
+    FROM public.asset_parent_reach r1
+    JOIN public.asset_parent_reach r2 ON r2.ancestor = r1.descendant
+    WHERE r1.ancestor = ANY(v_anc) AND r2.descendant = ANY(v_des)
+    UNION ALL
+    SELECT r1.ancestor, r3.descendant, r1.depth + r2.depth + r3.depth
+    FROM public.asset_parent_reach r1
+    JOIN public.asset_parent_reach r2 ON r2.ancestor = r1.descendant
+    JOIN public.asset_parent_reach r3 ON r3.ancestor = r2.descendant
+    WHERE r1.ancestor = ANY(v_anc) AND r3.descendant = ANY(v_des)
+  ) paths
+  GROUP BY ancestor, descendant
+  ON CONFLICT (ancestor, descendant) DO UPDATE SET depth = LEAST(public.asset_closure.depth, EXCLUDED.depth);
+END;
+$fn$ LANGUAGE plpgsql;
+
+-- Fast rejection before the row is written; the AFTER trigger re-checks with the closure as of
+-- each row, which also catches cycles formed by several edges in one statement
+CREATE OR REPLACE FUNCTION public.prevent_parent_cycle() RETURNS trigger AS $fn$
+BEGIN
+  IF TG_OP = 'INSERT' OR TG_OP = 'UPDATE' THEN
+    IF NEW.edge_type = 'PARENT_OF' THEN
+      IF NEW.from_asset_id = NEW.to_asset_id THEN
+        RAISE EXCEPTION 'PARENT_OF cannot be reflexive';
+      END IF;
+      IF EXISTS (
+        SELECT 1 FROM public.asset_closure c
+          WHERE c.ancestor = NEW.to_asset_id
+            AND c.descendant = NEW.from_asset_id
+      ) THEN
+        RAISE EXCEPTION 'Cycle detected in PARENT_OF';
+      END IF;
+    END IF;
+  END IF;
+  RETURN NEW;
+END;
+$fn$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.maintain_asset_closure() RETURNS trigger AS $fn$
+BEGIN
+  IF TG_OP = 'UPDATE'
+     AND OLD.edge_type = NEW.edge_type
+     AND OLD.from_asset_id = NEW.from_asset_id
+     AND OLD.to_asset_id = NEW.to_asset_id THEN
+    RETURN NULL;
+  END IF;
+  IF TG_OP IN ('UPDATE','DELETE') AND OLD.edge_type = 'PARENT_OF' THEN
+    PERFORM public.asset_closure_remove_edge(OLD.from_asset_id, OLD.to_asset_id);
+  END IF;
+  IF TG_OP IN ('INSERT','UPDATE') AND NEW.edge_type = 'PARENT_OF' THEN
+    PERFORM public.asset_closure_add_edge(NEW.from_asset_id, NEW.to_asset_id);
+  END IF;
+  RETURN NULL;
+END;
+$fn$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_trigger WHERE tgname='trg_asset_edges_maintain_closure'
+  ) THEN
+    CREATE TRIGGER trg_asset_edges_maintain_closure
+    AFTER INSERT OR UPDATE OR DELETE ON public.asset_edges
+    FOR EACH ROW EXECUTE FUNCTION public.maintain_asset_closure();
+  END IF;
+END$$;
+
+-- All descendants of an asset (e.g. a WBS subtree) from the closure, no recursion
+CREATE OR REPLACE FUNCTION public.asset_descendants(p_asset_id uuid)
+RETURNS TABLE (descendant uuid, depth int) AS $fn$
+  SELECT c.descendant, c.depth FROM public.asset_closure c WHERE c.ancestor = p_asset_id;
+$fn$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION public.asset_ancestors(p_asset_id uuid)
+RETURNS TABLE (ancestor uuid, depth int) AS $fn$
+  SELECT c.ancestor, c.depth FROM public.asset_closure c WHERE c.descendant = p_asset_id;
+$fn$ LANGUAGE sql STABLE;
+
+-- Backfill from existing edges (path-tracked so cycles that slipped past the old check terminate)
+INSERT INTO public.asset_closure (ancestor, descendant, depth)
+WITH RECURSIVE walk(ancestor, descendant, depth, path) AS (
+  SELECT from_asset_id, to_asset_id, 1, ARRAY[from_asset_id, to_asset_id]
+  FROM public.asset_edges
+  WHERE edge_type='PARENT_OF' AND from_asset_id <> to_asset_id
+  UNION ALL
+  SELECT w.ancestor, e.to_asset_id, w.depth + 1, w.path || e.to_asset_id
+  FROM walk w
+  JOIN public.asset_edges e ON e.edge_type='PARENT_OF' AND e.from_asset_id = w.descendant
+  WHERE NOT (e.to_asset_id = ANY(w.path))
+)
+SELECT ancestor, descendant, min(depth) FROM walk GROUP BY ancestor, descendant
+ON CONFLICT (ancestor, descendant) DO NOTHING;
+
+DO $$
+DECLARE
+  v_cycles bigint;
+BEGIN
+  SELECT count(*) INTO v_cycles
+  FROM public.asset_closure a
+  JOIN public.asset_closure b ON b.ancestor = a.descendant AND b.descendant = a.ancestor
+  WHERE a.ancestor < a.descendant;
+  IF v_cycles > 0 THEN
+    RAISE WARNING 'asset_closure: % asset pairs sit on existing PARENT_OF cycles; remove one edge of each cycle', v_cycles;
+  END IF;
+END$$;
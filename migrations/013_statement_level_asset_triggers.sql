@@ -0,0 +1,114 @@
+-- 013_statement_level_asset_triggers.sql
+-- Set-wise BELONGS_TO_PROJECT edge maintenance and fewer per-row trigger calls on assets
+-- Created: 2026-10-16
+-- Reason: ensure_belongs_to_project_edge() ran two SELECTs plus an INSERT/UPDATE per asset row,
+--         so bulk loads (e.g. thousands of ITP inspection points) paid that cost per row. It is
+--         replaced by statement-level triggers over the transition table that upsert all edges in
+--         one statement. set_assets_org_from_project() and compute_asset_timestamps() must write NEW
+--         before the row is stored (organization_id is NOT NULL), which only a BEFORE ROW trigger
+--         can do; they stay row-level (in-memory or a single PK lookup) and the timestamp trigger
+--         now skips UPDATEs that cannot change its output.
+
+-- BELONGS_TO_PROJECT edges, same invariant as ensure_belongs_to_project_edge(): every asset whose
+-- project_id points at a current project asset has exactly that edge, keyed BELONGS_TO_PROJECT:<id>
+CREATE OR REPLACE FUNCTION public.ensure_belongs_to_project_edges() RETURNS trigger AS $fn$
+BEGIN
+  UPDATE public.asset_edges e
+  SET to_asset_id = pa.id
+  FROM new_assets n
+  JOIN public.assets pa ON pa.id = n.project_id AND pa.type='project' AND pa.is_current AND NOT pa.is_deleted
+  WHERE e.from_asset_id = n.id
+    AND e.edge_type = 'BELONGS_TO_PROJECT'
+    AND e.to_asset_id IS DISTINCT FROM pa.id;
+
+  INSERT INTO public.asset_edges (id, from_asset_id, to_asset_id, edge_type, properties, idempotency_key)
+  SELECT gen_random_uuid(), n.id, pa.id, 'BELONGS_TO_PROJECT', '{}'::jsonb, concat('BELONGS_TO_PROJECT:', n.id::text)
+  FROM new_assets n
+  JOIN public.assets pa ON pa.id = n.project_id AND pa.type='project' AND pa.is_current AND NOT pa.is_deleted
+  WHERE NOT EXISTS (
+    SELECT 1 FROM public.asset_edges e
+    WHERE e.from_asset_id = n.id AND e.edge_type = 'BELONGS_TO_PROJECT'
+  )
+  ON CONFLICT (edge_type, idempotency_key) WHERE idempotency_key IS NOT NULL
+  DO UPDATE SET to_asset_id = EXCLUDED.to_asset_id;
+
+  RETURN NULL;
+END;
+$fn$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+  IF EXISTS (
+    SELECT 1 FROM pg_trigger WHERE tgname='trg_assets_belongs_to_project_edge'
+  ) THEN
+    DROP TRIGGER trg_assets_belongs_to_project_edge ON public.assets;
+  END IF;
+END$$;
+
+-- Transition tables allow only one event per trigger
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_trigger WHERE tgname='trg_assets_belongs_to_project_edge_ins'
+  ) THEN
+    CREATE TRIGGER trg_assets_belongs_to_project_edge_ins
+    AFTER INSERT ON public.assets
+    REFERENCING NEW TABLE AS new_assets
+    FOR EACH STATEMENT EXECUTE FUNCTION public.ensure_belongs_to_project_edges();
+  END IF;
+END$$;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_trigger WHERE tgname='trg_assets_belongs_to_project_edge_upd'
+  ) THEN
+    CREATE TRIGGER trg_assets_belongs_to_project_edge_upd
+    AFTER UPDATE ON public.assets
+    REFERENCING NEW TABLE AS new_assets
+    FOR EACH STATEMENT EXECUTE FUNCTION public.ensure_belongs_to_project_edges();
+  END IF;
+END$$;
+
+-- compute_asset_timestamps() is a pure function of content, so an UPDATE that leaves content and
+-- the derived columns alone would recompute the same values; skip the call for those rows
+DO $$
+BEGIN
+  -- 001 created trg_assets_compute_timestamps for INSERT OR UPDATE (tgtype bit 16 = UPDATE);
+  -- it is narrowed to INSERT and UPDATEs move to the filtered trigger below
+  IF EXISTS (
+    SELECT 1 FROM pg_trigger
+    WHERE tgname='trg_assets_compute_timestamps' AND (tgtype & 16) <> 0
+  ) THEN
+    DROP TRIGGER trg_assets_compute_timestamps ON public.assets;
+  END IF;
+END$$;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_trigger WHERE tgname='trg_assets_compute_timestamps'
+  ) THEN
+    CREATE TRIGGER trg_assets_compute_timestamps
+    BEFORE INSERT ON public.assets
+    FOR EACH ROW EXECUTE FUNCTION public.compute_asset_timestamps();
+  END IF;
+END$$;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_trigger WHERE tgname='trg_assets_compute_timestamps_upd'
+  ) THEN
+    CREATE TRIGGER trg_assets_compute_timestamps_upd
+    BEFORE UPDATE ON public.assets
+    FOR EACH ROW
+    WHEN (
+      NEW.content IS DISTINCT FROM OLD.content
+      OR NEW.due_sla_at IS DISTINCT FROM OLD.due_sla_at
+      OR NEW.scheduled_at IS DISTINCT FROM OLD.scheduled_at
+      OR NEW.requested_for_at IS DISTINCT FROM OLD.requested_for_at
+    )
+    EXECUTE FUNCTION public.compute_asset_timestamps();
+  END IF;
+END$$;
@@ -0,0 +1,11 @@
+-- 014_asset_version_chain_index.sql
+-- Keyset index for per-asset_uid version history (recycle/scripts/asset_versions.py)
+-- Created: 2026-10-16
+-- Reason: The asset_history view (001, dropped in 007) sorted every asset row by (asset_uid, version)
+--         to show one document's history. History pages now seek to (asset_uid, version < cursor)
+--         newest first; the INCLUDE columns let a page of history entries be served from the index
+--         without heap fetches for the full metadata/content rows.
+
+CREATE INDEX IF NOT EXISTS idx_assets_uid_version_desc
+  ON public.assets(asset_uid, version DESC)
+  INCLUDE (id, is_current, supersedes_asset_id, version_label, created_at, created_by);
@@ -0,0 +1,144 @@
+-- 015_supersede_asset_versions.sql
+-- One-call supersede: lock the current heads, demote them, insert version N+1 and link the chain
+-- Created: 2026-10-16
+-- Reason: New versions were written as separate demote/insert/edge statements from the client, in
+--         an order dictated by uq_assets_current_head, costing several round trips per asset.
+--         supersede_asset_versions() does the whole batch server-side (recycle/scripts/
+--         asset_versions.py calls it once per batch) and serialises concurrent writers of the same
+--         asset_uid on the head row lock instead of failing on the unique index.
+--         uq_assets_doc_rev now only covers current heads: a new version that keeps its document's
+--         revision_code no longer collides with the version it supersedes, and history rows keep
+--         their revision.
+
+DO $$
+BEGIN
+  -- 001 created the index over every version
+  IF EXISTS (
+    SELECT 1 FROM pg_indexes
+    WHERE schemaname='public' AND indexname='uq_assets_doc_rev' AND indexdef NOT LIKE '%is_current%'
+  ) THEN
+    DROP INDEX public.uq_assets_doc_rev;
+  END IF;
+END$$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_assets_doc_rev ON public.assets(document_number, revision_code)
+  WHERE is_current AND type IN ('document','spec','drawing');
+
+-- Batch spec parser: one row per array element, NULL fields are carried over from the previous version
+CREATE OR REPLACE FUNCTION public.asset_version_specs(p_specs jsonb)
+RETURNS TABLE (
+  ord bigint, asset_uid uuid, expected_version int, name text, subtype text, status text,
+  approval_state text, version_label text, revision_code text, metadata jsonb, content jsonb,
+  created_by uuid
+) AS $fn$
+  SELECT j.ord, s.asset_uid, s.expected_version, s.name, s.subtype, s.status,
+         s.approval_state, s.version_label, s.revision_code, s.metadata, s.content, s.created_by
+  FROM jsonb_array_elements(p_specs) WITH ORDINALITY AS j(spec, ord)
+  CROSS JOIN LATERAL jsonb_to_record(j.spec) AS s(
+    asset_uid uuid, expected_version int, name text, subtype text, status text,
+    approval_state text, version_label text, revision_code text, metadata jsonb, content jsonb,
+    created_by uuid
+  );
+$fn$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION public.supersede_asset_versions(p_specs jsonb)
+RETURNS TABLE (ord bigint, asset_uid uuid, previous_asset_id uuid, asset_id uuid, version int) AS $fn$
+#variable_conflict use_column
+DECLARE
+  v_uids uuid[];
+  v_prev_ids uuid[];
+  v_prev public.assets[];
+  v_specs int;
+BEGIN
+  SELECT array_agg(DISTINCT s.asset_uid ORDER BY s.asset_uid), count(*)
+  INTO v_uids, v_specs
+  FROM public.asset_version_specs(p_specs) s;
+  IF v_specs = 0 THEN
+    RETURN;
+  END IF;
+  IF array_position(v_uids, NULL) IS NOT NULL OR cardinality(v_uids) <> v_specs THEN
+    RAISE EXCEPTION 'supersede_asset_versions: every spec needs a distinct asset_uid';
+  END IF;
+
+  -- Lock heads in asset_uid order so overlapping batches cannot deadlock. A head demoted by a
+  -- writer we waited on is skipped by the lock re-check; each retry takes a fresh snapshot
+  -- that sees that writer's new head.
+  FOR attempt IN 1..5 LOOP
+    v_prev_ids := ARRAY(
+      SELECT a.id FROM public.assets a
+      WHERE a.asset_uid = ANY(v_uids) AND a.is_current
+      ORDER BY a.asset_uid
+      FOR UPDATE
+    );
+    EXIT WHEN cardinality(v_prev_ids) = cardinality(v_uids);
+  END LOOP;
+
+  IF cardinality(v_prev_ids) <> cardinality(v_uids) THEN
+    IF EXISTS (
+      SELECT 1 FROM unnest(v_uids) u
+      WHERE NOT EXISTS (SELECT 1 FROM public.assets a WHERE a.asset_uid = u AND a.is_current)
+        AND NOT EXISTS (SELECT 1 FROM public.assets a WHERE a.asset_uid = u)
+    ) THEN
+      RAISE EXCEPTION 'supersede_asset_versions: unknown asset_uid in batch' USING ERRCODE = 'no_data_found';
+    END IF;
+    RAISE EXCEPTION 'supersede_asset_versions: current head kept moving' USING ERRCODE = 'serialization_failure';
+  END IF;
+
+  v_prev := ARRAY(SELECT a FROM public.assets a WHERE a.id = ANY(v_prev_ids));
+
+  IF EXISTS (
+    SELECT 1 FROM unnest(v_prev) p
+    JOIN public.asset_version_specs(p_specs) s ON s.asset_uid = p.asset_uid
+    WHERE s.expected_version IS NOT NULL AND s.expected_version <> p.version
+  ) THEN
+    RAISE EXCEPTION 'supersede_asset_versions: stale expected_version';
+  END IF;
+
+  -- The head owns the lookup keys (uq_assets_idem, uq_assets_wbs_lbs_path), so idempotent
+  -- upserts and path lookups keep landing on the current version
+  UPDATE public.assets a
+  SET is_current = false, idempotency_key = NULL, path_key = NULL, updated_at = now()
+  WHERE a.id = ANY(v_prev_ids);
+
+  RETURN QUERY
+  WITH inserted AS (
+    INSERT INTO public.assets (
+      id, asset_uid, version, is_current, supersedes_asset_id, version_label, effective_from,
+      effective_to, type, subtype, name, organization_id, project_id, parent_asset_id,
+      document_number, revision_code, path_key, status, approval_state, classification,
+      idempotency_key, metadata, content, created_at, created_by, updated_at, updated_by
+    )
+    SELECT gen_random_uuid(), p.asset_uid, p.version + 1, true, p.id,
+           COALESCE(s.version_label, p.version_label), p.effective_from, p.effective_to,
+           p.type, COALESCE(s.subtype, p.subtype), COALESCE(s.name, p.name),
+           p.organization_id, p.project_id, p.parent_asset_id, p.document_number,
+           COALESCE(s.revision_code, p.revision_code), p.path_key,
+           COALESCE(s.status, p.status), COALESCE(s.approval_state, p.approval_state),
+           p.classification, p.idempotency_key,
+           COALESCE(s.metadata, p.metadata), COALESCE(s.content, p.content),
+           now(), s.created_by, now(), s.created_by
+    FROM unnest(v_prev) p
+    JOIN public.asset_version_specs(p_specs) s ON s.asset_uid = p.asset_uid
+    RETURNING id, asset_uid, version, supersedes_asset_id
+  ),
+  edges AS (
+    INSERT INTO public.asset_edges (id, from_asset_id, to_asset_id, edge_type, properties, idempotency_key)
+    SELECT gen_random_uuid(), i.id, i.supersedes_asset_id, 'SUPERSEDES',
+           jsonb_build_object('version', i.version), concat('SUPERSEDES:', i.id::text)
+    FROM inserted i
+    UNION ALL
+    -- VERSION_OF points at the first version of the chain (uq_asset_uid_version probe)
+    SELECT gen_random_uuid(), i.id, r.id, 'VERSION_OF',
+           jsonb_build_object('version', i.version), concat('VERSION_OF:', i.id::text)
+    FROM inserted i
+    CROSS JOIN LATERAL (
+      SELECT a.id FROM public.assets a WHERE a.asset_uid = i.asset_uid ORDER BY a.version LIMIT 1
+    ) r
+    ON CONFLICT (edge_type, idempotency_key) WHERE idempotency_key IS NOT NULL DO NOTHING
+  )
+  SELECT s.ord, i.asset_uid, i.supersedes_asset_id, i.id, i.version
+  FROM inserted i
+  JOIN public.asset_version_specs(p_specs) s ON s.asset_uid = i.asset_uid
+  ORDER BY s.ord;
+END;
+$fn$ LANGUAGE plpgsql;
@@ -0,0 +1,40 @@
+-- 016_asset_embeddings_hnsw.sql
+-- Recreate asset_embeddings (dropped in 006) with an HNSW index and filter columns
+-- Created: 2026-10-16
+-- Reason: The 001 table had an ivfflat (lists=100) index built on an empty table, whose centroids
+--         never matched later data, and no way to filter by project without joining assets.
+--         Vectors are now written in bulk by recycle/scripts/asset_embeddings.py. HNSW needs no
+--         training data and keeps recall as the table grows. project_id/asset_type are copied onto
+--         each row so filtered k-NN can use the btree index (small projects) or an HNSW iterative
+--         scan (pgvector >= 0.8) without a join.
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+CREATE TABLE IF NOT EXISTS public.asset_embeddings (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  asset_id uuid NOT NULL REFERENCES public.assets(id) ON DELETE CASCADE,
+  project_id uuid,
+  asset_type text NOT NULL,
+  model text NOT NULL,
+  embedding vector(1536) NOT NULL,
+  asset_updated_at timestamptz,  -- assets.updated_at the vector was computed from
+  created_at timestamptz DEFAULT now(),
+  CONSTRAINT uq_asset_embeddings_asset_model UNIQUE (asset_id, model)
+);
+
+CREATE INDEX IF NOT EXISTS idx_asset_embeddings_project_type
+  ON public.asset_embeddings(project_id, asset_type);
+
+-- m/ef_construction are pgvector's defaults; asset_embeddings.py --rebuild-index recreates it
+-- after large loads, which is much faster than maintaining it row by row
+CREATE INDEX IF NOT EXISTS idx_asset_embeddings_hnsw
+  ON public.asset_embeddings USING hnsw (embedding vector_cosine_ops)
+  WITH (m = 16, ef_construction = 64);
+
+DO $$
+BEGIN
+  IF (SELECT string_to_array(extversion, '.')::int[] FROM pg_extension WHERE extname = 'vector') < ARRAY[0,8] THEN
+    RAISE WARNING 'pgvector % has no hnsw.iterative_scan; set EMBEDDING_ITERATIVE_SCAN=off for filtered search',
+      (SELECT extversion FROM pg_extension WHERE extname = 'vector');
+  END IF;
+END$$;
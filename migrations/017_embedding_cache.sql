@@ -0,0 +1,17 @@
+-- 017_embedding_cache.sql
+-- Content-addressed embedding cache shared across asset versions and projects
+-- Created: 2026-10-16
+-- Reason: Re-extraction creates new asset versions whose text is usually unchanged, and the same
+--         standard/spec text recurs across projects, so most embedding calls recomputed a vector
+--         already stored. Vectors are now looked up by (model, sha256 of normalized text) first
+--         (recycle/scripts/asset_embeddings.py); only misses are sent to the embedding provider.
+
+CREATE TABLE IF NOT EXISTS public.embedding_cache (
+  model text NOT NULL,
+  content_hash bytea NOT NULL,
+  embedding vector(1536) NOT NULL,
+  hits bigint NOT NULL DEFAULT 0,
+  created_at timestamptz DEFAULT now(),
+  last_hit_at timestamptz,
+  PRIMARY KEY (model, content_hash)
+);
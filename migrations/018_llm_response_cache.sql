@@ -0,0 +1,33 @@
+-- 018_llm_response_cache.sql
+-- Persistent LLM response cache keyed on (model, model_version, prompt_hash, params)
+-- Created: 2026-10-16
+-- Reason: Orchestrator re-runs sent identical prompts to the LLM for every subgraph
+--         (project_details, standards_extraction, wbs_extraction, lbs_extraction, itp_generation)
+--         even when only a downstream step had changed. recycle/scripts/llm_cache.py looks
+--         responses up here first. Rows expire after a TTL and the least recently hit rows are
+--         evicted past a byte budget. The key columns are the ones processing_runs (dropped in 006)
+--         recorded per call.
+
+CREATE TABLE IF NOT EXISTS public.llm_response_cache (
+  cache_key bytea PRIMARY KEY,  -- sha256 over model, model_version, prompt_hash and canonical params
+  model text NOT NULL,
+  model_version text,
+  prompt_hash text NOT NULL,
+  params jsonb NOT NULL DEFAULT '{}'::jsonb,
+  agent_id text,
+  response jsonb NOT NULL,
+  size_bytes int NOT NULL,
+  input_tokens int,
+  output_tokens int,
+  latency_ms int,
+  hits bigint NOT NULL DEFAULT 0,
+  created_at timestamptz NOT NULL DEFAULT now(),
+  last_hit_at timestamptz NOT NULL DEFAULT now(),
+  expires_at timestamptz
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_response_cache_expires
+  ON public.llm_response_cache(expires_at) WHERE expires_at IS NOT NULL;
+-- Eviction walks entries newest-hit first
+CREATE INDEX IF NOT EXISTS idx_llm_response_cache_last_hit
+  ON public.llm_response_cache(last_hit_at DESC, cache_key);
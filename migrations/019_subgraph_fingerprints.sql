@@ -0,0 +1,18 @@
+-- 019_subgraph_fingerprints.sql
+-- Input/output fingerprints per project and subgraph for incremental orchestrator runs
+-- Created: 2026-10-16
+-- Reason: Every orchestrator run re-executed the whole document_extraction -> project_details ->
+--         standards -> plans -> WBS -> LBS -> ITP chain, so adding one drawing to a large project
+--         regenerated every ITP. recycle/scripts/incremental_runs.py records what each subgraph
+--         last consumed (document source_hash values, upstream output asset versions) and skips
+--         subgraphs whose inputs are unchanged.
+
+CREATE TABLE IF NOT EXISTS public.subgraph_fingerprints (
+  project_id uuid NOT NULL REFERENCES public.projects(id) ON DELETE CASCADE,
+  subgraph text NOT NULL,
+  scope text NOT NULL DEFAULT '',  -- '' for the whole subgraph, a document id for per-document extraction
+  input_fingerprint text NOT NULL,
+  output_fingerprint text,
+  completed_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (project_id, subgraph, scope)
+);
@@ -47,7 +47,11 @@ def query_database():
                 CASE
                     WHEN content IS NOT NULL THEN 'Has Content'
                     ELSE 'No Content'
-                END as content_status
+                END as content_status,
+                CASE
+                    WHEN jsonb_typeof(content) = 'object' THEN ARRAY(SELECT jsonb_object_keys(content))
+                    WHEN content IS NOT NULL THEN ARRAY['(non-dict content)']
+                END as content_keys
             FROM public.assets
             ORDER BY created_at DESC
             LIMIT 50;
@@ -56,7 +60,7 @@ def query_database():
 
         if all_assets:
             for i, asset in enumerate(all_assets, 1):
-                asset_id, asset_uid, asset_type, subtype, name, project_id, status, approval_state, created_at, updated_at, content_status = asset
+                asset_id, asset_uid, asset_type, subtype, name, project_id, status, approval_state, created_at, updated_at, content_status, content_keys = asset
                 print(f"\n{i}. ASSET ID: {asset_id}")
                 print(f"   └─ Asset UID: {asset_uid}")
                 print(f"   └─ Type: {asset_type}")
@@ -69,17 +73,9 @@ def query_database():
                 print(f"   └─ Created: {created_at.strftime('%Y-%m-%d %H:%M:%S')}")
                 print(f"   └─ Updated: {updated_at.strftime('%Y-%m-%d %H:%M:%S')}")
 
-                # Get content details if it exists
-                if content_status == 'Has Content':
-                    cursor.execute("""
-                        SELECT content
-                        FROM public.assets
-                        WHERE id = %s;
-                    """, (asset_id,))
-                    content_result = cursor.fetchone()
-                    if content_result and content_result[0]:
-                        content_keys = list(content_result[0].keys()) if isinstance(content_result[0], dict) else ['(non-dict content)']
-                        print(f"   └─ Content Keys: {', '.join(content_keys[:5])}" + ('...' if len(content_keys) > 5 else ''))
+                # Content keys come back with the listing instead of one query per asset
+                if content_keys:
+                    print(f"   └─ Content Keys: {', '.join(content_keys[:5])}" + ('...' if len(content_keys) > 5 else ''))
 
         print("\n" + "="*80)
         print("=== PROJECT-ASSET RELATIONSHIPS ===")
@@ -0,0 +1,554 @@
+#!/usr/bin/env python3
+"""
+Embedding ingestion and k-NN search over public.asset_embeddings.
+
+Ingestion pages through current assets that have no vector for the model yet
+(or whose row changed since it was embedded), embeds their text in batches and
+streams the vectors into a staging table with binary COPY before one upsert
+per batch. Superseded and deleted assets lose their vectors, so search never
+returns stale versions.
+
+Before calling the provider, texts are looked up in public.embedding_cache
+(migration 017) by model and the SHA-256 of their normalized form. New versions
+with unchanged text, and text repeated across projects, reuse the stored vector.
+Lookups are plain reads; the hits/last_hit_at bookkeeping is written in one short
+statement after each batch commits, so concurrent ingesters never hold cache row
+locks across an embedding call. Hits and misses are counted per EmbeddingCache
+and process-wide (cache_metrics()).
+
+For large loads pass --rebuild-index: the HNSW index is dropped for the load
+and rebuilt once at the end, instead of being maintained for every row.
+
+Search is filtered by project_id and optionally asset type. It uses the HNSW
+index with hnsw.ef_search and, on pgvector >= 0.8, an iterative scan, so that
+selective filters still fill k results.
+
+The embedding function is any callable taking a list of texts and returning
+one 1536-float sequence per text, usually an embedding_providers provider. The
+CLI picks one with --provider (EMBEDDING_PROVIDER); "hashing" runs offline.
+
+Usage:
+    python asset_embeddings.py [--provider openai|hashing] [--model M] ingest [--project <uuid>] [--type T ...] [--batch-size N] [--rebuild-index] [--no-cache]
+    python asset_embeddings.py search "<text>" --project <uuid> [--type T ...] [-k N]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import unicodedata
+import uuid
+from collections import Counter
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Sequence, Callable
+
+import psycopg2
+
+from asset_repo import get_pool
+from embedding_providers import DEFAULT_OPENAI_MODEL, DEFAULT_PROVIDER, EMBEDDING_DIM, PROVIDERS, get_provider
+
+
+DEFAULT_MODEL = DEFAULT_OPENAI_MODEL
+DEFAULT_BATCH_SIZE = 128
+# Characters of asset text sent per embedding; longer content is truncated
+MAX_TEXT_CHARS = 8000
+
+HNSW_INDEX = "idx_asset_embeddings_hnsw"
+HNSW_M = int(os.getenv("EMBEDDING_HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("EMBEDDING_HNSW_EF_CONSTRUCTION", "64"))
+EF_SEARCH = int(os.getenv("EMBEDDING_EF_SEARCH", "80"))
+ITERATIVE_SCAN = os.getenv("EMBEDDING_ITERATIVE_SCAN", "relaxed_order")
+
+EmbedFn = Callable[[List[str]], List[Sequence[float]]]
+
+STAGE_COLUMNS = ["asset_id", "project_id", "asset_type", "model", "embedding", "asset_updated_at"]
+
+STAGE_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS _embedding_stage (
+  asset_id uuid NOT NULL,
+  project_id uuid,
+  asset_type text NOT NULL,
+  model text NOT NULL,
+  embedding vector(1536) NOT NULL,
+  asset_updated_at timestamptz
+) ON COMMIT DROP;
+"""
+
+MERGE_SQL = """
+INSERT INTO public.asset_embeddings (asset_id, project_id, asset_type, model, embedding, asset_updated_at)
+SELECT asset_id, project_id, asset_type, model, embedding, asset_updated_at FROM _embedding_stage
+ON CONFLICT (asset_id, model) DO UPDATE SET
+  project_id = EXCLUDED.project_id,
+  asset_type = EXCLUDED.asset_type,
+  embedding = EXCLUDED.embedding,
+  asset_updated_at = EXCLUDED.asset_updated_at,
+  created_at = now()
+"""
+
+# Keyset page of current assets whose vector is missing or older than the row
+PENDING_SQL = """
+SELECT a.id, a.project_id, a.type, a.name, a.metadata, a.content, a.updated_at
+FROM public.assets a
+LEFT JOIN public.asset_embeddings e ON e.asset_id = a.id AND e.model = %(model)s
+WHERE a.is_current AND NOT a.is_deleted
+  AND a.id > %(after)s::uuid
+  AND (%(project_id)s::uuid IS NULL OR a.project_id = %(project_id)s::uuid)
+  AND (%(types)s::text[] IS NULL OR a.type = ANY(%(types)s::text[]))
+  AND (e.asset_id IS NULL OR e.asset_updated_at IS DISTINCT FROM a.updated_at)
+ORDER BY a.id
+LIMIT %(limit)s
+"""
+
+PRUNE_SQL = """
+DELETE FROM public.asset_embeddings e
+USING public.assets a
+WHERE a.id = e.asset_id
+  AND (NOT a.is_current OR a.is_deleted)
+  AND (%(project_id)s::uuid IS NULL OR e.project_id = %(project_id)s::uuid)
+"""
+
+SEARCH_SQL = """
+SELECT n.asset_id, a.name, n.asset_type, a.project_id, n.distance
+FROM (
+  SELECT e.asset_id, e.asset_type, e.embedding <=> %(query)s::vector AS distance
+  FROM public.asset_embeddings e
+  WHERE e.model = %(model)s
+    AND e.project_id = %(project_id)s::uuid
+    AND (%(types)s::text[] IS NULL OR e.asset_type = ANY(%(types)s::text[]))
+  ORDER BY e.embedding <=> %(query)s::vector
+  LIMIT %(k)s
+) n
+JOIN public.assets a ON a.id = n.asset_id
+ORDER BY n.distance
+"""
+
+CACHE_STAGE_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS _embedding_cache_stage (
+  model text NOT NULL,
+  content_hash bytea NOT NULL,
+  embedding vector(1536) NOT NULL
+) ON COMMIT DROP;
+"""
+
+CACHE_LOOKUP_SQL = """
+SELECT content_hash, embedding::text
+FROM public.embedding_cache
+WHERE model = %(model)s AND content_hash = ANY(%(hashes)s)
+"""
+
+# Hit accounting, run in its own short transaction; rows are locked in key order so
+# concurrent ingesters bumping overlapping hashes cannot deadlock
+CACHE_HITS_SQL = """
+WITH bumped AS (
+  SELECT c.content_hash, v.n
+  FROM public.embedding_cache c
+  JOIN unnest(%(hashes)s::bytea[], %(counts)s::bigint[]) AS v(content_hash, n)
+    ON v.content_hash = c.content_hash
+  WHERE c.model = %(model)s
+  ORDER BY c.content_hash
+  FOR UPDATE OF c
+)
+UPDATE public.embedding_cache c
+SET hits = c.hits + b.n, last_hit_at = now()
+FROM bumped b
+WHERE c.model = %(model)s AND c.content_hash = b.content_hash
+"""
+
+CACHE_STORE_SQL = """
+INSERT INTO public.embedding_cache (model, content_hash, embedding)
+SELECT model, content_hash, embedding FROM _embedding_cache_stage
+ON CONFLICT (model, content_hash) DO NOTHING
+"""
+
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+PGCOPY_TRAILER = struct.pack("!h", -1)
+# 2000-01-01 in Unix microseconds, the epoch of binary timestamptz
+PG_EPOCH_US = 946684800 * 1_000_000
+
+
+def _collect_text(value: Any, out: List[str]) -> None:
+    if isinstance(value, str):
+        if value.strip():
+            out.append(value.strip())
+    elif isinstance(value, dict):
+        for v in value.values():
+            _collect_text(v, out)
+    elif isinstance(value, list):
+        for v in value:
+            _collect_text(v, out)
+
+
+def asset_text(name: Optional[str], metadata: Optional[Dict[str, Any]], content: Optional[Dict[str, Any]]) -> str:
+    """Text embedded for an asset: its name, metadata description and every string in content."""
+    parts: List[str] = []
+    if name:
+        parts.append(name)
+    if metadata and isinstance(metadata.get("description"), str):
+        parts.append(metadata["description"])
+    _collect_text(content or {}, parts)
+    return "\n".join(parts)[:MAX_TEXT_CHARS]
+
+
+def _binary_field(value: Any, kind: str) -> bytes:
+    if value is None:
+        return struct.pack("!i", -1)
+    if kind == "uuid":
+        data = uuid.UUID(str(value)).bytes
+    elif kind == "vector":
+        # pgvector vector_recv: int16 dim, int16 unused, float4[dim]
+        data = struct.pack(f"!hh{len(value)}f", len(value), 0, *value)
+    elif kind == "bytea":
+        data = bytes(value)
+    elif kind == "timestamptz":
+        data = struct.pack("!q", int(round(value.timestamp() * 1_000_000)) - PG_EPOCH_US)
+    else:
+        data = str(value).encode("utf-8")
+    return struct.pack("!i", len(data)) + data
+
+
+STAGE_KINDS = ["uuid", "uuid", "text", "text", "vector", "timestamptz"]
+CACHE_STAGE_KINDS = ["text", "bytea", "vector"]
+
+
+class BinaryCopyStream:
+    """File-like PGCOPY binary stream over staging rows, encoded as COPY reads it."""
+
+    def __init__(self, rows: Iterable[Sequence[Any]], kinds: Sequence[str] = STAGE_KINDS):
+        self._rows: Iterator[Sequence[Any]] = iter(rows)
+        self._kinds = kinds
+        self._pending = PGCOPY_HEADER
+        self._done = False
+
+    def _next_tuple(self) -> bytes:
+        row = next(self._rows, None)
+        if row is None:
+            self._done = True
+            return PGCOPY_TRAILER
+        return struct.pack("!h", len(row)) + b"".join(
+            _binary_field(value, kind) for value, kind in zip(row, self._kinds)
+        )
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._done and (size < 0 or len(self._pending) < size):
+            self._pending += self._next_tuple()
+        if size < 0:
+            data, self._pending = self._pending, b""
+        else:
+            data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+_metrics_lock = threading.Lock()
+_metrics = {"embedding_cache_hits": 0, "embedding_cache_misses": 0}
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form for cache keys: NFKC, collapsed whitespace, trimmed."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def content_hash(text: str) -> bytes:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).digest()
+
+
+def cache_metrics() -> Dict[str, Any]:
+    """Process-wide embedding cache counters, for the service's metrics endpoint."""
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    lookups = metrics["embedding_cache_hits"] + metrics["embedding_cache_misses"]
+    metrics["embedding_cache_hit_ratio"] = metrics["embedding_cache_hits"] / lookups if lookups else 0.0
+    return metrics
+
+
+class EmbeddingCache:
+    """Read-through cache over public.embedding_cache for one model."""
+
+    def __init__(self, model: str = DEFAULT_MODEL):
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+        # Hits per hash not yet written to embedding_cache.hits
+        self._pending_hits: Counter = Counter()
+
+    def _count(self, hits: int, misses: int) -> None:
+        self.hits += hits
+        self.misses += misses
+        with _metrics_lock:
+            _metrics["embedding_cache_hits"] += hits
+            _metrics["embedding_cache_misses"] += misses
+
+    def embed(self, conn: Any, texts: List[str], embed: EmbedFn) -> List[Sequence[float]]:
+        """Vectors for texts, calling embed only for texts whose normalized hash is not cached.
+
+        Texts repeated within the batch are embedded once. New vectors are stored in
+        the caller's transaction.
+        """
+        hashes = [content_hash(t) for t in texts]
+        with conn.cursor() as cursor:
+            cursor.execute(CACHE_LOOKUP_SQL, {
+                "model": self.model,
+                "hashes": [psycopg2.Binary(h) for h in set(hashes)],
+            })
+            found = {bytes(h): json.loads(v) for h, v in cursor.fetchall()}
+        self._pending_hits.update(h for h in hashes if h in found)
+
+        missing: Dict[bytes, str] = {}
+        for h, text in zip(hashes, texts):
+            if h not in found:
+                missing.setdefault(h, text)
+        misses = sum(1 for h in hashes if h in missing)
+        self._count(len(hashes) - misses, misses)
+
+        if missing:
+            vectors = embed(list(missing.values()))
+            if len(vectors) != len(missing):
+                raise ValueError(f"embedder returned {len(vectors)} vectors for {len(missing)} texts")
+            found.update(zip(missing.keys(), vectors))
+            with conn.cursor() as cursor:
+                cursor.execute(CACHE_STAGE_DDL)
+                cursor.execute("TRUNCATE _embedding_cache_stage")
+                cursor.copy_expert(
+                    "COPY _embedding_cache_stage (model, content_hash, embedding) FROM STDIN WITH (FORMAT binary)",
+                    BinaryCopyStream(((self.model, h, found[h]) for h in missing), CACHE_STAGE_KINDS),
+                )
+                cursor.execute(CACHE_STORE_SQL)
+        return [found[h] for h in hashes]
+
+    def flush_hits(self, conn: Any) -> None:
+        """Write pending hit counts in one statement; call outside the batch transaction and commit."""
+        if not self._pending_hits:
+            return
+        pending = sorted(self._pending_hits.items())
+        self._pending_hits.clear()
+        with conn.cursor() as cursor:
+            cursor.execute(CACHE_HITS_SQL, {
+                "model": self.model,
+                "hashes": [psycopg2.Binary(h) for h, _ in pending],
+                "counts": [n for _, n in pending],
+            })
+
+
+def write_embeddings(conn: Any, rows: List[Sequence[Any]]) -> int:
+    """Upsert (asset_id, project_id, asset_type, model, embedding, asset_updated_at) rows via binary COPY."""
+    if not rows:
+        return 0
+    with conn.cursor() as cursor:
+        cursor.execute(STAGE_DDL)
+        cursor.execute("TRUNCATE _embedding_stage")
+        cursor.copy_expert(
+            f"COPY _embedding_stage ({', '.join(STAGE_COLUMNS)}) FROM STDIN WITH (FORMAT binary)",
+            BinaryCopyStream(rows),
+        )
+        cursor.execute(MERGE_SQL)
+        return cursor.rowcount
+
+
+def drop_hnsw_index(conn: Any) -> None:
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP INDEX IF EXISTS public.{HNSW_INDEX}")
+    conn.commit()
+
+
+def build_hnsw_index(conn: Any, m: int = HNSW_M, ef_construction: int = HNSW_EF_CONSTRUCTION) -> float:
+    """(Re)create the HNSW index; returns build seconds. The graph build is much faster in memory."""
+    started = time.perf_counter()
+    with conn.cursor() as cursor:
+        cursor.execute("SET LOCAL maintenance_work_mem = %s", (os.getenv("EMBEDDING_INDEX_MEM", "2GB"),))
+        cursor.execute("SET LOCAL max_parallel_maintenance_workers = %s",
+                       (int(os.getenv("EMBEDDING_INDEX_WORKERS", "4")),))
+        cursor.execute(f"DROP INDEX IF EXISTS public.{HNSW_INDEX}")
+        cursor.execute(
+            f"CREATE INDEX {HNSW_INDEX} ON public.asset_embeddings "
+            f"USING hnsw (embedding vector_cosine_ops) WITH (m = %s, ef_construction = %s)",
+            (m, ef_construction),
+        )
+    conn.commit()
+    return time.perf_counter() - started
+
+
+def ingest_embeddings(
+    conn: Any,
+    embed: EmbedFn,
+    model: str = DEFAULT_MODEL,
+    project_id: Optional[str] = None,
+    types: Optional[List[str]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    cache: Optional[EmbeddingCache] = None,
+) -> Dict[str, Any]:
+    """Embed every pending asset in batches, committing per batch; returns counts and timings.
+
+    With a cache, only texts missing from embedding_cache reach embed; the run's
+    hits and misses are included in the stats.
+    """
+    stats = {"embedded": 0, "pruned": 0, "batches": 0, "embed_s": 0.0, "write_s": 0.0}
+    after = "00000000-0000-0000-0000-000000000000"
+    while True:
+        with conn.cursor() as cursor:
+            cursor.execute(PENDING_SQL, {
+                "model": model, "after": after, "project_id": project_id,
+                "types": types, "limit": batch_size,
+            })
+            assets = cursor.fetchall()
+        if not assets:
+            break
+        after = str(assets[-1][0])
+
+        started = time.perf_counter()
+        texts = [asset_text(a[3], a[4], a[5]) for a in assets]
+        vectors = cache.embed(conn, texts, embed) if cache else embed(texts)
+        stats["embed_s"] += time.perf_counter() - started
+        if len(vectors) != len(assets):
+            raise ValueError(f"embedder returned {len(vectors)} vectors for {len(assets)} texts")
+
+        started = time.perf_counter()
+        rows = []
+        for asset, vector in zip(assets, vectors):
+            if len(vector) != EMBEDDING_DIM:
+                raise ValueError(f"expected {EMBEDDING_DIM}-dim vectors, got {len(vector)}")
+            rows.append((asset[0], asset[1], asset[2], model, vector, asset[6]))
+        write_embeddings(conn, rows)
+        conn.commit()
+        if cache:
+            cache.flush_hits(conn)
+            conn.commit()
+        stats["write_s"] += time.perf_counter() - started
+        stats["embedded"] += len(rows)
+        stats["batches"] += 1
+
+    with conn.cursor() as cursor:
+        cursor.execute(PRUNE_SQL, {"project_id": project_id})
+        stats["pruned"] = cursor.rowcount
+    conn.commit()
+    if cache:
+        stats["cache_hits"] = cache.hits
+        stats["cache_misses"] = cache.misses
+    return stats
+
+
+def vector_literal(vector: Sequence[float]) -> str:
+    return "[" + ",".join(repr(float(v)) for v in vector) + "]"
+
+
+def search_similar(
+    query_vector: Sequence[float],
+    project_id: str,
+    types: Optional[List[str]] = None,
+    k: int = 10,
+    model: str = DEFAULT_MODEL,
+    ef_search: int = EF_SEARCH,
+    conn: Optional[Any] = None,
+) -> Dict[str, Any]:
+    """k nearest assets of a project by cosine distance.
+
+    Returns {"success", "results"} with {"asset_id", "name", "type", "project_id",
+    "distance"} entries, nearest first. A caller-supplied conn is neither committed nor
+    rolled back; the hnsw settings stay local to its current transaction.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_pool().getconn()
+    try:
+        with conn.cursor() as cursor:
+            # ef_search must cover k, or the index scan returns fewer rows than asked for
+            cursor.execute("SELECT set_config('hnsw.ef_search', %s, true)", (str(max(ef_search, k)),))
+            if ITERATIVE_SCAN != "off":
+                cursor.execute("SELECT set_config('hnsw.iterative_scan', %s, true)", (ITERATIVE_SCAN,))
+            cursor.execute(SEARCH_SQL, {
+                "query": vector_literal(query_vector), "model": model,
+                "project_id": project_id, "types": types, "k": k,
+            })
+            rows = cursor.fetchall()
+        if own_conn:
+            conn.commit()
+    except Exception as e:
+        if own_conn:
+            conn.rollback()
+        return {"success": False, "error": str(e), "results": []}
+    finally:
+        if own_conn:
+            get_pool().putconn(conn)
+
+    return {
+        "success": True,
+        "results": [
+            {"asset_id": str(r[0]), "name": r[1], "type": r[2], "project_id": str(r[3]) if r[3] else None,
+             "distance": float(r[4])}
+            for r in rows
+        ],
+    }
+
+
+def search_text(text: str, project_id: str, embed: EmbedFn, **kwargs: Any) -> Dict[str, Any]:
+    """Embed text and run search_similar with it."""
+    return search_similar(embed([text])[0], project_id, **kwargs)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Embed assets into asset_embeddings and search them.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ingest = sub.add_parser("ingest", help="Embed pending assets")
+    ingest.add_argument("--project", help="Only assets of this project")
+    ingest.add_argument("--type", action="append", dest="types", help="Only this asset type (repeatable)")
+    ingest.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    ingest.add_argument("--rebuild-index", action="store_true",
+                        help="Drop the HNSW index for the load and rebuild it afterwards")
+    ingest.add_argument("--no-cache", action="store_true", help="Always call the embedding provider")
+
+    search = sub.add_parser("search", help="k-NN search within a project")
+    search.add_argument("text")
+    search.add_argument("--project", required=True)
+    search.add_argument("--type", action="append", dest="types")
+    search.add_argument("-k", type=int, default=10)
+
+    parser.add_argument("--provider", choices=sorted(PROVIDERS), default=DEFAULT_PROVIDER)
+    parser.add_argument("--model", help=f"Remote model for --provider openai (default {DEFAULT_MODEL})")
+    args = parser.parse_args()
+    if args.model and args.provider != "openai":
+        parser.error("--model only applies to --provider openai")
+
+    embed = get_provider(args.provider, **({"model": args.model} if args.model else {}))
+
+    try:
+        if args.command == "search":
+            result = search_text(args.text, args.project, embed, types=args.types, k=args.k, model=embed.model)
+            print(json.dumps(result, indent=2))
+            return 0 if result["success"] else 1
+
+        conn = get_pool().getconn()
+        try:
+            if args.rebuild_index:
+                drop_hnsw_index(conn)
+            cache = None if args.no_cache else EmbeddingCache(embed.model)
+            try:
+                stats = ingest_embeddings(conn, embed, embed.model, args.project, args.types, args.batch_size, cache)
+            finally:
+                # Batches already committed stay; search must not be left without its index
+                if args.rebuild_index:
+                    conn.rollback()
+                    index_s = build_hnsw_index(conn)
+            if args.rebuild_index:
+                stats["index_s"] = index_s
+        finally:
+            get_pool().putconn(conn)
+    except (psycopg2.Error, ValueError, OSError) as e:
+        print(f"❌ Embedding {args.command} failed: {e}")
+        return 1
+
+    print(f"✅ Embedded {stats['embedded']} assets in {stats['batches']} batches "
+          f"(embed {stats['embed_s']:.1f}s, write {stats['write_s']:.1f}s), pruned {stats['pruned']}")
+    if "cache_hits" in stats:
+        print(f"✅ Embedding cache: {stats['cache_hits']} hits, {stats['cache_misses']} misses")
+    if "index_s" in stats:
+        print(f"✅ Rebuilt {HNSW_INDEX} in {stats['index_s']:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
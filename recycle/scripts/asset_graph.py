@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+In-memory snapshot of one project's current asset graph.
+
+The register views dropped in migration 007 (itp_register, hold_witness_register,
+identified_records_register, ...) re-joined public.assets and public.asset_edges
+on every read. Reporting jobs instead load a project once with two COPY streams
+(current assets, then their edges, in one REPEATABLE READ snapshot) and answer
+traversals such as lot -> inspection points -> test results from memory.
+
+Assets are numbered 0..n-1 in load order; UUIDs are only kept to map results
+back. Edges are stored in compressed sparse row form in both directions: for
+node i, out_targets[out_offsets[i]:out_offsets[i + 1]] are its successors and
+out_types the matching edge-type codes (in_* likewise for predecessors), all
+in stdlib arrays rather than per-node dicts.
+
+test_result rows link to their lot through the lot_asset_id column (migration
+011) rather than an edge; the loader adds those links as LOT_ASSET_ID edges
+(test_result -> lot) so they traverse like any other edge.
+
+Usage:
+    python asset_graph.py <project_id> [--lots]
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from array import array
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Tuple
+
+import psycopg2
+
+from asset_repo import get_database_url
+
+
+# Pseudo edge type for test_result.lot_asset_id links
+LOT_ASSET_ID_EDGE = "LOT_ASSET_ID"
+
+LOT_INSPECTION_EDGES = ("BLOCKED_BY", "REFERENCES")
+
+ASSETS_COPY_SQL = """
+COPY (
+  SELECT id, type, subtype, name, status, approval_state, lot_asset_id, content
+  FROM public.assets
+  WHERE (project_id = {project_id} OR id = {project_id}) AND is_current AND NOT is_deleted
+) TO STDOUT
+"""
+
+# Both endpoints are filtered against the loaded assets in Python, which is cheaper than
+# a second join on public.assets here
+EDGES_COPY_SQL = """
+COPY (
+  SELECT e.from_asset_id, e.to_asset_id, e.edge_type
+  FROM public.asset_edges e
+  JOIN public.assets a ON a.id = e.from_asset_id
+  WHERE (a.project_id = {project_id} OR a.id = {project_id}) AND a.is_current AND NOT a.is_deleted
+) TO STDOUT
+"""
+
+_COPY_ESCAPE = re.compile(r"\\(.)")
+_COPY_UNESCAPE = {"b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v"}
+
+
+def _copy_field(value: str) -> Optional[str]:
+    """Decode one COPY text-format field (inverse of asset_repo.copy_text_value)."""
+    if value == "\\N":
+        return None
+    if "\\" not in value:
+        return value
+    return _COPY_ESCAPE.sub(lambda m: _COPY_UNESCAPE.get(m.group(1), m.group(1)), value)
+
+
+class CopyRowSink:
+    """File-like target for COPY TO STDOUT that hands each decoded row to a callback as it arrives."""
+
+    def __init__(self, on_row):
+        self._on_row = on_row
+        self._partial = ""
+        self.rows = 0
+
+    def write(self, data) -> int:
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        lines = (self._partial + data).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._on_row([_copy_field(v) for v in line.split("\t")])
+            self.rows += 1
+        return len(data)
+
+
+def _csr(n: int, sources: array, targets: array, types: array) -> Tuple[array, array, array]:
+    """Counting-sort edges by source into (offsets, targets, types)."""
+    offsets = array("l", bytes(array("l").itemsize * (n + 1)))
+    for s in sources:
+        offsets[s + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+    cursor = array("l", offsets[:n])
+    out_targets = array("l", bytes(array("l").itemsize * len(sources)))
+    out_types = array("H", bytes(array("H").itemsize * len(sources)))
+    for s, t, k in zip(sources, targets, types):
+        pos = cursor[s]
+        out_targets[pos] = t
+        out_types[pos] = k
+        cursor[s] = pos + 1
+    return offsets, out_targets, out_types
+
+
+class AssetGraphSnapshot:
+    """Read-only CSR graph over a project's current assets and edges."""
+
+    def __init__(self, project_id: str):
+        self.project_id = project_id
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.type_names: List[str] = []
+        self.edge_type_names: List[str] = []
+        self.node_types = array("H")
+        self._type_codes: Dict[str, int] = {}
+        self._edge_type_codes: Dict[str, int] = {}
+        self._attrs: List[Tuple[Optional[str], ...]] = []
+        self._content: List[Optional[str]] = []
+        self._lot_ids: List[Optional[str]] = []
+        self.out_offsets = self.out_targets = self.out_types = array("l")
+        self.in_offsets = self.in_targets = self.in_types = array("l")
+        self.skipped_edges = 0
+        self.loaded_at: Optional[float] = None
+
+    def _code(self, codes: Dict[str, int], names: List[str], name: str) -> int:
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    def _add_asset(self, row: List[Optional[str]]) -> None:
+        asset_id, type_, subtype, name, status, approval_state, lot_asset_id, content = row
+        self.index[asset_id] = len(self.ids)
+        self.ids.append(asset_id)
+        self.node_types.append(self._code(self._type_codes, self.type_names, type_))
+        self._attrs.append((subtype, name, status, approval_state))
+        self._lot_ids.append(lot_asset_id)
+        self._content.append(content)
+
+    def load(self, conn: Any, own_transaction: bool = True) -> "AssetGraphSnapshot":
+        """Populate the snapshot from conn with two COPY streams in one read-only transaction.
+
+        With own_transaction=False the caller's open transaction supplies the snapshot: it should
+        already be REPEATABLE READ (or stricter) so both COPYs agree, and it is neither committed
+        nor rolled back here.
+        """
+        sources, targets, types = array("l"), array("l"), array("H")
+        skipped = 0
+
+        def add_edge(row: List[Optional[str]]) -> None:
+            nonlocal skipped
+            s, t = self.index.get(row[0]), self.index.get(row[1])
+            if s is None or t is None:
+                skipped += 1
+                return
+            sources.append(s)
+            targets.append(t)
+            types.append(self._code(self._edge_type_codes, self.edge_type_names, row[2]))
+
+        try:
+            with conn.cursor() as cursor:
+                if own_transaction:
+                    # Both COPYs must see the same snapshot or edges could point at unseen rows
+                    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+                project = cursor.mogrify("%s::uuid", (self.project_id,)).decode()
+                cursor.copy_expert(ASSETS_COPY_SQL.format(project_id=project), CopyRowSink(self._add_asset))
+                cursor.copy_expert(EDGES_COPY_SQL.format(project_id=project), CopyRowSink(add_edge))
+            if own_transaction:
+                conn.commit()
+        except Exception:
+            if own_transaction:
+                conn.rollback()
+            raise
+
+        lot_edge = self._code(self._edge_type_codes, self.edge_type_names, LOT_ASSET_ID_EDGE)
+        for i, lot_id in enumerate(self._lot_ids):
+            lot = self.index.get(lot_id) if lot_id else None
+            if lot is not None:
+                sources.append(i)
+                targets.append(lot)
+                types.append(lot_edge)
+        self._lot_ids = []
+
+        n = len(self.ids)
+        self.out_offsets, self.out_targets, self.out_types = _csr(n, sources, targets, types)
+        self.in_offsets, self.in_targets, self.in_types = _csr(n, targets, sources, types)
+        self.skipped_edges = skipped
+        self.loaded_at = time.time()
+        return self
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.out_targets)
+
+    def type_of(self, node: int) -> str:
+        return self.type_names[self.node_types[node]]
+
+    def content(self, node: int) -> Dict[str, Any]:
+        raw = self._content[node]
+        return json.loads(raw) if raw else {}
+
+    def asset(self, node: int, with_content: bool = False) -> Dict[str, Any]:
+        subtype, name, status, approval_state = self._attrs[node]
+        row = {
+            "id": self.ids[node],
+            "type": self.type_of(node),
+            "subtype": subtype,
+            "name": name,
+            "status": status,
+            "approval_state": approval_state,
+        }
+        if with_content:
+            row["content"] = self.content(node)
+        return row
+
+    def nodes_of_type(self, type_: str) -> Iterator[int]:
+        code = self._type_codes.get(type_)
+        if code is None:
+            return iter(())
+        return (i for i, t in enumerate(self.node_types) if t == code)
+
+    def _edge_codes(self, edge_types: Optional[Iterable[str]]) -> Optional[set]:
+        if edge_types is None:
+            return None
+        return {self._edge_type_codes[t] for t in edge_types if t in self._edge_type_codes}
+
+    def neighbors(
+        self,
+        node: int,
+        edge_types: Optional[Iterable[str]] = None,
+        direction: str = "out",
+        node_type: Optional[str] = None,
+    ) -> List[int]:
+        """Distinct neighbours of node over edge_types; direction is out, in or both."""
+        codes = self._edge_codes(edge_types)
+        want = self._type_codes.get(node_type, -1) if node_type else None
+        found: Dict[int, None] = {}
+        sides = []
+        if direction in ("out", "both"):
+            sides.append((self.out_offsets, self.out_targets, self.out_types))
+        if direction in ("in", "both"):
+            sides.append((self.in_offsets, self.in_targets, self.in_types))
+        for offsets, nbrs, types in sides:
+            for pos in range(offsets[node], offsets[node + 1]):
+                if codes is not None and types[pos] not in codes:
+                    continue
+                other = nbrs[pos]
+                if want is not None and self.node_types[other] != want:
+                    continue
+                found[other] = None
+        return list(found)
+
+    def traverse(self, start: Iterable[int], steps: List[Tuple[Iterable[str], str, Optional[str]]]) -> List[List[int]]:
+        """Follow (edge_types, direction, node_type) hops from start; returns the node set reached at each hop."""
+        frontier = list(dict.fromkeys(start))
+        reached = []
+        for edge_types, direction, node_type in steps:
+            edge_types = tuple(edge_types)
+            nxt: Dict[int, None] = {}
+            for node in frontier:
+                for other in self.neighbors(node, edge_types, direction, node_type):
+                    nxt[other] = None
+            frontier = list(nxt)
+            reached.append(frontier)
+        return reached
+
+    def lot_register(self) -> List[Dict[str, Any]]:
+        """Rows shaped like public.work_lot_register, computed from the snapshot."""
+        rows = []
+        for lot in self.nodes_of_type("lot"):
+            content = self.content(lot)
+            points = self.neighbors(lot, LOT_INSPECTION_EDGES, "both", "inspection_point")
+            results = self.neighbors(lot, (LOT_ASSET_ID_EDGE,), "in", "test_result")
+            rows.append({
+                "lot_asset_id": self.ids[lot],
+                "lot_name": self._attrs[lot][1],
+                "lot_number": content.get("lot_number"),
+                "lot_status": content.get("status"),
+                "approval_state": self._attrs[lot][3],
+                "inspection_points": [self._inspection_point(ip) for ip in points],
+                "test_results": [self.content(tr) for tr in results],
+            })
+        return rows
+
+    def _inspection_point(self, node: int) -> Dict[str, Any]:
+        content = self.content(node)
+        return {
+            "inspection_point_id": self.ids[node],
+            "code": content.get("code"),
+            "title": content.get("title"),
+            "point_type": content.get("point_type"),
+            "sla_due_at": content.get("sla_due_at"),
+            "notified_at": content.get("notified_at"),
+            "released_at": content.get("released_at"),
+            "approval_state": self._attrs[node][3],
+        }
+
+
+def load_snapshot(project_id: str, conn: Optional[Any] = None) -> AssetGraphSnapshot:
+    """Load a project snapshot, opening a short-lived connection when conn is None.
+
+    A caller-supplied conn is read inside its current transaction, which must already be
+    REPEATABLE READ for the asset and edge streams to share one snapshot.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = psycopg2.connect(get_database_url())
+    try:
+        return AssetGraphSnapshot(project_id).load(conn, own_transaction=own_conn)
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load a project's asset graph into memory and report on it.")
+    parser.add_argument("project_id", help="Project UUID")
+    parser.add_argument("--lots", action="store_true", help="Print the lot register as JSON")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        snapshot = load_snapshot(args.project_id)
+    except psycopg2.Error as e:
+        print(f"Error loading snapshot: {e}")
+        return 1
+    elapsed = time.perf_counter() - started
+
+    if args.lots:
+        print(json.dumps(snapshot.lot_register(), indent=2, default=str))
+        return 0
+    print(f"Loaded {len(snapshot)} assets, {snapshot.edge_count} edges in {elapsed:.2f}s "
+          f"({snapshot.skipped_edges} edges leave the project)")
+    for type_ in sorted(snapshot.type_names):
+        print(f"  {type_:30s} {sum(1 for _ in snapshot.nodes_of_type(type_))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
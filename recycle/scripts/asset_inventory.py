@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Asset inventory in one round trip.
+
+Replaces the ad-hoc check_assets.py / check_latest.py / simple_check.py /
+query_db2.py reports, which between them ran a COUNT or GROUP BY scan of
+public.assets per section and fetched content once per listed asset. Here a
+single CTE query scans the (optionally project-scoped) assets once and returns
+per-type counts and recency windows, content key summaries, edge-type
+histograms and processing-run stats as one JSON document.
+
+Processing runs are read from assets of type 'processing_run' (the
+processing_runs table was dropped in migration 006) plus their
+OUTPUT_OF/GENERATED_FROM edges.
+
+Usage:
+    python asset_inventory.py [--project <uuid>] [--format table|json] [--keys N]
+"""
+
+import argparse
+import json
+import sys
+
+import psycopg2
+
+from asset_repo import get_database_url
+
+
+INVENTORY_SQL = """
+WITH scoped AS (
+  SELECT id, type, subtype, status, is_current, is_deleted, project_id, created_at
+  FROM public.assets
+  WHERE %(project_id)s::uuid IS NULL OR project_id = %(project_id)s::uuid
+),
+totals AS (
+  SELECT count(*) AS assets,
+         count(*) FILTER (WHERE is_current AND NOT is_deleted) AS current_assets,
+         count(DISTINCT project_id) AS projects_with_assets,
+         count(*) FILTER (WHERE type = 'plan' AND project_id IS NULL AND is_current AND NOT is_deleted) AS orphaned_plans,
+         max(created_at) AS latest_created_at
+  FROM scoped
+),
+type_counts AS (
+  SELECT type,
+         count(*) AS total,
+         count(*) FILTER (WHERE is_current AND NOT is_deleted) AS current,
+         count(*) FILTER (WHERE created_at > now() - interval '10 minutes') AS last_10m,
+         count(*) FILTER (WHERE created_at > now() - interval '1 hour') AS last_1h,
+         count(*) FILTER (WHERE created_at > now() - interval '24 hours') AS last_24h,
+         max(created_at) AS latest_created_at,
+         array_remove(array_agg(DISTINCT subtype), NULL) AS subtypes
+  FROM scoped
+  GROUP BY type
+),
+-- content is read (and detoasted) only here, for current rows
+content_keys AS (
+  SELECT a.type, k.key, count(*) AS n
+  FROM public.assets a
+  CROSS JOIN LATERAL jsonb_object_keys(
+    CASE WHEN jsonb_typeof(a.content) = 'object' THEN a.content ELSE '{}'::jsonb END
+  ) AS k(key)
+  WHERE a.is_current AND NOT a.is_deleted
+    AND (%(project_id)s::uuid IS NULL OR a.project_id = %(project_id)s::uuid)
+  GROUP BY a.type, k.key
+),
+ranked_keys AS (
+  SELECT type, key, n, row_number() OVER (PARTITION BY type ORDER BY n DESC, key) AS rn
+  FROM content_keys
+),
+edge_hist AS (
+  SELECT e.edge_type, count(*) AS n
+  FROM public.asset_edges e
+  WHERE %(project_id)s::uuid IS NULL OR e.from_asset_id IN (SELECT id FROM scoped)
+  GROUP BY e.edge_type
+),
+runs AS (
+  SELECT COALESCE(status, 'unknown') AS status, count(*) AS n, max(created_at) AS latest_created_at
+  FROM scoped
+  WHERE type = 'processing_run'
+  GROUP BY COALESCE(status, 'unknown')
+)
+SELECT jsonb_build_object(
+  'project_id', %(project_id)s::uuid,
+  'generated_at', now(),
+  'totals', (SELECT to_jsonb(t) FROM totals t),
+  'types', (SELECT COALESCE(jsonb_agg(to_jsonb(tc) ORDER BY tc.total DESC, tc.type), '[]'::jsonb) FROM type_counts tc),
+  'content_keys', (
+    SELECT COALESCE(jsonb_object_agg(type, keys), '{}'::jsonb)
+    FROM (
+      SELECT type, jsonb_object_agg(key, n) AS keys
+      FROM ranked_keys WHERE rn <= %(max_keys)s
+      GROUP BY type
+    ) per_type
+  ),
+  'edges', (SELECT COALESCE(jsonb_object_agg(edge_type, n), '{}'::jsonb) FROM edge_hist),
+  'processing_runs', jsonb_build_object(
+    'by_status', (SELECT COALESCE(jsonb_object_agg(status, n), '{}'::jsonb) FROM runs),
+    'latest_created_at', (SELECT max(latest_created_at) FROM runs),
+    'generated_assets', (SELECT COALESCE(sum(n), 0) FROM edge_hist WHERE edge_type IN ('OUTPUT_OF', 'GENERATED_FROM'))
+  )
+)
+"""
+
+
+def get_inventory(conn, project_id=None, max_keys=10):
+    with conn.cursor() as cursor:
+        cursor.execute(INVENTORY_SQL, {"project_id": project_id, "max_keys": max_keys})
+        return cursor.fetchone()[0]
+
+
+def _by_count(counts):
+    # jsonb objects don't keep insertion order
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+def print_table(inventory):
+    totals = inventory["totals"]
+    scope = f"project {inventory['project_id']}" if inventory["project_id"] else "all projects"
+    print("🔍 ASSET INVENTORY")
+    print("=" * 60)
+    print(f"Scope: {scope}")
+    print(f"Generated: {inventory['generated_at']}")
+    print("=" * 60)
+    print(f"📊 TOTAL ASSETS: {totals['assets']} ({totals['current_assets']} current)")
+    print(f"🏗️  Projects with assets: {totals['projects_with_assets']}")
+    if totals["orphaned_plans"]:
+        print(f"⚠️  Orphaned plans (no project): {totals['orphaned_plans']}")
+
+    print("\n📋 ASSETS BY TYPE:")
+    print(f"   {'type':<28}{'total':>8}{'current':>9}{'10m':>6}{'1h':>6}{'24h':>6}")
+    for row in inventory["types"]:
+        print(f"   {row['type']:<28}{row['total']:>8}{row['current']:>9}"
+              f"{row['last_10m']:>6}{row['last_1h']:>6}{row['last_24h']:>6}")
+        if row["subtypes"]:
+            print(f"     └─ subtypes: {', '.join(row['subtypes'])}")
+
+    print("\n🔑 CONTENT KEYS (current assets):")
+    for asset_type, keys in sorted(inventory["content_keys"].items()):
+        summary = ", ".join(f"{key} ({n})" for key, n in _by_count(keys))
+        print(f"   • {asset_type}: {summary}")
+
+    print("\n🔗 EDGE TYPES:")
+    if inventory["edges"]:
+        for edge_type, n in _by_count(inventory["edges"]):
+            print(f"   • {edge_type}: {n}")
+    else:
+        print("   No edges found")
+
+    runs = inventory["processing_runs"]
+    print("\n⚙️  PROCESSING RUNS:")
+    if runs["by_status"]:
+        for status, n in _by_count(runs["by_status"]):
+            print(f"   • {status}: {n}")
+        print(f"   Latest run: {runs['latest_created_at']}")
+    else:
+        print("   No processing runs recorded")
+    print(f"   Assets generated by processing: {runs['generated_assets']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Single-query inventory of public.assets and asset_edges.")
+    parser.add_argument("--project", help="Restrict the inventory to one project_id")
+    parser.add_argument("--format", choices=["table", "json"], default="table", help="Output format (default: table)")
+    parser.add_argument("--keys", type=int, default=10, help="Content keys to list per asset type (default: 10)")
+    args = parser.parse_args()
+
+    try:
+        conn = psycopg2.connect(get_database_url())
+    except psycopg2.Error as e:
+        print(f"❌ Database connection error: {e}")
+        return 1
+    try:
+        inventory = get_inventory(conn, project_id=args.project, max_keys=max(1, args.keys))
+    except psycopg2.Error as e:
+        print(f"❌ Inventory query failed: {e}")
+        return 1
+    finally:
+        conn.close()
+
+    if args.format == "json":
+        print(json.dumps(inventory, indent=2, default=str))
+    else:
+        print_table(inventory)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
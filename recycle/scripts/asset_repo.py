@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+"""
+Bulk write path for IdempotentAssetWriteSpec batches.
+
+upsertAssetsAndEdges writes one spec at a time, which is fine for the handful of
+assets a subgraph usually emits but takes minutes once WBS/LBS/ITP output runs
+into thousands of nodes. upsertAssetsAndEdgesBulk streams the whole batch into
+temp staging tables with COPY and merges it into public.assets/public.asset_edges
+with one set-based statement per table, keeping the uq_assets_idem
+(project_id, type, idempotency_key) upsert semantics and returning one result
+per spec in input order.
+
+Specs are read by attribute (or key), so IdempotentAssetWriteSpec instances and
+plain dicts with the same fields both work.
+
+Connections come from a process-wide ConnectionPool (get_pool()) so subgraph
+persistence calls and the verify/harness scripts stop paying a TCP+auth
+handshake per call. Pool size and housekeeping are configured through
+DB_POOL_MIN, DB_POOL_MAX, DB_POOL_MAX_IDLE_S and DB_POOL_HEALTH_CHECK_S.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Iterable, Iterator
+
+import psycopg2
+import psycopg2.extensions
+
+
+ASSET_STAGE_COLUMNS = [
+    "ord", "id", "type", "subtype", "name", "description", "project_id",
+    "organization_id", "idempotency_key", "metadata", "content",
+]
+
+EDGE_STAGE_COLUMNS = [
+    "spec_ord", "from_asset_id", "to_asset_id", "edge_type", "properties", "idempotency_key",
+]
+
+
+def get_database_url() -> str:
+    url = os.getenv("DATABASE_URL")
+    if url:
+        if url.startswith("postgres://"):
+            url = url.replace("postgres://", "postgresql://", 1)
+        return url
+    host = os.getenv("DB_HOST", "localhost")
+    port = os.getenv("DB_PORT", "5555")
+    user = os.getenv("DB_USER", "postgres")
+    password = os.getenv("DB_PASSWORD", "password")
+    database = os.getenv("DB_NAME", "projectpro")
+    return f"postgresql://{user}:{password}@{host}:{port}/{database}"
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 connection pool with health checks and idle reaping.
+
+    Connections idle for longer than health_check_s are pinged with SELECT 1
+    before being handed out; idle connections above min_size are closed once
+    they have sat unused for max_idle_s.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        max_idle_s: float = 300.0,
+        health_check_s: float = 30.0,
+    ):
+        self.dsn = dsn
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.max_idle_s = max_idle_s
+        self.health_check_s = health_check_s
+        self._cond = threading.Condition()
+        self._idle: deque = deque()  # (conn, last_used) pairs, most recently used on the right
+        self._size = 0
+        self._closed = False
+        self._metrics = {
+            "checkouts": 0,
+            "wait_time_s": 0.0,
+            "max_wait_s": 0.0,
+            "timeouts": 0,
+            "connections_opened": 0,
+            "connections_closed": 0,
+            "health_check_failures": 0,
+        }
+        for _ in range(self.min_size):
+            conn = psycopg2.connect(self.dsn)
+            with self._cond:
+                self._size += 1
+                self._metrics["connections_opened"] += 1
+                self._idle.append((conn, time.monotonic()))
+
+    def _open_reserved(self):
+        """Connect for a slot already counted in _size; called without the lock held."""
+        try:
+            conn = psycopg2.connect(self.dsn)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._metrics["connections_opened"] += 1
+        return conn
+
+    def _discard(self, conn) -> None:
+        self._size -= 1
+        self._metrics["connections_closed"] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _healthy(self, conn, last_used: float) -> bool:
+        """Ping a checked-out connection; called without the lock held."""
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_s:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            with self._cond:
+                self._metrics["health_check_failures"] += 1
+            return False
+
+    def _reap_locked(self) -> None:
+        now = time.monotonic()
+        # Oldest idle connections sit on the left
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.max_idle_s:
+            conn, _ = self._idle.popleft()
+            self._discard(conn)
+
+    def reap(self) -> None:
+        """Close connections that have been idle longer than max_idle_s (keeps min_size)."""
+        with self._cond:
+            self._reap_locked()
+
+    def getconn(self, timeout: Optional[float] = 30.0):
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        # Only slot bookkeeping happens under the lock; connecting and pinging happen
+        # outside it so one slow handshake does not stall every other checkout/return
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("connection pool is closed")
+                self._reap_locked()
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn, last_used = None, 0.0
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._metrics["timeouts"] += 1
+                    raise PoolTimeout(f"no connection available within {timeout}s (max_size={self.max_size})")
+                self._cond.wait(remaining)
+
+        if conn is not None and not self._healthy(conn, last_used):
+            # Keep the slot and replace the dead connection
+            try:
+                conn.close()
+            except Exception:
+                pass
+            with self._cond:
+                self._metrics["connections_closed"] += 1
+            conn = None
+        if conn is None:
+            conn = self._open_reserved()
+
+        waited = time.monotonic() - started
+        with self._cond:
+            self._metrics["checkouts"] += 1
+            self._metrics["wait_time_s"] += waited
+            self._metrics["max_wait_s"] = max(self._metrics["max_wait_s"], waited)
+        return conn
+
+    def putconn(self, conn) -> None:
+        reusable = not conn.closed
+        if reusable:
+            try:
+                # Never hand out a connection that is mid-transaction
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                reusable = False
+        with self._cond:
+            if self._closed or not reusable:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._reap_locked()
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = 30.0):
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._metrics)
+            stats["size"] = self._size
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._size - len(self._idle)
+            checkouts = stats["checkouts"]
+            stats["avg_wait_ms"] = round(stats["wait_time_s"] * 1000 / checkouts, 3) if checkouts else 0.0
+            return stats
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._closed:
+            _pool = ConnectionPool(
+                get_database_url(),
+                min_size=int(os.getenv("DB_POOL_MIN", "1")),
+                max_size=int(os.getenv("DB_POOL_MAX", "10")),
+                max_idle_s=float(os.getenv("DB_POOL_MAX_IDLE_S", "300")),
+                health_check_s=float(os.getenv("DB_POOL_HEALTH_CHECK_S", "30")),
+            )
+        return _pool
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Pool metrics (checkouts, wait time, sizes); empty if the pool was never used."""
+    with _pool_lock:
+        return _pool.stats() if _pool is not None else {}
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def _field(obj: Any, name: str, default: Any = None) -> Any:
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def copy_text_value(value: Any) -> str:
+    """Render a value for COPY text format (tab separated, \\N for NULL)."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, default=str, ensure_ascii=False)
+    else:
+        value = str(value)
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class CopyStream:
+    """File-like object that feeds COPY FROM STDIN from a row iterator without buffering the batch."""
+
+    def __init__(self, rows: Iterable[List[Any]]):
+        self._rows: Iterator[List[Any]] = iter(rows)
+        self._pending = b""
+
+    def _next_line(self) -> bytes:
+        row = next(self._rows, None)
+        if row is None:
+            return b""
+        return ("\t".join(copy_text_value(v) for v in row) + "\n").encode("utf-8")
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._pending) < size:
+            line = self._next_line()
+            if not line:
+                break
+            self._pending += line
+        if size < 0:
+            data, self._pending = self._pending, b""
+        else:
+            data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+
+def _asset_rows(specs: List[Any]) -> Iterator[List[Any]]:
+    for ord_, spec in enumerate(specs):
+        # Prefer the nested catalog shape (spec.asset) when present
+        asset = _field(spec, "asset") or spec
+        metadata = dict(_field(asset, "metadata") or {})
+        # assets has no description column; the merge folds it into metadata
+        description = _field(asset, "description")
+        yield [
+            ord_,
+            str(uuid.uuid4()),
+            _field(asset, "asset_type") or _field(asset, "type"),
+            _field(asset, "asset_subtype") or _field(asset, "subtype"),
+            _field(asset, "name"),
+            description,
+            _field(asset, "project_id"),
+            _field(asset, "organization_id"),
+            _field(spec, "idempotency_key") or _field(asset, "idempotency_key"),
+            metadata,
+            _field(asset, "content") or {},
+        ]
+
+
+def _edge_rows(specs: List[Any]) -> Iterator[List[Any]]:
+    for ord_, spec in enumerate(specs):
+        for edge in _field(spec, "edges") or []:
+            yield [
+                ord_,
+                _field(edge, "from_asset_id"),
+                _field(edge, "to_asset_id"),
+                _field(edge, "edge_type"),
+                _field(edge, "properties") or {},
+                _field(edge, "idempotency_key"),
+            ]
+
+
+STAGE_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS _asset_stage (
+  ord int NOT NULL,
+  id uuid NOT NULL,
+  type text NOT NULL,
+  subtype text,
+  name text NOT NULL,
+  description text,
+  project_id uuid,
+  organization_id uuid,
+  idempotency_key text,
+  metadata jsonb,
+  content jsonb
+) ON COMMIT DROP;
+CREATE TEMP TABLE IF NOT EXISTS _edge_stage (
+  spec_ord int NOT NULL,
+  from_asset_id uuid,
+  to_asset_id uuid,
+  edge_type text NOT NULL,
+  properties jsonb,
+  idempotency_key text
+) ON COMMIT DROP;
+"""
+
+# Later specs win when a batch repeats an idempotency key, mirroring what sequential
+# upserts would leave behind; ON CONFLICT cannot touch the same row twice otherwise.
+MERGE_ASSETS_SQL = """
+WITH src AS (
+  SELECT DISTINCT ON (project_id, type, COALESCE(idempotency_key, id::text)) *
+  FROM _asset_stage
+  ORDER BY project_id, type, COALESCE(idempotency_key, id::text), ord DESC
+)
+INSERT INTO public.assets AS a (
+  id, asset_uid, version, is_current, type, subtype, name, organization_id, project_id,
+  idempotency_key, metadata, content, created_at, updated_at
+)
+SELECT s.id, s.id, 1, true, s.type, s.subtype, s.name, s.organization_id, s.project_id,
+       s.idempotency_key,
+       CASE WHEN s.description IS NULL THEN COALESCE(s.metadata, '{}'::jsonb)
+            ELSE COALESCE(s.metadata, '{}'::jsonb) || jsonb_build_object('description', s.description) END,
+       COALESCE(s.content, '{}'::jsonb), now(), now()
+FROM src s
+ON CONFLICT (project_id, type, idempotency_key) WHERE idempotency_key IS NOT NULL
+DO UPDATE SET
+  subtype = EXCLUDED.subtype,
+  name = EXCLUDED.name,
+  metadata = EXCLUDED.metadata,
+  content = EXCLUDED.content,
+  updated_at = now()
+WHERE a.name IS DISTINCT FROM EXCLUDED.name
+   OR a.subtype IS DISTINCT FROM EXCLUDED.subtype
+   OR a.metadata IS DISTINCT FROM EXCLUDED.metadata
+   OR a.content IS DISTINCT FROM EXCLUDED.content
+RETURNING a.id, a.project_id, a.type, a.idempotency_key, (xmax = 0) AS inserted
+"""
+
+RESOLVE_ASSETS_SQL = """
+SELECT s.ord, COALESCE(a.id, s.id) AS asset_id
+FROM _asset_stage s
+LEFT JOIN public.assets a
+  ON s.idempotency_key IS NOT NULL
+ AND a.idempotency_key = s.idempotency_key
+ AND a.type = s.type
+ AND a.project_id IS NOT DISTINCT FROM s.project_id
+ORDER BY s.ord
+"""
+
+# Edges without an explicit key get a deterministic one so re-runs stay idempotent.
+MERGE_EDGES_SQL = """
+WITH src AS (
+  SELECT DISTINCT ON (e.edge_type, k.key)
+         e.from_asset_id, e.to_asset_id, e.edge_type, e.properties, k.key
+  FROM _edge_stage e
+  CROSS JOIN LATERAL (
+    SELECT COALESCE(e.idempotency_key,
+                    concat(e.edge_type, ':', e.from_asset_id::text, ':', e.to_asset_id::text)) AS key
+  ) k
+  WHERE e.from_asset_id IS NOT NULL AND e.to_asset_id IS NOT NULL
+  ORDER BY e.edge_type, k.key, e.spec_ord DESC
+)
+INSERT INTO public.asset_edges (id, from_asset_id, to_asset_id, edge_type, properties, idempotency_key)
+SELECT gen_random_uuid(), from_asset_id, to_asset_id, edge_type, COALESCE(properties, '{}'::jsonb), key
+FROM src
+ON CONFLICT (edge_type, idempotency_key) WHERE idempotency_key IS NOT NULL
+DO UPDATE SET
+  from_asset_id = EXCLUDED.from_asset_id,
+  to_asset_id = EXCLUDED.to_asset_id,
+  properties = EXCLUDED.properties
+"""
+
+
+def _written_actions(rows: Iterable[Any]) -> Dict[Any, str]:
+    """Map MERGE_ASSETS_SQL RETURNING rows to {(project_id, type, key): action}."""
+    return {
+        (str(row[1]) if row[1] else None, row[2], row[3]): ("inserted" if row[4] else "updated")
+        for row in rows
+    }
+
+
+def build_bulk_result(specs: List[Any], written: Dict[Any, str], resolved: Dict[int, str], edges_written: int) -> Dict[str, Any]:
+    """Assemble the per-spec result dict shared by the sync and async bulk paths."""
+    results = []
+    for ord_, row in enumerate(_asset_rows(specs)):
+        project_id = str(row[6]) if row[6] else None
+        results.append({
+            "idempotency_key": row[8],
+            "asset_id": resolved.get(ord_),
+            "action": written.get((project_id, row[2], row[8]), "unchanged" if row[8] else "inserted"),
+        })
+    return {
+        "success": True,
+        "results": results,
+        "assets_written": len(written),
+        "edges_written": edges_written,
+    }
+
+
+def upsertAssetsAndEdgesBulk(specs: List[Any], conn: Optional[Any] = None) -> Dict[str, Any]:
+    """Upsert a batch of write specs via COPY staging and set-based merges.
+
+    Returns {"success", "results", "assets_written", "edges_written"}; results holds
+    one {"idempotency_key", "asset_id", "action"} entry per spec, where action is
+    inserted, updated or unchanged.
+
+    With a caller-supplied conn the batch runs inside the caller's transaction and is
+    left uncommitted; a failure rolls back to a savepoint so that transaction stays
+    usable. conn must not be in autocommit mode.
+    """
+    if not specs:
+        return {"success": True, "results": [], "assets_written": 0, "edges_written": 0}
+
+    own_conn = conn is None
+    if own_conn:
+        conn = get_pool().getconn()
+    elif conn.autocommit:
+        # ON COMMIT DROP staging tables would vanish right after STAGE_DDL
+        raise ValueError("upsertAssetsAndEdgesBulk needs a connection with autocommit off")
+    try:
+        with conn.cursor() as cursor:
+            if not own_conn:
+                # Caller owns the transaction; a failed batch only unwinds to here
+                cursor.execute("SAVEPOINT upsert_assets_bulk")
+            cursor.execute(STAGE_DDL)
+            cursor.execute("TRUNCATE _asset_stage, _edge_stage")
+            cursor.copy_expert(
+                f"COPY _asset_stage ({', '.join(ASSET_STAGE_COLUMNS)}) FROM STDIN",
+                CopyStream(_asset_rows(specs)),
+            )
+            cursor.copy_expert(
+                f"COPY _edge_stage ({', '.join(EDGE_STAGE_COLUMNS)}) FROM STDIN",
+                CopyStream(_edge_rows(specs)),
+            )
+
+            cursor.execute(MERGE_ASSETS_SQL)
+            written = _written_actions(cursor.fetchall())
+
+            cursor.execute(RESOLVE_ASSETS_SQL)
+            resolved = {row[0]: str(row[1]) for row in cursor.fetchall()}
+
+            cursor.execute(MERGE_EDGES_SQL)
+            edges_written = cursor.rowcount
+
+            if not own_conn:
+                cursor.execute("RELEASE SAVEPOINT upsert_assets_bulk")
+
+        if own_conn:
+            conn.commit()
+    except Exception as e:
+        if own_conn:
+            conn.rollback()
+        else:
+            with conn.cursor() as cursor:
+                cursor.execute("ROLLBACK TO SAVEPOINT upsert_assets_bulk")
+        return {"success": False, "error": str(e), "results": []}
+    finally:
+        if own_conn:
+            get_pool().putconn(conn)
+
+    return build_bulk_result(specs, written, resolved, edges_written)
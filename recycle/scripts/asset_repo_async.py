@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Asyncio variant of the asset repository.
+
+Concurrent subgraphs running inside the LangGraph server's event loop can
+persist through upsertAssetsAndEdgesAsync without blocking the loop or hopping
+to a thread. It takes the same IdempotentAssetWriteSpec batches and returns the
+same result dict as asset_repo.upsertAssetsAndEdgesBulk, reusing its staging
+DDL and merge statements; rows are loaded with asyncpg's binary COPY and
+connections come from a process-wide asyncpg pool sized by the same DB_POOL_*
+environment variables.
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List
+
+import asyncpg
+
+from asset_repo import (
+    ASSET_STAGE_COLUMNS,
+    EDGE_STAGE_COLUMNS,
+    MERGE_ASSETS_SQL,
+    MERGE_EDGES_SQL,
+    RESOLVE_ASSETS_SQL,
+    STAGE_DDL,
+    _asset_rows,
+    _edge_rows,
+    _written_actions,
+    build_bulk_result,
+    get_database_url,
+)
+
+
+_UUID_COLUMNS = {"id", "project_id", "organization_id", "from_asset_id", "to_asset_id"}
+_JSON_COLUMNS = {"metadata", "content", "properties"}
+
+
+def _record(columns: List[str], row: List[Any]) -> tuple:
+    """Convert a staging row to the Python types asyncpg's binary COPY expects."""
+    values = []
+    for column, value in zip(columns, row):
+        if value is None:
+            values.append(None)
+        elif column in _UUID_COLUMNS:
+            values.append(value if isinstance(value, uuid.UUID) else uuid.UUID(str(value)))
+        elif column in _JSON_COLUMNS:
+            values.append(json.dumps(value, default=str, ensure_ascii=False))
+        elif isinstance(value, int):
+            values.append(value)
+        else:
+            values.append(str(value))
+    return tuple(values)
+
+
+class AsyncConnectionPool:
+    """asyncpg pool plus the checkout/wait metrics exposed by ConnectionPool.stats()."""
+
+    def __init__(self, pool: asyncpg.Pool):
+        self._pool = pool
+        self._metrics = {"checkouts": 0, "wait_time_s": 0.0, "max_wait_s": 0.0}
+
+    @asynccontextmanager
+    async def connection(self, timeout: Optional[float] = 30.0):
+        started = time.monotonic()
+        conn = await self._pool.acquire(timeout=timeout)
+        waited = time.monotonic() - started
+        self._metrics["checkouts"] += 1
+        self._metrics["wait_time_s"] += waited
+        self._metrics["max_wait_s"] = max(self._metrics["max_wait_s"], waited)
+        try:
+            yield conn
+        finally:
+            await self._pool.release(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._metrics)
+        stats["size"] = self._pool.get_size()
+        stats["idle"] = self._pool.get_idle_size()
+        stats["in_use"] = stats["size"] - stats["idle"]
+        checkouts = stats["checkouts"]
+        stats["avg_wait_ms"] = round(stats["wait_time_s"] * 1000 / checkouts, 3) if checkouts else 0.0
+        return stats
+
+    async def close(self) -> None:
+        await self._pool.close()
+
+
+_pool: Optional[AsyncConnectionPool] = None
+_pool_lock: Optional[asyncio.Lock] = None
+
+
+async def get_async_pool() -> AsyncConnectionPool:
+    """Return the process-wide async pool, creating it on first use.
+
+    asyncpg pools are bound to the loop they were created on, so this must be
+    awaited from the loop that will use it (the LangGraph server's).
+    """
+    global _pool, _pool_lock
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool is None:
+            pool = await asyncpg.create_pool(
+                get_database_url(),
+                min_size=int(os.getenv("DB_POOL_MIN", "1")),
+                max_size=int(os.getenv("DB_POOL_MAX", "10")),
+                # asyncpg closes idle connections itself and resets them on release
+                max_inactive_connection_lifetime=float(os.getenv("DB_POOL_MAX_IDLE_S", "300")),
+            )
+            _pool = AsyncConnectionPool(pool)
+        return _pool
+
+
+async def close_async_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+async def _upsert_on(conn: asyncpg.Connection, specs: List[Any]) -> Dict[str, Any]:
+    async with conn.transaction():
+        await conn.execute(STAGE_DDL)
+        await conn.execute("TRUNCATE _asset_stage, _edge_stage")
+        await conn.copy_records_to_table(
+            "_asset_stage",
+            records=(_record(ASSET_STAGE_COLUMNS, row) for row in _asset_rows(specs)),
+            columns=ASSET_STAGE_COLUMNS,
+        )
+        await conn.copy_records_to_table(
+            "_edge_stage",
+            records=(_record(EDGE_STAGE_COLUMNS, row) for row in _edge_rows(specs)),
+            columns=EDGE_STAGE_COLUMNS,
+        )
+
+        written = _written_actions(await conn.fetch(MERGE_ASSETS_SQL))
+        resolved = {row[0]: str(row[1]) for row in await conn.fetch(RESOLVE_ASSETS_SQL)}
+        status = await conn.execute(MERGE_EDGES_SQL)
+
+    # Command status looks like "INSERT 0 <rows>"
+    edges_written = int(status.split()[-1]) if status else 0
+    return build_bulk_result(specs, written, resolved, edges_written)
+
+
+async def upsertAssetsAndEdgesAsync(specs: List[Any], conn: Optional[asyncpg.Connection] = None) -> Dict[str, Any]:
+    """Async counterpart of upsertAssetsAndEdgesBulk with the same result shape."""
+    if not specs:
+        return {"success": True, "results": [], "assets_written": 0, "edges_written": 0}
+    try:
+        if conn is not None:
+            return await _upsert_on(conn, specs)
+        pool = await get_async_pool()
+        async with pool.connection() as pooled:
+            return await _upsert_on(pooled, specs)
+    except Exception as e:
+        return {"success": False, "error": str(e), "results": []}
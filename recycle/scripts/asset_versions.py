@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Version-chain reads over immutable asset rows.
+
+Every revision of an asset is its own public.assets row sharing asset_uid, with
+an increasing version, supersedes_asset_id pointing at the previous row and
+is_current set on the head only (uq_assets_current_head). These helpers return
+the head, one specific version, a page of history or a diff between two
+versions of a single asset_uid, and supersedeAssetVersions() writes version N+1
+for a batch of asset_uids in one call.
+
+History is paged newest first with a version cursor rather than OFFSET, so each
+page is one seek on idx_assets_uid_version_desc (migration 014) no matter how
+many revisions a long-lived document has accumulated.
+
+Connections come from asset_repo.get_pool(); pass conn to run inside an
+existing transaction.
+"""
+
+import json
+import random
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Iterator
+
+from asset_repo import get_pool
+
+
+VERSION_COLUMNS = [
+    "id", "asset_uid", "version", "is_current", "supersedes_asset_id", "version_label",
+    "effective_from", "effective_to", "type", "subtype", "name", "organization_id",
+    "project_id", "parent_asset_id", "document_number", "revision_code", "path_key",
+    "status", "approval_state", "classification", "idempotency_key", "metadata", "content",
+    "due_sla_at", "scheduled_at", "requested_for_at", "created_at", "created_by",
+    "updated_at", "updated_by", "is_deleted",
+]
+
+# Served from the INCLUDE columns of idx_assets_uid_version_desc
+HISTORY_COLUMNS = [
+    "id", "asset_uid", "version", "is_current", "supersedes_asset_id", "version_label",
+    "created_at", "created_by",
+]
+
+# Columns that differ between any two versions by construction; superseded rows also hand
+# their lookup keys to the head (migration 015)
+DIFF_IGNORED_COLUMNS = {
+    "id", "version", "is_current", "supersedes_asset_id", "created_at", "updated_at",
+    "idempotency_key", "path_key",
+}
+
+# Fields a supersede spec may set; anything left out is carried over from the previous version
+SUPERSEDE_FIELDS = [
+    "asset_uid", "expected_version", "name", "subtype", "status", "approval_state",
+    "version_label", "revision_code", "metadata", "content", "created_by",
+]
+
+# serialization_failure / deadlock_detected, plus head races on the version unique indexes
+RETRYABLE_PGCODES = {"40001", "40P01"}
+RETRYABLE_CONSTRAINTS = {"uq_assets_current_head", "uq_asset_uid_version"}
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+@contextmanager
+def _cursor(conn: Optional[Any]) -> Iterator[Any]:
+    own_conn = conn is None
+    if own_conn:
+        conn = get_pool().getconn()
+    try:
+        with conn.cursor() as cursor:
+            yield cursor
+        if own_conn:
+            conn.commit()
+    except Exception:
+        if own_conn:
+            conn.rollback()
+        raise
+    finally:
+        if own_conn:
+            get_pool().putconn(conn)
+
+
+def _rows(cursor: Any) -> List[Dict[str, Any]]:
+    names = [d[0] for d in cursor.description]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+def getAssetHead(asset_uid: str, conn: Optional[Any] = None) -> Dict[str, Any]:
+    """Return the current row of asset_uid as {"success", "asset"}; asset is None if unknown."""
+    try:
+        with _cursor(conn) as cursor:
+            cursor.execute(
+                f"SELECT {', '.join(VERSION_COLUMNS)} FROM public.assets WHERE asset_uid = %s AND is_current",
+                (asset_uid,),
+            )
+            rows = _rows(cursor)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+    return {"success": True, "asset": rows[0] if rows else None}
+
+
+def getAssetVersion(asset_uid: str, version: int, conn: Optional[Any] = None) -> Dict[str, Any]:
+    """Return one version of asset_uid as {"success", "asset"}; asset is None if it does not exist."""
+    try:
+        with _cursor(conn) as cursor:
+            cursor.execute(
+                f"SELECT {', '.join(VERSION_COLUMNS)} FROM public.assets WHERE asset_uid = %s AND version = %s",
+                (asset_uid, version),
+            )
+            rows = _rows(cursor)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+    return {"success": True, "asset": rows[0] if rows else None}
+
+
+def listAssetVersions(
+    asset_uid: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    before_version: Optional[int] = None,
+    conn: Optional[Any] = None,
+) -> Dict[str, Any]:
+    """Page through the history of asset_uid, newest first.
+
+    Returns {"success", "versions", "next_before_version"}; pass next_before_version
+    back as before_version for the following page. It is None on the last page.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    try:
+        with _cursor(conn) as cursor:
+            # One extra row tells whether another page follows
+            cursor.execute(
+                f"""
+                SELECT {', '.join(HISTORY_COLUMNS)}
+                FROM public.assets
+                WHERE asset_uid = %(asset_uid)s
+                  AND (%(before)s::int IS NULL OR version < %(before)s::int)
+                ORDER BY version DESC
+                LIMIT %(limit)s
+                """,
+                {"asset_uid": asset_uid, "before": before_version, "limit": limit + 1},
+            )
+            rows = _rows(cursor)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "success": True,
+        "versions": rows,
+        "next_before_version": rows[-1]["version"] if more else None,
+    }
+
+
+def _diff_object(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Top-level key diff of two jsonb objects."""
+    old = old or {}
+    new = new or {}
+    return {
+        "added": {k: new[k] for k in new.keys() - old.keys()},
+        "removed": {k: old[k] for k in old.keys() - new.keys()},
+        "changed": {
+            k: {"from": old[k], "to": new[k]}
+            for k in old.keys() & new.keys()
+            if old[k] != new[k]
+        },
+    }
+
+
+def diff_versions(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Diff two version rows: changed plain columns plus key-level metadata/content changes."""
+    columns = {}
+    for col in VERSION_COLUMNS:
+        if col in DIFF_IGNORED_COLUMNS or col in ("metadata", "content"):
+            continue
+        if old.get(col) != new.get(col):
+            columns[col] = {"from": old.get(col), "to": new.get(col)}
+    return {
+        "columns": columns,
+        "metadata": _diff_object(old.get("metadata"), new.get("metadata")),
+        "content": _diff_object(old.get("content"), new.get("content")),
+    }
+
+
+def diffAssetVersions(
+    asset_uid: str,
+    from_version: int,
+    to_version: Optional[int] = None,
+    conn: Optional[Any] = None,
+) -> Dict[str, Any]:
+    """Diff two versions of asset_uid; to_version defaults to the current head.
+
+    Returns {"success", "asset_uid", "from_version", "to_version", "diff"}, where diff
+    holds "columns" ({col: {"from", "to"}}) and "metadata"/"content" with
+    "added", "removed" and "changed" keys.
+    """
+    try:
+        with _cursor(conn) as cursor:
+            # Both rows in one probe; the head is matched by is_current when to_version is omitted
+            cursor.execute(
+                f"""
+                SELECT {', '.join(VERSION_COLUMNS)}
+                FROM public.assets
+                WHERE asset_uid = %(asset_uid)s
+                  AND (version = %(from)s
+                       OR (%(to)s::int IS NULL AND is_current)
+                       OR version = %(to)s::int)
+                """,
+                {"asset_uid": asset_uid, "from": from_version, "to": to_version},
+            )
+            rows = _rows(cursor)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+    by_version = {row["version"]: row for row in rows}
+    if to_version is None:
+        head = next((row for row in rows if row["is_current"]), None)
+        to_version = head["version"] if head else None
+    old, new = by_version.get(from_version), by_version.get(to_version)
+    if old is None or new is None:
+        missing = from_version if old is None else to_version
+        label = f"version {missing}" if missing is not None else "current version"
+        return {"success": False, "error": f"asset_uid {asset_uid} has no {label}"}
+
+    return {
+        "success": True,
+        "asset_uid": asset_uid,
+        "from_version": from_version,
+        "to_version": to_version,
+        "diff": diff_versions(old, new),
+    }
+
+
+def _retryable(exc: Exception) -> bool:
+    pgcode = getattr(exc, "pgcode", None)
+    if pgcode in RETRYABLE_PGCODES:
+        return True
+    diag = getattr(exc, "diag", None)
+    return pgcode == "23505" and getattr(diag, "constraint_name", None) in RETRYABLE_CONSTRAINTS
+
+
+SUPERSEDE_SQL = "SELECT * FROM public.supersede_asset_versions(%s::jsonb)"
+
+
+def _supersede_payload(specs: List[Any]) -> str:
+    rows = []
+    for spec in specs:
+        get = spec.get if isinstance(spec, dict) else lambda name: getattr(spec, name, None)
+        rows.append({name: get(name) for name in SUPERSEDE_FIELDS if get(name) is not None})
+    return json.dumps(rows, default=str)
+
+
+def _supersede_result(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "results": [
+            {
+                "asset_uid": row["asset_uid"],
+                "previous_asset_id": row["previous_asset_id"],
+                "asset_id": row["asset_id"],
+                "version": row["version"],
+            }
+            for row in rows
+        ],
+    }
+
+
+def supersedeAssetVersions(
+    specs: List[Any],
+    conn: Optional[Any] = None,
+    max_attempts: int = 3,
+) -> Dict[str, Any]:
+    """Create version N+1 for each spec's asset_uid in one round trip.
+
+    Each spec names an asset_uid plus any of name, subtype, status, approval_state,
+    version_label, revision_code, metadata, content and created_by; omitted fields
+    are copied from the current head. Set expected_version to fail the batch when
+    the head has moved on since it was read.
+
+    public.supersede_asset_versions() (migration 015) locks the heads, demotes them,
+    inserts the new rows and writes SUPERSEDES/VERSION_OF edges. Lock conflicts are
+    retried with jittered backoff when this function owns the connection. With a
+    caller's conn nothing is committed or retried: a failure rolls back to a
+    savepoint taken for this call and the error is returned.
+
+    Returns {"success", "results"} with one {"asset_uid", "previous_asset_id",
+    "asset_id", "version"} entry per spec, in input order.
+    """
+    if not specs:
+        return {"success": True, "results": []}
+
+    payload = _supersede_payload(specs)
+    if conn is not None:
+        # Caller owns the transaction: no commit, no retry, and a failure only unwinds this call
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SAVEPOINT supersede_asset_versions")
+                cursor.execute(SUPERSEDE_SQL, (payload,))
+                rows = _rows(cursor)
+                cursor.execute("RELEASE SAVEPOINT supersede_asset_versions")
+        except Exception as e:
+            with conn.cursor() as cursor:
+                cursor.execute("ROLLBACK TO SAVEPOINT supersede_asset_versions")
+            return {"success": False, "error": str(e), "results": []}
+        return _supersede_result(rows)
+
+    conn = get_pool().getconn()
+    try:
+        for attempt in range(1, max_attempts + 1):
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(SUPERSEDE_SQL, (payload,))
+                    rows = _rows(cursor)
+                conn.commit()
+                break
+            except Exception as e:
+                conn.rollback()
+                if attempt == max_attempts or not _retryable(e):
+                    return {"success": False, "error": str(e), "results": []}
+                time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+    finally:
+        get_pool().putconn(conn)
+
+    return _supersede_result(rows)
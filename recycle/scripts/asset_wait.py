@@ -0,0 +1,163 @@
+import json
+import os
+import select
+import time
+from typing import Optional, Dict, Any, List
+
+from sqlalchemy import create_engine, text
+
+
+# Fired once per (project_id, type) per statement by trg_assets_notify_written_ins/_upd
+# (migrations/009_asset_write_notify.sql)
+NOTIFY_CHANNEL = "asset_written"
+# Re-query this often even while listening, in case a notification was missed
+RECHECK_INTERVAL_S = 5.0
+POLL_INITIAL_S = 0.05
+POLL_MAX_S = 2.0
+
+_engine = None
+
+
+def get_db_url() -> str:
+    url = os.getenv("DATABASE_URL")
+    if url:
+        # Normalize scheme for SQLAlchemy if needed
+        if url.startswith("postgres://"):
+            url = url.replace("postgres://", "postgresql+psycopg2://", 1)
+        if url.startswith("postgresql://"):
+            url = url.replace("postgresql://", "postgresql+psycopg2://", 1)
+        return url
+    host = os.getenv("DB_HOST", "localhost")
+    port = os.getenv("DB_PORT", "5555")
+    user = os.getenv("DB_USER", "postgres")
+    password = os.getenv("DB_PASSWORD", "password")
+    database = os.getenv("DB_NAME", "projectpro")
+    return f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}"
+
+
+def get_engine():
+    """One engine per process instead of one per wait_for_row call."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(get_db_url())
+    return _engine
+
+
+class AssetWriteListener:
+    """Dedicated autocommit connection LISTENing on the asset_written channel."""
+
+    def __init__(self, engine):
+        self._raw = engine.raw_connection()
+        self._conn = getattr(self._raw, "driver_connection", None) or self._raw.connection
+        self._conn.autocommit = True
+        with self._conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+
+    def wait(self, timeout: float) -> List[Dict[str, Any]]:
+        """Block up to timeout seconds; return the decoded payloads received (empty on timeout)."""
+        if select.select([self._conn], [], [], max(0.0, timeout)) == ([], [], []):
+            return []
+        self._conn.poll()
+        events = []
+        while self._conn.notifies:
+            notify = self._conn.notifies.pop(0)
+            try:
+                events.append(json.loads(notify.payload))
+            except ValueError:
+                continue
+        return events
+
+    def close(self) -> None:
+        try:
+            with self._conn.cursor() as cursor:
+                cursor.execute(f"UNLISTEN {NOTIFY_CHANNEL}")
+            # The connection goes back to the engine's pool; hand it back as we found it
+            self._conn.autocommit = False
+        except Exception:
+            # Never return a connection in an unknown state to the pool
+            self._raw.invalidate()
+        self._raw.close()
+
+
+def _matches(event: Dict[str, Any], match: Dict[str, Any]) -> bool:
+    # Notifications only carry project_id and type; keys they lack cannot rule an event out
+    return all(
+        str(event[key]) == str(value)
+        for key, value in match.items()
+        if value is not None and key in event
+    )
+
+
+def _listen(engine) -> Optional[AssetWriteListener]:
+    try:
+        return AssetWriteListener(engine)
+    except Exception as e:
+        print({"wait_for_row": "notifications unavailable, falling back to polling", "error": str(e)})
+        return None
+
+
+class AssetWriteWaiter:
+    """Sleeps until a matching asset write is announced, or backs off when LISTEN is unavailable.
+
+    Create it before the first query so a write landing in between still wakes it.
+    """
+
+    def __init__(self, engine):
+        self._listener = _listen(engine)
+        self._delay = POLL_INITIAL_S
+
+    def wait(self, match: Dict[str, Any], remaining: float) -> None:
+        if self._listener is None:
+            time.sleep(min(self._delay, remaining))
+            self._delay = min(self._delay * 2, POLL_MAX_S)
+            return
+        recheck_at = time.monotonic() + min(remaining, RECHECK_INTERVAL_S)
+        try:
+            while True:
+                events = self._listener.wait(recheck_at - time.monotonic())
+                if not events or any(_matches(e, match) for e in events):
+                    return
+                # Unrelated writes must not keep us past the recheck (and the caller's deadline)
+                if time.monotonic() >= recheck_at:
+                    return
+        except Exception:
+            self._listener.close()
+            self._listener = None
+
+    def close(self) -> None:
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+
+def wait_for_row(
+    query: str,
+    params: Dict[str, Any],
+    timeout_s: int = 30,
+    match: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Return the first row of query, waiting up to timeout_s for a matching asset write.
+
+    The query is re-run only when an asset_written notification matches `match`
+    (defaults to the pid param as project_id; notifications carry only project_id
+    and type, so an idempotency_key in match is not used to filter), or every
+    RECHECK_INTERVAL_S as a safety net. If LISTEN is unavailable it polls with
+    exponential backoff instead.
+    """
+    if match is None:
+        match = {"project_id": params.get("pid")}
+    engine = get_engine()
+    deadline = time.monotonic() + timeout_s
+    waiter = AssetWriteWaiter(engine)
+    try:
+        with engine.connect() as conn:
+            while True:
+                row = conn.execute(text(query), params).mappings().fetchone()
+                if row:
+                    return dict(row)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                waiter.wait(match, remaining)
+    finally:
+        waiter.close()
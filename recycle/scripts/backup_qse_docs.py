@@ -4,16 +4,94 @@ Backup script for QSE documents from the assets table.
 
 This script exports all QSE documents (assets with metadata->>'category' = 'qse')
 to multiple formats for backup purposes.
+
+With --stream the documents are read through a named server-side cursor and each
+row is fanned out to the JSON, CSV and SQL writers in a single pass, so memory use
+stays flat no matter how large the corpus is. The CSV header (the union of
+flattened metadata/content keys) is collected during that pass: rows are spooled
+to a temp file and the CSV is written once the header is known. Counts and the
+summary's document numbers come from the same pass, inside one REPEATABLE READ
+snapshot.
+
+With --incremental the first run writes a full base backup and records a
+high-water mark (updated_at, asset_uid, version) in backups/qse_manifest.json;
+later runs export only rows past that mark into a *_delta directory and advance
+it. Nothing stamps updated_at at commit time (and now() is the transaction start),
+so a row written by a transaction that committed after the previous backup can
+sit just below its mark; each delta therefore re-reads a --overlap-seconds window
+below the mark. Restores upsert by id, so the re-read rows are harmless.
+--restore MANIFEST replays the base backup followed by its deltas.
+
+With --parallel the writers run concurrently in a thread pool, each fed from the
+shared row stream through a bounded queue. --compress gzip|zstd streams every
+output through a compressor (zstd needs the optional zstandard package) and
+--json-format jsonl writes compact JSON Lines instead of an indented array.
+
+The SQL dump is written as a COPY ... FROM stdin block by default (load it with
+restore_qse_dump.py, which can defer the per-row asset triggers and rebuild
+their derived columns and edges in bulk); --sql-format insert keeps the old
+one-INSERT-per-row output.
 """
 
 import psycopg2
 import psycopg2.extras
+import argparse
 import json
 import csv
+import gzip
+import io
 import os
+import queue
+import tempfile
+import textwrap
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
+from asset_repo import copy_text_value
+
+try:
+    import zstandard
+except ImportError:  # optional, only needed for --compress zstd
+    zstandard = None
+
+
+QSE_DOCUMENT_COLUMNS = [
+    "id",
+    "asset_uid",
+    "version",
+    "is_current",
+    "type",
+    "name",
+    "organization_id",
+    "project_id",
+    "document_number",
+    "revision_code",
+    "metadata",
+    "content",
+    "created_at",
+    "updated_at",
+]
+
+QSE_FILTER = "metadata->>'category' = 'qse'"
+
+# Keyset used for incremental backups; backed by idx_assets_qse_watermark (008 migration)
+WATERMARK_KEY = "(COALESCE(updated_at, created_at), asset_uid, version)"
+
+MANIFEST_NAME = "qse_manifest.json"
+
+COMPRESSION_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+# Rows buffered per writer when writers run in parallel; bounds memory to a few batches
+WRITER_QUEUE_SIZE = 256
+
+# Rows fetched per round trip by the server-side cursor in streaming mode
+STREAM_BATCH_SIZE = 200
+
+# Window re-read below the high-water mark on every delta, covering transactions that
+# started before the previous backup but committed after it
+DELTA_OVERLAP_S = 900
+
 
 def get_db_connection():
     """Get database connection."""
@@ -31,23 +109,10 @@ def get_qse_documents():
     conn = get_db_connection()
     try:
         with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-            cursor.execute("""
-                SELECT
-                    id,
-                    asset_uid,
-                    version,
-                    is_current,
-                    type,
-                    name,
-                    project_id,
-                    document_number,
-                    revision_code,
-                    metadata,
-                    content,
-                    created_at,
-                    updated_at
+            cursor.execute(f"""
+                SELECT {", ".join(QSE_DOCUMENT_COLUMNS)}
                 FROM assets
-                WHERE metadata->>'category' = 'qse'
+                WHERE {QSE_FILTER}
                 ORDER BY document_number, version
             """)
             return [dict(row) for row in cursor.fetchall()]
@@ -55,14 +120,329 @@ def get_qse_documents():
         conn.close()
 
 
+def qse_where(since=None, overlap_s=DELTA_OVERLAP_S):
+    """WHERE clause and params selecting QSE rows, optionally only those past a high-water mark
+    (less an overlap window of overlap_s seconds)."""
+    if not since:
+        return QSE_FILTER, ()
+    return (
+        f"{QSE_FILTER} AND COALESCE(updated_at, created_at) >= %s::timestamptz - make_interval(secs => %s)",
+        (since["updated_at"], overlap_s),
+    )
+
+
+def iter_qse_documents(conn, batch_size=STREAM_BATCH_SIZE, since=None, overlap_s=DELTA_OVERLAP_S):
+    """Yield QSE documents one at a time through a named server-side cursor."""
+    where, params = qse_where(since, overlap_s)
+    # Deltas follow the watermark key so a partial run still leaves a usable mark
+    order_by = WATERMARK_KEY if since else "document_number, version"
+    # Named cursors must live inside a transaction; the caller's connection provides it
+    with conn.cursor(name="qse_backup_stream", cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        cursor.itersize = batch_size
+        cursor.execute(f"""
+            SELECT {", ".join(QSE_DOCUMENT_COLUMNS)}
+            FROM assets
+            WHERE {where}
+            ORDER BY {order_by}
+        """, params)
+        for row in cursor:
+            yield dict(row)
+
+
+def watermark_of(doc):
+    """Sort key matching WATERMARK_KEY for one exported row (None when it has no timestamp)."""
+    stamp = doc.get('updated_at') or doc.get('created_at')
+    if stamp is None:
+        return None
+    return (stamp, str(doc.get('asset_uid')), doc.get('version'))
+
+
+def flatten_document(doc):
+    """Flatten metadata/content dicts into prefixed columns for CSV output."""
+    flat_doc = {}
+    for key, value in doc.items():
+        if isinstance(value, dict):
+            # Flatten metadata and content
+            for sub_key, sub_value in value.items():
+                flat_doc[f"{key}_{sub_key}"] = json.dumps(sub_value) if isinstance(sub_value, (dict, list)) else str(sub_value)
+        else:
+            flat_doc[key] = str(value) if value is not None else ''
+    return flat_doc
+
+
+def sql_insert_statement(doc):
+    """Render one document as an INSERT statement (None if it has no columns)."""
+    columns = []
+    values = []
+
+    for key, value in doc.items():
+        if value is not None:
+            columns.append(key)
+            if isinstance(value, dict):
+                escaped_value = json.dumps(value).replace("'", "''")
+                values.append(f"'{escaped_value}'::jsonb")
+            elif isinstance(value, str):
+                escaped_value = value.replace("'", "''")
+                values.append(f"'{escaped_value}'")
+            else:
+                values.append(str(value))
+
+    if not columns:
+        return None
+    return f"INSERT INTO assets ({', '.join(columns)}) VALUES ({', '.join(values)});\n"
+
+
+def open_backup_file(filepath, compression="none", newline=None):
+    """Open a text stream for writing, compressing on the fly when asked."""
+    if compression == "gzip":
+        return gzip.open(filepath, 'wt', encoding='utf-8', newline=newline)
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires the zstandard package (pip install zstandard)")
+        raw = open(filepath, 'wb')
+        stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8', newline=newline)
+    return open(filepath, 'w', encoding='utf-8', newline=newline)
+
+
+def open_backup_for_read(filepath):
+    """Open a (possibly compressed) backup file as text, picking the codec from its suffix."""
+    filepath = str(filepath)
+    if filepath.endswith(".gz"):
+        return gzip.open(filepath, 'rt', encoding='utf-8')
+    if filepath.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("reading .zst backups requires the zstandard package (pip install zstandard)")
+        stream = zstandard.ZstdDecompressor().stream_reader(open(filepath, 'rb'), closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    return open(filepath, 'r', encoding='utf-8')
+
+
+def iter_backup_documents(filepath):
+    """Yield documents from a .json array or .jsonl backup, compressed or not."""
+    with open_backup_for_read(filepath) as f:
+        if ".jsonl" in os.path.basename(str(filepath)):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
+
+
+def backup_filepath(output_dir, timestamp, extension, compression="none"):
+    return os.path.join(output_dir, f"qse_docs_backup_{timestamp}.{extension}{COMPRESSION_SUFFIXES[compression]}")
+
+
+class JsonBackupWriter:
+    """Writes documents as an indented JSON array, one element at a time."""
+
+    def __init__(self, output_dir, timestamp, compression="none"):
+        self.filepath = backup_filepath(output_dir, timestamp, "json", compression)
+        self.count = 0
+        self._f = open_backup_file(self.filepath, compression)
+        self._f.write("[")
+
+    def write(self, doc):
+        body = json.dumps(doc, indent=2, default=str, ensure_ascii=False)
+        self._f.write(",\n" if self.count else "\n")
+        self._f.write(textwrap.indent(body, "  "))
+        self.count += 1
+
+    def close(self):
+        self._f.write("\n]" if self.count else "]")
+        self._f.close()
+        return self.filepath
+
+
+class JsonLinesBackupWriter:
+    """Writes one compact JSON document per line."""
+
+    def __init__(self, output_dir, timestamp, compression="none"):
+        self.filepath = backup_filepath(output_dir, timestamp, "jsonl", compression)
+        self.count = 0
+        self._f = open_backup_file(self.filepath, compression)
+
+    def write(self, doc):
+        self._f.write(json.dumps(doc, separators=(",", ":"), default=str, ensure_ascii=False))
+        self._f.write("\n")
+        self.count += 1
+
+    def close(self):
+        self._f.close()
+        return self.filepath
+
+
+class CsvBackupWriter:
+    """Writes flattened documents as CSV rows.
+
+    With fieldnames the header is written up front. Without them rows are spooled
+    to a temp file while the union of their keys is collected, and the CSV is
+    written on close; close returns None when no rows were written.
+    """
+
+    def __init__(self, output_dir, timestamp, fieldnames=None, compression="none"):
+        self.filepath = backup_filepath(output_dir, timestamp, "csv", compression)
+        self.count = 0
+        self._compression = compression
+        self._spool = None
+        self._writer = None
+        if fieldnames is None:
+            self._fieldnames = set()
+            self._spool = tempfile.TemporaryFile(mode='w+', encoding='utf-8', dir=output_dir)
+        else:
+            self._open_csv(fieldnames)
+
+    def _open_csv(self, fieldnames):
+        self._f = open_backup_file(self.filepath, self._compression, newline='')
+        self._writer = csv.DictWriter(self._f, fieldnames=fieldnames, restval='', extrasaction='ignore')
+        self._writer.writeheader()
+
+    def write(self, doc):
+        flat_doc = flatten_document(doc)
+        if self._spool is not None:
+            self._fieldnames.update(flat_doc)
+            self._spool.write(json.dumps(flat_doc, ensure_ascii=False))
+            self._spool.write("\n")
+        else:
+            self._writer.writerow(flat_doc)
+        self.count += 1
+
+    def close(self):
+        if self._spool is None:
+            self._f.close()
+            return self.filepath
+        try:
+            if not self.count:
+                return None
+            self._open_csv(sorted(self._fieldnames))
+            self._spool.seek(0)
+            for line in self._spool:
+                self._writer.writerow(json.loads(line))
+            self._f.close()
+            return self.filepath
+        finally:
+            self._spool.close()
+
+
+class CopySqlBackupWriter:
+    """Writes documents as a single COPY public.assets ... FROM stdin block.
+
+    When total is not known up front (streaming) it is written as a trailing comment.
+    """
+
+    def __init__(self, output_dir, timestamp, total=None, compression="none"):
+        self.filepath = backup_filepath(output_dir, timestamp, "sql", compression)
+        self.count = 0
+        self._total_known = total is not None
+        self._f = open_backup_file(self.filepath, compression)
+        self._f.write("-- QSE Documents Backup (COPY format)\n")
+        self._f.write(f"-- Generated on {datetime.now().isoformat()}\n")
+        if self._total_known:
+            self._f.write(f"-- Total documents: {total}\n")
+        self._f.write("\n")
+        self._f.write(f"COPY public.assets ({', '.join(QSE_DOCUMENT_COLUMNS)}) FROM stdin;\n")
+
+    def write(self, doc):
+        self._f.write("\t".join(copy_text_value(doc.get(col)) for col in QSE_DOCUMENT_COLUMNS))
+        self._f.write("\n")
+        self.count += 1
+
+    def close(self):
+        self._f.write("\\.\n")
+        if not self._total_known:
+            self._f.write(f"\n-- Total documents: {self.count}\n")
+        self._f.close()
+        return self.filepath
+
+
+class SqlBackupWriter:
+    """Writes documents as INSERT statements (total trails the file when not known up front)."""
+
+    def __init__(self, output_dir, timestamp, total=None, compression="none"):
+        self.filepath = backup_filepath(output_dir, timestamp, "sql", compression)
+        self.count = 0
+        self._total_known = total is not None
+        self._f = open_backup_file(self.filepath, compression)
+        self._f.write("-- QSE Documents Backup\n")
+        self._f.write(f"-- Generated on {datetime.now().isoformat()}\n")
+        if self._total_known:
+            self._f.write(f"-- Total documents: {total}\n")
+        self._f.write("\n")
+
+    def write(self, doc):
+        statement = sql_insert_statement(doc)
+        if statement:
+            self._f.write(statement)
+        self.count += 1
+
+    def close(self):
+        if not self._total_known:
+            self._f.write(f"\n-- Total documents: {self.count}\n")
+        self._f.close()
+        return self.filepath
+
+
+SQL_WRITERS = {"copy": CopySqlBackupWriter, "insert": SqlBackupWriter}
+
+
+_END_OF_STREAM = object()
+
+
+class ParallelWriterPool:
+    """Fans one row stream out to several writers, each running in its own worker thread.
+
+    Every writer gets a bounded queue, so a slow writer applies back-pressure to the
+    cursor instead of letting rows pile up. Serialisation and compression overlap
+    across writers (zlib and zstd release the GIL while compressing).
+    """
+
+    def __init__(self, writers, queue_size=WRITER_QUEUE_SIZE):
+        self.writers = writers
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in writers]
+        self._executor = ThreadPoolExecutor(max_workers=len(writers), thread_name_prefix="qse-backup-writer")
+        self._futures = [
+            self._executor.submit(self._drain, writer, q) for writer, q in zip(writers, self._queues)
+        ]
+
+    @staticmethod
+    def _drain(writer, q):
+        error = None
+        while True:
+            doc = q.get()
+            if doc is _END_OF_STREAM:
+                break
+            if error is None:
+                try:
+                    writer.write(doc)
+                except Exception as e:
+                    # Keep draining so the producer never blocks on a dead writer's queue
+                    error = e
+        filepath = writer.close()
+        if error is not None:
+            raise error
+        return filepath
+
+    def write(self, doc):
+        for q in self._queues:
+            q.put(doc)
+
+    def close(self):
+        """Flush all writers and return their file paths, re-raising the first writer error."""
+        for q in self._queues:
+            q.put(_END_OF_STREAM)
+        try:
+            return [future.result() for future in self._futures]
+        finally:
+            self._executor.shutdown(wait=True)
+
+
 def export_to_json(documents, output_dir):
     """Export QSE documents to JSON format."""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"qse_docs_backup_{timestamp}.json"
-    filepath = os.path.join(output_dir, filename)
-
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(documents, f, indent=2, default=str, ensure_ascii=False)
+    writer = JsonBackupWriter(output_dir, timestamp)
+    for doc in documents:
+        writer.write(doc)
+    filepath = writer.close()
 
     print(f"Exported {len(documents)} QSE documents to {filepath}")
     return filepath
@@ -75,79 +455,244 @@ def export_to_csv(documents, output_dir):
         return None
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"qse_docs_backup_{timestamp}.csv"
-    filepath = os.path.join(output_dir, filename)
 
-    # Get all possible keys for CSV headers
+    # Union of flattened keys across all documents for CSV headers
     all_keys = set()
     for doc in documents:
-        all_keys.update(doc.keys())
+        all_keys.update(flatten_document(doc).keys())
 
-    # Flatten nested fields for CSV
-    flattened_docs = []
+    writer = CsvBackupWriter(output_dir, timestamp, sorted(all_keys))
     for doc in documents:
-        flat_doc = {}
-        for key, value in doc.items():
-            if isinstance(value, dict):
-                # Flatten metadata and content
-                for sub_key, sub_value in value.items():
-                    flat_doc[f"{key}_{sub_key}"] = json.dumps(sub_value) if isinstance(sub_value, (dict, list)) else str(sub_value)
-            else:
-                flat_doc[key] = str(value) if value is not None else ''
-        flattened_docs.append(flat_doc)
-
-    # Write CSV
-    with open(filepath, 'w', newline='', encoding='utf-8') as f:
-        if flattened_docs:
-            writer = csv.DictWriter(f, fieldnames=sorted(flattened_docs[0].keys()))
-            writer.writeheader()
-            writer.writerows(flattened_docs)
+        writer.write(doc)
+    filepath = writer.close()
 
     print(f"Exported {len(documents)} QSE documents to {filepath}")
     return filepath
 
 
-def export_to_sql_dump(documents, output_dir):
-    """Export QSE documents to SQL INSERT statements."""
+def export_to_sql_dump(documents, output_dir, sql_format="copy"):
+    """Export QSE documents to a SQL dump (COPY block, or INSERT statements)."""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"qse_docs_backup_{timestamp}.sql"
-    filepath = os.path.join(output_dir, filename)
-
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write("-- QSE Documents Backup\n")
-        f.write(f"-- Generated on {datetime.now().isoformat()}\n")
-        f.write(f"-- Total documents: {len(documents)}\n\n")
-
-        for doc in documents:
-            # Create INSERT statement
-            columns = []
-            values = []
-
-            for key, value in doc.items():
-                if value is not None:
-                    columns.append(key)
-                    if isinstance(value, dict):
-                        escaped_value = json.dumps(value).replace("'", "''")
-                        values.append(f"'{escaped_value}'::jsonb")
-                    elif isinstance(value, str):
-                        escaped_value = value.replace("'", "''")
-                        values.append(f"'{escaped_value}'")
-                    else:
-                        values.append(str(value))
-
-            if columns:
-                f.write("INSERT INTO assets (")
-                f.write(", ".join(columns))
-                f.write(") VALUES (")
-                f.write(", ".join(values))
-                f.write(");\n")
+    writer = SQL_WRITERS[sql_format](output_dir, timestamp, len(documents))
+    for doc in documents:
+        writer.write(doc)
+    filepath = writer.close()
 
     print(f"Exported {len(documents)} QSE documents to {filepath}")
     return filepath
 
 
+def export_streaming(output_dir, since=None, compression="none", json_format="json", parallel=False,
+                     sql_format="copy", overlap_s=DELTA_OVERLAP_S):
+    """Stream QSE documents once through a server-side cursor into all three writers.
+
+    Returns (files_created, type_counts, total, high_water_mark, doc_numbers); the
+    mark is None when no exported row moves it past since, and doc_numbers yields the summary's
+    (document_number, name) pairs in export order (document_number order for full exports) from
+    a spool file, so memory stays flat however many rows stream through.
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    conn = get_db_connection()
+    # One snapshot for the whole export, so the files and the summary always agree
+    conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    try:
+        json_writer = JsonLinesBackupWriter if json_format == "jsonl" else JsonBackupWriter
+        writers = [
+            json_writer(output_dir, timestamp, compression),
+            CsvBackupWriter(output_dir, timestamp, compression=compression),
+            SQL_WRITERS[sql_format](output_dir, timestamp, compression=compression),
+        ]
+
+        pool = ParallelWriterPool(writers) if parallel else None
+        type_counts = {}
+        doc_spool = tempfile.TemporaryFile(mode='w+', encoding='utf-8', dir=output_dir)
+        written = 0
+        high_water = None
+        try:
+            for doc in iter_qse_documents(conn, since=since, overlap_s=overlap_s):
+                if pool is not None:
+                    pool.write(doc)
+                else:
+                    for writer in writers:
+                        writer.write(doc)
+                doc_type = doc.get('type', 'unknown')
+                type_counts[doc_type] = type_counts.get(doc_type, 0) + 1
+                doc_spool.write(json.dumps([doc.get('document_number'), doc.get('name')]) + "\n")
+                written += 1
+                mark = watermark_of(doc)
+                if mark is not None and (high_water is None or mark > high_water):
+                    high_water = mark
+        except BaseException:
+            doc_spool.close()
+            raise
+        finally:
+            files_created = pool.close() if pool is not None else [writer.close() for writer in writers]
+        conn.rollback()
+    finally:
+        conn.close()
+
+    print(f"Found {written} QSE documents to backup")
+    if not written:
+        print("No documents to export")
+    # The CSV writer produces no file for an empty export
+    files_created = [filepath for filepath in files_created if filepath]
+    for filepath in files_created:
+        print(f"Exported {written} QSE documents to {filepath}")
+    if high_water is not None and since:
+        # Rows re-read from the overlap window must not pull the mark backwards
+        previous = (datetime.fromisoformat(since["updated_at"]), since["asset_uid"], since["version"])
+        if high_water <= previous:
+            high_water = None
+    if high_water is not None:
+        high_water = {
+            "updated_at": high_water[0].isoformat(),
+            "asset_uid": high_water[1],
+            "version": high_water[2],
+        }
+    return files_created, type_counts, written, high_water, _read_spooled_pairs(doc_spool)
+
+
+def _read_spooled_pairs(spool):
+    """Yield the (document_number, name) pairs spooled by export_streaming, closing the spool."""
+    with spool:
+        spool.seek(0)
+        for line in spool:
+            yield tuple(json.loads(line))
+
+
+def load_manifest(backup_dir):
+    manifest_path = Path(backup_dir) / MANIFEST_NAME
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(backup_dir, manifest):
+    manifest_path = Path(backup_dir) / MANIFEST_NAME
+    temp_path = manifest_path.with_suffix(".json.tmp")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_path, manifest_path)
+    return manifest_path
+
+
+def record_backup(backup_dir, manifest, output_dir, files_created, total, high_water):
+    """Append a backup to the manifest chain and advance the high-water mark."""
+    if manifest is None:
+        manifest = {"high_water_mark": None, "backups": []}
+    kind = "delta" if manifest["backups"] else "full"
+    json_file = next((f for f in files_created if ".json" in os.path.basename(f)), None)
+    manifest["backups"].append({
+        "kind": kind,
+        "directory": Path(output_dir).name,
+        "json_file": os.path.basename(json_file) if json_file else None,
+        "since": manifest["high_water_mark"],
+        "high_water_mark": high_water or manifest["high_water_mark"],
+        "documents": total,
+        "created_at": datetime.now().isoformat(),
+    })
+    if high_water:
+        manifest["high_water_mark"] = high_water
+    save_manifest(backup_dir, manifest)
+    print(f"Recorded {kind} backup in {Path(backup_dir) / MANIFEST_NAME}")
+    return manifest
+
+
+RESTORE_SQL = """
+INSERT INTO assets (
+    id, asset_uid, version, is_current, type, name, organization_id, project_id,
+    document_number, revision_code, metadata, content, created_at, updated_at
+) VALUES %s
+ON CONFLICT (id) DO UPDATE SET
+    is_current = EXCLUDED.is_current,
+    type = EXCLUDED.type,
+    name = EXCLUDED.name,
+    document_number = EXCLUDED.document_number,
+    revision_code = EXCLUDED.revision_code,
+    metadata = EXCLUDED.metadata,
+    content = EXCLUDED.content,
+    updated_at = EXCLUDED.updated_at
+"""
+
+
+def restore_from_manifest(manifest_path, organization_id=None, batch_size=STREAM_BATCH_SIZE):
+    """Replay the base backup and every delta recorded in a manifest, in order.
+
+    Rows are upserted by id, so replaying a chain twice is harmless. Backups taken
+    before organization_id was exported fall back to organization_id (or the first
+    organization) for rows that do not exist yet.
+    """
+    manifest_path = Path(manifest_path)
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    conn = get_db_connection()
+    restored = 0
+    try:
+        with conn.cursor() as cursor:
+            if organization_id is None:
+                cursor.execute("SELECT id FROM organizations ORDER BY created_at LIMIT 1")
+                row = cursor.fetchone()
+                organization_id = row[0] if row else None
+
+            for backup in manifest["backups"]:
+                json_path = manifest_path.parent / backup["directory"] / backup["json_file"]
+                replayed = 0
+                documents = iter_backup_documents(json_path)
+                while True:
+                    batch = [doc for _, doc in zip(range(batch_size), documents)]
+                    if not batch:
+                        break
+                    replayed += len(batch)
+                    # Drop competing heads first so uq_assets_current_head holds
+                    cursor.execute(
+                        "UPDATE assets SET is_current = false "
+                        "WHERE is_current AND asset_uid = ANY(%s::uuid[]) AND NOT (id = ANY(%s::uuid[]))",
+                        (
+                            [d["asset_uid"] for d in batch if d.get("is_current")],
+                            [d["id"] for d in batch],
+                        ),
+                    )
+                    psycopg2.extras.execute_values(cursor, RESTORE_SQL, [
+                        (
+                            d["id"], d["asset_uid"], d["version"], d.get("is_current", True),
+                            d["type"], d["name"], d.get("organization_id") or organization_id,
+                            d.get("project_id"), d.get("document_number"), d.get("revision_code"),
+                            psycopg2.extras.Json(d.get("metadata") or {}),
+                            psycopg2.extras.Json(d.get("content") or {}),
+                            d.get("created_at"), d.get("updated_at"),
+                        )
+                        for d in batch
+                    ])
+                restored += replayed
+                print(f"Replayed {backup['kind']} backup {backup['directory']} ({replayed} documents)")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    print(f"Restore completed: {restored} documents replayed from {len(manifest['backups'])} backups")
+    return restored
+
+
 def create_backup_summary(documents, output_dir, files_created):
     """Create a backup summary file."""
+    types = {}
+    for doc in documents:
+        doc_type = doc.get('type', 'unknown')
+        types[doc_type] = types.get(doc_type, 0) + 1
+    doc_numbers = sorted(
+        ((doc.get('document_number', 'N/A'), doc.get('name', 'N/A')) for doc in documents),
+        key=lambda x: x[0] or '',
+    )
+    return write_backup_summary(output_dir, len(documents), types, doc_numbers, files_created)
+
+
+def write_backup_summary(output_dir, total, types, doc_numbers, files_created):
+    """Write the summary file from aggregated counts and (document_number, name) pairs."""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     summary_file = os.path.join(output_dir, f"qse_backup_summary_{timestamp}.txt")
 
@@ -155,22 +700,15 @@ def create_backup_summary(documents, output_dir, files_created):
         f.write("QSE Documents Backup Summary\n")
         f.write("=" * 40 + "\n\n")
         f.write(f"Backup created: {datetime.now().isoformat()}\n")
-        f.write(f"Total QSE documents: {len(documents)}\n\n")
+        f.write(f"Total QSE documents: {total}\n\n")
 
-        if documents:
+        if total:
             f.write("Document types found:\n")
-            types = {}
-            for doc in documents:
-                doc_type = doc.get('type', 'unknown')
-                types[doc_type] = types.get(doc_type, 0) + 1
-
             for doc_type, count in sorted(types.items()):
                 f.write(f"  - {doc_type}: {count}\n")
 
             f.write("\nDocument numbers:\n")
-            for doc in sorted(documents, key=lambda x: x.get('document_number', '')):
-                doc_num = doc.get('document_number', 'N/A')
-                title = doc.get('name', 'N/A')
+            for doc_num, title in doc_numbers:
                 f.write(f"  - {doc_num}: {title}\n")
 
         f.write("\nFiles created:\n")
@@ -183,38 +721,84 @@ def create_backup_summary(documents, output_dir, files_created):
 
 def main():
     """Main backup function."""
+    parser = argparse.ArgumentParser(description="Back up QSE documents from the assets table.")
+    parser.add_argument("--stream", action="store_true",
+                        help="Single-pass export through a server-side cursor (constant memory)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Export only rows changed since the manifest's high-water mark (full base on first run)")
+    parser.add_argument("--restore", metavar="MANIFEST",
+                        help="Replay the base backup and deltas recorded in MANIFEST, then exit")
+    parser.add_argument("--organization-id",
+                        help="Organization for restored rows whose backup predates organization_id export")
+    parser.add_argument("--parallel", action="store_true",
+                        help="Run the JSON, CSV and SQL writers concurrently (streaming modes)")
+    parser.add_argument("--compress", choices=sorted(COMPRESSION_SUFFIXES), default="none",
+                        help="Stream every output through gzip or zstd (streaming modes)")
+    parser.add_argument("--json-format", choices=["json", "jsonl"], default="json",
+                        help="Indented JSON array (default) or compact JSON Lines (streaming modes)")
+    parser.add_argument("--sql-format", choices=sorted(SQL_WRITERS), default="copy",
+                        help="COPY block restorable with restore_qse_dump.py (default) or per-row INSERTs")
+    parser.add_argument("--overlap-seconds", type=float, default=DELTA_OVERLAP_S,
+                        help=f"Window re-read below the high-water mark on incremental runs (default {DELTA_OVERLAP_S})")
+    args = parser.parse_args()
+
+    if args.restore:
+        restore_from_manifest(args.restore, organization_id=args.organization_id)
+        return
+
     print("Starting QSE documents backup...")
 
     # Create backups directory
     backup_dir = Path("backups")
     backup_dir.mkdir(exist_ok=True)
 
+    manifest = load_manifest(backup_dir) if args.incremental else None
+    since = manifest["high_water_mark"] if manifest else None
+
     # Create timestamped subdirectory
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_dir = backup_dir / f"qse_backup_{timestamp}"
+    suffix = "_delta" if since else ""
+    output_dir = backup_dir / f"qse_backup_{timestamp}{suffix}"
     output_dir.mkdir(exist_ok=True)
 
     try:
-        # Get QSE documents
-        documents = get_qse_documents()
-        print(f"Found {len(documents)} QSE documents to backup")
-
-        # Export to different formats
-        files_created = []
-
-        json_file = export_to_json(documents, str(output_dir))
-        files_created.append(json_file)
-
-        csv_file = export_to_csv(documents, str(output_dir))
-        if csv_file:
-            files_created.append(csv_file)
-
-        sql_file = export_to_sql_dump(documents, str(output_dir))
-        files_created.append(sql_file)
-
-        # Create summary
-        summary_file = create_backup_summary(documents, str(output_dir), files_created)
-        files_created.append(summary_file)
+        if args.stream or args.incremental or args.parallel or args.compress != "none" or args.json_format != "json":
+            if since:
+                print(f"Incremental backup since {since['updated_at']} ({since['asset_uid']} v{since['version']})")
+            files_created, type_counts, total, high_water, doc_numbers = export_streaming(
+                str(output_dir),
+                since=since,
+                compression=args.compress,
+                json_format=args.json_format,
+                parallel=args.parallel,
+                sql_format=args.sql_format,
+                overlap_s=args.overlap_seconds,
+            )
+            summary_file = write_backup_summary(str(output_dir), total, type_counts, doc_numbers, files_created)
+            files_created.append(summary_file)
+            if args.incremental:
+                record_backup(backup_dir, manifest, output_dir, files_created, total, high_water)
+        else:
+            # Get QSE documents
+            documents = get_qse_documents()
+            print(f"Found {len(documents)} QSE documents to backup")
+
+            # Export to different formats
+            files_created = []
+
+            json_file = export_to_json(documents, str(output_dir))
+            files_created.append(json_file)
+
+            csv_file = export_to_csv(documents, str(output_dir))
+            if csv_file:
+                files_created.append(csv_file)
+
+            sql_file = export_to_sql_dump(documents, str(output_dir), args.sql_format)
+            files_created.append(sql_file)
+
+            # Create summary
+            summary_file = create_backup_summary(documents, str(output_dir), files_created)
+            files_created.append(summary_file)
 
         print("\nBackup completed successfully!")
         print(f"Backup location: {output_dir.absolute()}")
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Embedding ingestion and k-NN benchmark against public.asset_embeddings.
+
+Uses the local hashing provider (embedding_providers.py), so it runs without
+network access. For each size it:
+
+  1. seeds a throwaway organization with --projects projects and N synthetic
+     spec/clause/standard/requirement assets through upsertAssetsAndEdgesBulk;
+  2. drops the HNSW index, ingests every project with ingest_embeddings() and
+     reports rows/s, split into embedding and COPY+upsert time;
+  3. rebuilds the HNSW index and reports build time;
+  4. runs --queries project-filtered k-NN searches and reports p50/p95/p99
+     latency, plus recall@k against an exact scan for the first
+     --recall-queries queries;
+  5. deletes everything it created (unless --keep).
+
+Run it against a dedicated database: while a size runs, the HNSW index is
+missing for every other asset_embeddings reader.
+
+Usage:
+    python bench_embeddings.py [--sizes 10000,100000,1000000] [--projects 20] [--queries 200] [-k 10] [--json]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from typing import Dict, Any, List
+
+import psycopg2
+
+from asset_embeddings import (
+    SEARCH_SQL, build_hnsw_index, drop_hnsw_index, ingest_embeddings, search_similar, vector_literal,
+)
+from asset_repo import get_pool, upsertAssetsAndEdgesBulk
+from embedding_providers import HashingEmbeddingProvider
+
+
+ASSET_TYPES = ["spec", "clause", "standard", "requirement"]
+SEED_CHUNK = 10_000
+
+# Small construction vocabulary so texts overlap the way real clauses do
+WORDS = (
+    "concrete slump pour formwork reinforcement steel cover compaction curing cylinder strength "
+    "inspection hold witness point lot subgrade pavement asphalt density moisture proof roll "
+    "drainage pipe bedding backfill trench excavation survey setout tolerance level grade "
+    "approval release notification contractor superintendent engineer test method sample "
+    "frequency nonconformance defect rectification record signoff itp wbs lbs clause standard"
+).split()
+
+
+def synthetic_text(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(12, 60)))
+
+
+def seed_assets(conn: Any, size: int, projects: int, seed: int) -> Dict[str, Any]:
+    """Create an organization, projects and size assets; returns their ids and seed time."""
+    rng = random.Random(seed)
+    org_id = str(uuid.uuid4())
+    project_ids = [str(uuid.uuid4()) for _ in range(projects)]
+    started = time.perf_counter()
+    with conn.cursor() as cursor:
+        cursor.execute("INSERT INTO public.organizations (id, name) VALUES (%s, %s)", (org_id, "bench_embeddings"))
+        for i, project_id in enumerate(project_ids):
+            cursor.execute(
+                "INSERT INTO public.projects (id, name, organization_id, status) VALUES (%s, %s, %s, 'bench')",
+                (project_id, f"bench_embeddings {i}", org_id),
+            )
+    conn.commit()
+
+    for start in range(0, size, SEED_CHUNK):
+        specs = []
+        for n in range(start, min(start + SEED_CHUNK, size)):
+            specs.append({
+                "type": ASSET_TYPES[n % len(ASSET_TYPES)],
+                "name": f"bench {n}",
+                "project_id": project_ids[n % projects],
+                "organization_id": org_id,
+                "idempotency_key": f"bench_embeddings:{n}",
+                "content": {"text": synthetic_text(rng)},
+            })
+        result = upsertAssetsAndEdgesBulk(specs, conn)
+        if not result["success"]:
+            raise RuntimeError(f"seeding failed: {result['error']}")
+        conn.commit()
+    return {"org_id": org_id, "project_ids": project_ids, "seed_s": time.perf_counter() - started}
+
+
+def cleanup(conn: Any, org_id: str, project_ids: List[str]) -> None:
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            DELETE FROM public.asset_edges e
+            USING public.assets a
+            WHERE a.organization_id = %s AND (e.from_asset_id = a.id OR e.to_asset_id = a.id)
+        """, (org_id,))
+        cursor.execute("DELETE FROM public.assets WHERE organization_id = %s", (org_id,))
+        cursor.execute("DELETE FROM public.projects WHERE id = ANY(%s::uuid[])", (project_ids,))
+        cursor.execute("DELETE FROM public.organizations WHERE id = %s", (org_id,))
+    conn.commit()
+
+
+def exact_neighbors(conn: Any, vector: List[float], project_id: str, k: int, model: str) -> List[str]:
+    """Ground truth for recall: same query with the HNSW index disabled."""
+    with conn.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_indexscan = off")
+        cursor.execute(SEARCH_SQL, {
+            "query": vector_literal(vector), "model": model,
+            "project_id": project_id, "types": None, "k": k,
+        })
+        ids = [str(r[0]) for r in cursor.fetchall()]
+    conn.commit()
+    return ids
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def bench_size(conn: Any, provider: HashingEmbeddingProvider, size: int, args: argparse.Namespace) -> Dict[str, Any]:
+    seeded = seed_assets(conn, size, args.projects, args.seed)
+    index_s = None
+    try:
+        drop_hnsw_index(conn)
+        ingest = {"embedded": 0, "embed_s": 0.0, "write_s": 0.0}
+        started = time.perf_counter()
+        for project_id in seeded["project_ids"]:
+            stats = ingest_embeddings(conn, provider, provider.model, project_id, batch_size=args.batch_size)
+            for key in ingest:
+                ingest[key] += stats[key]
+        ingest_s = time.perf_counter() - started
+        index_s = build_hnsw_index(conn)
+
+        rng = random.Random(args.seed + 1)
+        latencies, recalls = [], []
+        for q in range(args.queries):
+            project_id = rng.choice(seeded["project_ids"])
+            vector = provider.embed([synthetic_text(rng)])[0]
+            started = time.perf_counter()
+            result = search_similar(vector, project_id, k=args.k, model=provider.model, conn=conn)
+            latencies.append((time.perf_counter() - started) * 1000.0)
+            if not result["success"]:
+                raise RuntimeError(f"search failed: {result['error']}")
+            if q < args.recall_queries:
+                truth = set(exact_neighbors(conn, vector, project_id, args.k, provider.model))
+                if truth:
+                    got = {r["asset_id"] for r in result["results"]}
+                    recalls.append(len(got & truth) / len(truth))
+    finally:
+        conn.rollback()
+        if not args.keep:
+            cleanup(conn, seeded["org_id"], seeded["project_ids"])
+        if index_s is None:
+            build_hnsw_index(conn)
+
+    return {
+        "rows": size,
+        "seed_s": round(seeded["seed_s"], 2),
+        "ingest_s": round(ingest_s, 2),
+        "ingest_rows_per_s": round(ingest["embedded"] / ingest_s, 1) if ingest_s else None,
+        "embed_s": round(ingest["embed_s"], 2),
+        "write_s": round(ingest["write_s"], 2),
+        "index_build_s": round(index_s, 2),
+        "knn_p50_ms": round(percentile(latencies, 50), 2),
+        "knn_p95_ms": round(percentile(latencies, 95), 2),
+        "knn_p99_ms": round(percentile(latencies, 99), 2),
+        "recall_at_k": round(statistics.mean(recalls), 4) if recalls else None,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark embedding ingestion and k-NN search offline.")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated row counts")
+    parser.add_argument("--projects", type=int, default=20, help="Projects the rows are spread over")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--recall-queries", type=int, default=20)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Leave the seeded rows in place")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    provider = HashingEmbeddingProvider(seed=args.seed)
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = []
+    conn = get_pool().getconn()
+    try:
+        for size in sizes:
+            if not args.json:
+                print(f"🔄 {size} rows ...")
+            results.append(bench_size(conn, provider, size, args))
+    except (psycopg2.Error, RuntimeError) as e:
+        print(f"❌ Benchmark failed: {e}")
+        return 1
+    finally:
+        get_pool().putconn(conn)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    columns = list(results[0].keys()) if results else []
+    print(" ".join(f"{c:>18s}" for c in columns))
+    for row in results:
+        print(" ".join(f"{str(row[c]):>18s}" for c in columns))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Embedding providers for asset_embeddings.py.
+
+A provider has a model id (the asset_embeddings.model / embedding_cache key),
+a dimension, and embed(texts) returning one vector per text. Providers are
+also callable, so any of them can be passed where an embed function is
+expected.
+
+openai     Remote OpenAI-compatible /embeddings endpoint (OPENAI_API_KEY,
+           OPENAI_BASE_URL, EMBEDDING_MODEL).
+hashing    Local, deterministic signed feature hashing of word unigrams and
+           bigrams, vectorized with NumPy. The vectors carry no semantics beyond
+           lexical overlap, but they have the real dimension and norm and cost no
+           network, so the ingestion, cache and HNSW paths can be benchmarked
+           offline. Its model id never matches a real model's, so its vectors
+           and cache entries stay separate.
+
+get_provider() picks one by name, defaulting to EMBEDDING_PROVIDER.
+"""
+
+import hashlib
+import json
+import os
+import re
+import urllib.request
+from typing import Dict, List, Sequence
+
+
+EMBEDDING_DIM = 1536
+DEFAULT_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")
+DEFAULT_OPENAI_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+
+# Bound on the token -> bucket memo, which otherwise grows with the corpus vocabulary
+MAX_CACHED_TOKENS = 1_000_000
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+class EmbeddingProvider:
+    """Base class: subclasses set model/dim and implement embed()."""
+
+    model: str = ""
+    dim: int = EMBEDDING_DIM
+
+    def embed(self, texts: List[str]) -> List[Sequence[float]]:
+        raise NotImplementedError
+
+    def __call__(self, texts: List[str]) -> List[Sequence[float]]:
+        return self.embed(texts)
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI-compatible embeddings endpoint over plain HTTPS."""
+
+    def __init__(self, model: str = DEFAULT_OPENAI_MODEL, timeout: float = 60.0):
+        self.model = model
+        self.timeout = timeout
+
+    def embed(self, texts: List[str]) -> List[Sequence[float]]:
+        base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+        request = urllib.request.Request(
+            f"{base_url}/embeddings",
+            data=json.dumps({"model": self.model, "input": texts}).encode("utf-8"),
+            headers={
+                "Authorization": f"Bearer {os.environ['OPENAI_API_KEY']}",
+                "Content-Type": "application/json",
+            },
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            body = json.load(response)
+        return [item["embedding"] for item in sorted(body["data"], key=lambda item: item["index"])]
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """Deterministic bag-of-n-grams vectors; the same text always maps to the same unit vector."""
+
+    def __init__(self, dim: int = EMBEDDING_DIM, seed: int = 0):
+        # Imported here so the remote provider keeps working without numpy
+        import numpy
+
+        self._np = numpy
+        self.dim = dim
+        self.seed = seed
+        self.model = f"local-hash-{dim}-s{seed}-v1"
+        self._key = seed.to_bytes(8, "little", signed=False)
+        # token -> (bucket, sign); blake2b rather than hash() so vectors match across processes
+        self._buckets: Dict[str, tuple] = {}
+
+    def _bucket(self, token: str) -> tuple:
+        hit = self._buckets.get(token)
+        if hit is None:
+            if len(self._buckets) >= MAX_CACHED_TOKENS:
+                self._buckets.clear()
+            digest = int.from_bytes(
+                hashlib.blake2b(token.encode("utf-8"), digest_size=8, key=self._key).digest(), "little"
+            )
+            hit = self._buckets[token] = (digest % self.dim, 1.0 if digest >> 63 else -1.0)
+        return hit
+
+    def _features(self, text: str) -> List[str]:
+        words = _TOKEN.findall(text.lower())
+        # An empty text still gets one feature: pgvector's cosine distance is NaN for zero vectors
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])] or [""]
+
+    def embed_array(self, texts: List[str]):
+        """Embeddings as a (len(texts), dim) float32 array of unit rows."""
+        np = self._np
+        rows, cols, signs = [], [], []
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                col, sign = self._bucket(feature)
+                rows.append(row)
+                cols.append(col)
+                signs.append(sign)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(out, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)),
+                  np.asarray(signs, dtype=np.float32))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        # Features that cancel out exactly leave a zero row; fall back to the first bucket
+        zero = norms[:, 0] == 0
+        out[zero, 0] = 1.0
+        norms[zero] = 1.0
+        return out / norms
+
+    def embed(self, texts: List[str]) -> List[Sequence[float]]:
+        return self.embed_array(texts).tolist()
+
+
+PROVIDERS = {
+    "openai": OpenAIEmbeddingProvider,
+    "hashing": HashingEmbeddingProvider,
+}
+
+
+def get_provider(name: str = DEFAULT_PROVIDER, **kwargs) -> EmbeddingProvider:
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown embedding provider {name!r}; expected one of {sorted(PROVIDERS)}")
+    return PROVIDERS[name](**kwargs)
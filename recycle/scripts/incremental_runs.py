@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Dependency-aware incremental re-runs of the orchestrator flow.
+
+    START -> document_extraction -> project_details -> standards_extraction
+          -> plan_generation -> wbs_extraction -> lbs_extraction -> itp_generation -> END
+
+Each subgraph's input fingerprint is computed from what it actually consumes:
+
+  - document_extraction: documents.source_hash, tracked per document, so only
+    new or changed files are extracted. A document that has been deleted also
+    makes it stale: when the run is recorded, the document assets extracted
+    from it are soft-deleted and its per-document fingerprint row is removed,
+    so the downstream chain sees the change;
+  - every later subgraph: the output fingerprints of its upstream subgraphs
+    (current asset_uid/version/updated_at of the asset types they write) plus
+    an optional per-subgraph code/prompt version.
+
+Fingerprints are stored in public.subgraph_fingerprints (migration 019) when a
+subgraph completes. A subgraph runs only when its input fingerprint differs
+from the stored one. Outputs are fingerprinted after the run, so when a
+re-run writes the same assets (the bulk upsert leaves unchanged rows alone),
+the chain stops there. Adding one drawing re-extracts that drawing; WBS, LBS
+and ITP only re-run if what they read has actually changed.
+
+run_incremental() drives the flow given one callable per subgraph;
+IncrementalRun.should_run()/record() let an existing orchestrator make the same
+decisions node by node.
+
+Usage:
+    python incremental_runs.py plan <project_id>
+    python incremental_runs.py reset <project_id> [--subgraph NAME]
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+from typing import Optional, Dict, Any, List, Callable, Tuple
+
+import psycopg2
+
+from asset_repo import get_pool
+
+
+# (subgraph, upstream subgraphs, asset types it writes), in flow order
+FLOW: List[Tuple[str, Tuple[str, ...], Tuple[str, ...]]] = [
+    ("document_extraction", (), ("document",)),
+    ("project_details", ("document_extraction",), ("project",)),
+    ("standards_extraction", ("document_extraction", "project_details"), ("standard",)),
+    ("plan_generation", ("project_details", "standards_extraction"), ("plan",)),
+    ("wbs_extraction", ("document_extraction", "project_details", "plan_generation"), ("wbs_node",)),
+    ("lbs_extraction", ("document_extraction", "project_details", "wbs_extraction"), ("lbs_node",)),
+    ("itp_generation", ("standards_extraction", "wbs_extraction", "lbs_extraction"),
+     ("itp_template", "itp_document", "inspection_point")),
+]
+
+SUBGRAPHS = [name for name, _, _ in FLOW]
+UPSTREAM = {name: upstream for name, upstream, _ in FLOW}
+OUTPUT_TYPES = {name: types for name, _, types in FLOW}
+
+# The project asset has id = projects.id and no project_id of its own
+OUTPUTS_SQL = """
+SELECT a.type,
+       md5(string_agg(concat_ws(':', a.asset_uid, a.version, a.updated_at), ',' ORDER BY a.asset_uid))
+FROM public.assets a
+WHERE (a.project_id = %(project_id)s::uuid OR a.id = %(project_id)s::uuid)
+  AND a.type = ANY(%(types)s::text[])
+  AND a.is_current AND NOT a.is_deleted
+GROUP BY a.type
+"""
+
+PENDING_DOCUMENTS_SQL = """
+SELECT d.id, COALESCE(d.source_hash, '')
+FROM public.documents d
+LEFT JOIN public.subgraph_fingerprints f
+  ON f.project_id = d.project_id AND f.subgraph = 'document_extraction' AND f.scope = d.id::text
+WHERE d.project_id = %(project_id)s::uuid
+  AND f.input_fingerprint IS DISTINCT FROM COALESCE(d.source_hash, '')
+ORDER BY d.id
+"""
+
+# Per-document fingerprints left behind by documents that no longer exist
+REMOVED_DOCUMENTS_SQL = """
+SELECT f.scope
+FROM public.subgraph_fingerprints f
+WHERE f.project_id = %(project_id)s::uuid AND f.subgraph = 'document_extraction' AND f.scope <> ''
+  AND NOT EXISTS (
+    SELECT 1 FROM public.documents d
+    WHERE d.project_id = f.project_id AND d.id::text = f.scope
+  )
+ORDER BY f.scope
+"""
+
+# Document assets are keyed doc_extract:<project_id>:<document id> and carry content.source_document_id
+RETIRE_DOCUMENT_ASSETS_SQL = """
+UPDATE public.assets
+SET is_deleted = true, updated_at = now()
+WHERE project_id = %(project_id)s::uuid AND type = 'document'
+  AND is_current AND NOT is_deleted
+  AND content->>'source_document_id' = ANY(%(document_ids)s::text[])
+"""
+
+FORGET_DOCUMENTS_SQL = """
+DELETE FROM public.subgraph_fingerprints
+WHERE project_id = %(project_id)s::uuid AND subgraph = 'document_extraction'
+  AND scope = ANY(%(document_ids)s::text[])
+"""
+
+RECORDED_SQL = """
+SELECT subgraph, input_fingerprint, output_fingerprint
+FROM public.subgraph_fingerprints
+WHERE project_id = %(project_id)s::uuid AND scope = ''
+"""
+
+RECORD_SQL = """
+INSERT INTO public.subgraph_fingerprints (project_id, subgraph, scope, input_fingerprint, output_fingerprint, completed_at)
+VALUES (%(project_id)s, %(subgraph)s, %(scope)s, %(input)s, %(output)s, now())
+ON CONFLICT (project_id, subgraph, scope) DO UPDATE SET
+  input_fingerprint = EXCLUDED.input_fingerprint,
+  output_fingerprint = EXCLUDED.output_fingerprint,
+  completed_at = EXCLUDED.completed_at
+"""
+
+RECORD_DOCUMENTS_SQL = """
+INSERT INTO public.subgraph_fingerprints (project_id, subgraph, scope, input_fingerprint, completed_at)
+SELECT d.project_id, 'document_extraction', d.id::text, COALESCE(d.source_hash, ''), now()
+FROM public.documents d
+WHERE d.project_id = %(project_id)s::uuid AND d.id = ANY(%(document_ids)s::uuid[])
+ON CONFLICT (project_id, subgraph, scope) DO UPDATE SET
+  input_fingerprint = EXCLUDED.input_fingerprint,
+  completed_at = EXCLUDED.completed_at
+"""
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class IncrementalRun:
+    """Skip/run decisions for one orchestrator run over one project."""
+
+    def __init__(self, project_id: str, versions: Optional[Dict[str, str]] = None,
+                 force: bool = False, conn: Optional[Any] = None):
+        self.project_id = project_id
+        self.versions = versions or {}
+        self.force = force
+        self._own_conn = conn is None
+        self._in_transaction = False
+        self.conn = get_pool().getconn() if conn is None else conn
+        self._recorded = self._load_recorded()
+        self._pending_inputs: Dict[str, str] = {}
+        self._outputs: Dict[str, str] = {}
+        self.decisions: Dict[str, str] = {}
+
+    def close(self) -> None:
+        if self._own_conn and self.conn is not None:
+            get_pool().putconn(self.conn)
+            self.conn = None
+
+    def __enter__(self) -> "IncrementalRun":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _query(self, sql: str, params: Dict[str, Any]) -> List[Tuple[Any, ...]]:
+        # Only our own connection is committed, and not while record() holds its transaction open
+        autocommit = self._own_conn and not self._in_transaction
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall() if cursor.description else []
+            if autocommit:
+                self.conn.commit()
+        except Exception:
+            if autocommit:
+                self.conn.rollback()
+            raise
+        return rows
+
+    def _load_recorded(self) -> Dict[str, Tuple[str, Optional[str]]]:
+        rows = self._query(RECORDED_SQL, {"project_id": self.project_id})
+        return {name: (input_fp, output_fp) for name, input_fp, output_fp in rows}
+
+    def output_fingerprint(self, subgraph: str) -> str:
+        """Fingerprint of the current assets a subgraph writes; cached until that subgraph records a run."""
+        if subgraph not in self._outputs:
+            types = list(OUTPUT_TYPES[subgraph])
+            by_type = dict(self._query(OUTPUTS_SQL, {"project_id": self.project_id, "types": types}))
+            self._outputs[subgraph] = _digest([by_type.get(t) for t in types])
+        return self._outputs[subgraph]
+
+    def pending_documents(self) -> List[str]:
+        """Documents to extract: those whose source_hash differs from the one last extracted,
+        or all of them when forced or when document_extraction's own version changed."""
+        recorded = self._recorded.get("document_extraction")
+        if self.force or recorded is None or recorded[0] != self.input_fingerprint("document_extraction"):
+            sql = "SELECT id FROM public.documents WHERE project_id = %(project_id)s::uuid ORDER BY id"
+        else:
+            sql = PENDING_DOCUMENTS_SQL
+        return [str(row[0]) for row in self._query(sql, {"project_id": self.project_id})]
+
+    def removed_documents(self) -> List[str]:
+        """Ids of previously extracted documents that have since been deleted."""
+        return [row[0] for row in self._query(REMOVED_DOCUMENTS_SQL, {"project_id": self.project_id})]
+
+    def input_fingerprint(self, subgraph: str) -> str:
+        if subgraph == "document_extraction":
+            # Per-document tracking decides what to extract; the subgraph-level input is just its version
+            return _digest({"version": self.versions.get(subgraph)})
+        return _digest({
+            "version": self.versions.get(subgraph),
+            "upstream": {name: self.output_fingerprint(name) for name in UPSTREAM[subgraph]},
+        })
+
+    def should_run(self, subgraph: str) -> bool:
+        """Whether subgraph's inputs changed since its last recorded run; call after its upstream has finished."""
+        input_fp = self.input_fingerprint(subgraph)
+        self._pending_inputs[subgraph] = input_fp
+        recorded = self._recorded.get(subgraph)
+        if self.force or recorded is None or recorded[0] != input_fp:
+            run = True
+        elif subgraph == "document_extraction":
+            run = bool(self._query(PENDING_DOCUMENTS_SQL, {"project_id": self.project_id})
+                       or self.removed_documents())
+        else:
+            # Outputs edited outside the flow also count as stale
+            run = recorded[1] != self.output_fingerprint(subgraph)
+        self.decisions[subgraph] = "run" if run else "skip"
+        return run
+
+    def record(self, subgraph: str, document_ids: Optional[List[str]] = None) -> None:
+        """Store the fingerprints of a completed subgraph run (and of the documents it extracted).
+
+        For document_extraction, the document assets of deleted documents are
+        soft-deleted and their per-document fingerprints dropped first, so the
+        recorded output fingerprint no longer includes them.
+
+        All of it runs in one transaction, committed here only on our own
+        connection; on a caller-supplied connection the caller commits.
+        """
+        input_fp = self._pending_inputs.get(subgraph) or self.input_fingerprint(subgraph)
+        self._outputs.pop(subgraph, None)
+        self._in_transaction = True
+        try:
+            if subgraph == "document_extraction":
+                removed = self.removed_documents()
+                if removed:
+                    params = {"project_id": self.project_id, "document_ids": removed}
+                    self._query(RETIRE_DOCUMENT_ASSETS_SQL, params)
+                    self._query(FORGET_DOCUMENTS_SQL, params)
+            output_fp = self.output_fingerprint(subgraph)
+            self._query(RECORD_SQL, {
+                "project_id": self.project_id, "subgraph": subgraph, "scope": "",
+                "input": input_fp, "output": output_fp,
+            })
+            if document_ids:
+                self._query(RECORD_DOCUMENTS_SQL, {"project_id": self.project_id, "document_ids": document_ids})
+            if self._own_conn:
+                self.conn.commit()
+        except Exception:
+            # The cached output fingerprint may reflect the rolled-back retirement
+            self._outputs.pop(subgraph, None)
+            if self._own_conn:
+                self.conn.rollback()
+            raise
+        finally:
+            self._in_transaction = False
+        self._recorded[subgraph] = (input_fp, output_fp)
+        self.decisions[subgraph] = "ran"
+
+    def plan(self) -> Dict[str, str]:
+        """Preview without running anything: clean, stale, or 'maybe' when only upstream is stale."""
+        plan: Dict[str, str] = {}
+        for subgraph in SUBGRAPHS:
+            if self.should_run(subgraph):
+                plan[subgraph] = "stale"
+            elif any(plan[u] != "clean" for u in UPSTREAM[subgraph]):
+                plan[subgraph] = "maybe"
+            else:
+                plan[subgraph] = "clean"
+        self.decisions.clear()
+        return plan
+
+
+def run_incremental(
+    project_id: str,
+    runners: Dict[str, Callable[..., Any]],
+    versions: Optional[Dict[str, str]] = None,
+    force: bool = False,
+) -> Dict[str, str]:
+    """Run the flow, skipping subgraphs whose inputs are unchanged.
+
+    runners maps each subgraph name to a callable taking project_id;
+    document_extraction also receives the list of document ids to (re-)extract.
+    A runner that raises stops the flow and leaves its fingerprints unrecorded,
+    so the next run retries it. Returns {subgraph: "ran" | "skip"}.
+    """
+    with IncrementalRun(project_id, versions, force) as run:
+        for subgraph in SUBGRAPHS:
+            runner = runners.get(subgraph)
+            if runner is None or not run.should_run(subgraph):
+                run.decisions[subgraph] = "skip"
+                continue
+            if subgraph == "document_extraction":
+                document_ids = run.pending_documents()
+                if document_ids:
+                    runner(project_id, document_ids)
+                run.record(subgraph, document_ids)
+            else:
+                runner(project_id)
+                run.record(subgraph)
+        return dict(run.decisions)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Inspect incremental orchestrator state for a project.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    plan = sub.add_parser("plan", help="Show which subgraphs would re-run")
+    plan.add_argument("project_id")
+    reset = sub.add_parser("reset", help="Forget recorded fingerprints so subgraphs re-run")
+    reset.add_argument("project_id")
+    reset.add_argument("--subgraph", choices=SUBGRAPHS)
+    args = parser.parse_args()
+
+    try:
+        with IncrementalRun(args.project_id) as run:
+            if args.command == "reset":
+                rows = run._query(
+                    "DELETE FROM public.subgraph_fingerprints WHERE project_id = %(project_id)s::uuid "
+                    "AND (%(subgraph)s::text IS NULL OR subgraph = %(subgraph)s) RETURNING 1",
+                    {"project_id": args.project_id, "subgraph": args.subgraph},
+                )
+                print(f"✅ Cleared {len(rows)} fingerprints")
+                return 0
+            pending = run.pending_documents()
+            removed = run.removed_documents()
+            for subgraph, state in run.plan().items():
+                icon = {"clean": "✅", "stale": "🔄", "maybe": "❔"}[state]
+                print(f"{icon} {subgraph:22s} {state}")
+            print(f"📄 {len(pending)} document(s) to extract, {len(removed)} deleted document(s) to retire")
+    except psycopg2.Error as e:
+        print(f"❌ Failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
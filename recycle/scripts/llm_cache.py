@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Persistent LLM response cache for the extraction subgraphs.
+
+Subgraph LLM calls go through LLMResponseCache.cached_call(). It looks up
+public.llm_response_cache (migration 018) by a key over (model, model_version,
+prompt_hash, params) and only calls the model on a miss. An orchestrator re-run
+after a downstream-only fix then replays project_details, standards, WBS, LBS
+and ITP responses from the database instead of re-invoking the LLM.
+
+Entries expire after LLM_CACHE_TTL_S seconds (0 keeps them until evicted).
+Every LLM_CACHE_EVICT_EVERY writes, expired rows are deleted and the least
+recently hit rows are dropped until the table fits in LLM_CACHE_MAX_BYTES of
+response JSON. Set LLM_CACHE=off to bypass the cache entirely.
+
+Params that do not change the output (timeouts, retries, streaming) are left
+out of the key; see IGNORED_PARAMS.
+
+Only JSON-serializable responses are cached, and a miss returns the JSON
+round-trip of the response, so callers see the same value (and type) on a miss
+as on every later hit. Responses that are not JSON (e.g. message objects) are
+passed through uncached; convert them to dicts/strings inside call() to cache them.
+
+Usage:
+    python llm_cache.py stats
+    python llm_cache.py evict
+    python llm_cache.py clear [--model M]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Optional, Dict, Any, Callable, Tuple
+
+import psycopg2
+
+from asset_repo import PoolTimeout, get_pool
+
+
+ENABLED = os.getenv("LLM_CACHE", "on").lower() not in ("off", "0", "false")
+DEFAULT_TTL_S = int(os.getenv("LLM_CACHE_TTL_S", str(7 * 24 * 3600)))
+DEFAULT_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+EVICT_EVERY = int(os.getenv("LLM_CACHE_EVICT_EVERY", "100"))
+
+IGNORED_PARAMS = {"timeout", "request_timeout", "max_retries", "stream", "callbacks", "tags", "metadata", "user"}
+
+LOOKUP_SQL = """
+UPDATE public.llm_response_cache
+SET hits = hits + 1, last_hit_at = now()
+WHERE cache_key = %(key)s AND (expires_at IS NULL OR expires_at > now())
+RETURNING response
+"""
+
+STORE_SQL = """
+INSERT INTO public.llm_response_cache (
+  cache_key, model, model_version, prompt_hash, params, agent_id, response, size_bytes,
+  input_tokens, output_tokens, latency_ms, expires_at
+) VALUES (
+  %(key)s, %(model)s, %(model_version)s, %(prompt_hash)s, %(params)s::jsonb, %(agent_id)s,
+  %(response)s::jsonb, %(size_bytes)s, %(input_tokens)s, %(output_tokens)s, %(latency_ms)s,
+  CASE WHEN %(ttl_s)s > 0 THEN now() + make_interval(secs => %(ttl_s)s) END
+)
+ON CONFLICT (cache_key) DO UPDATE SET
+  response = EXCLUDED.response,
+  size_bytes = EXCLUDED.size_bytes,
+  input_tokens = EXCLUDED.input_tokens,
+  output_tokens = EXCLUDED.output_tokens,
+  latency_ms = EXCLUDED.latency_ms,
+  created_at = now(),
+  last_hit_at = now(),
+  expires_at = EXCLUDED.expires_at
+"""
+
+# Keep the most recently hit entries whose running size fits the budget
+EVICT_SQL = """
+WITH expired AS (
+  DELETE FROM public.llm_response_cache
+  WHERE expires_at <= now()
+  RETURNING cache_key
+),
+over_budget AS (
+  DELETE FROM public.llm_response_cache c
+  USING (
+    SELECT cache_key, sum(size_bytes) OVER (ORDER BY last_hit_at DESC, cache_key) AS running
+    FROM public.llm_response_cache
+    WHERE expires_at IS NULL OR expires_at > now()
+  ) r
+  WHERE c.cache_key = r.cache_key AND r.running > %(max_bytes)s
+  RETURNING c.cache_key
+)
+SELECT (SELECT count(*) FROM expired), (SELECT count(*) FROM over_budget)
+"""
+
+STATS_SQL = """
+SELECT model, model_version, count(*), COALESCE(sum(size_bytes), 0), COALESCE(sum(hits), 0),
+       count(*) FILTER (WHERE expires_at <= now())
+FROM public.llm_response_cache
+GROUP BY model, model_version
+ORDER BY model, model_version
+"""
+
+
+def prompt_hash(prompt: Any) -> str:
+    """sha256 of a prompt string or of the canonical JSON of a message list."""
+    if not isinstance(prompt, str):
+        prompt = json.dumps(prompt, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def canonical_params(params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {k: v for k, v in sorted((params or {}).items()) if k not in IGNORED_PARAMS}
+
+
+def cache_key(model: str, model_version: Optional[str], prompt_hash_: str, params: Optional[Dict[str, Any]]) -> bytes:
+    material = json.dumps(
+        [model, model_version, prompt_hash_, canonical_params(params)],
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(material.encode("utf-8")).digest()
+
+
+class LLMResponseCache:
+    """Read-through response cache over public.llm_response_cache."""
+
+    def __init__(self, ttl_s: int = DEFAULT_TTL_S, max_bytes: int = DEFAULT_MAX_BYTES,
+                 evict_every: int = EVICT_EVERY, enabled: bool = ENABLED):
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes) -> Tuple[bool, Any]:
+        """Return (found, response); found tells a cached JSON null apart from a miss."""
+        conn = get_pool().getconn()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(LOOKUP_SQL, {"key": psycopg2.Binary(key)})
+                row = cursor.fetchone()
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            get_pool().putconn(conn)
+        return (True, row[0]) if row else (False, None)
+
+    def put(self, key: bytes, model: str, model_version: Optional[str], prompt_hash_: str,
+            params: Optional[Dict[str, Any]], response: Any, agent_id: Optional[str] = None,
+            usage: Optional[Dict[str, Any]] = None, latency_ms: Optional[int] = None) -> None:
+        """Store a response; raises TypeError/ValueError if it is not plain JSON."""
+        self._store(key, model, model_version, prompt_hash_, params, json.dumps(response, allow_nan=False),
+                    agent_id, usage, latency_ms)
+
+    def _store(self, key: bytes, model: str, model_version: Optional[str], prompt_hash_: str,
+               params: Optional[Dict[str, Any]], body: str, agent_id: Optional[str],
+               usage: Optional[Dict[str, Any]], latency_ms: Optional[int]) -> None:
+        usage = usage or {}
+        conn = get_pool().getconn()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(STORE_SQL, {
+                    "key": psycopg2.Binary(key),
+                    "model": model,
+                    "model_version": model_version,
+                    "prompt_hash": prompt_hash_,
+                    "params": json.dumps(canonical_params(params), default=str),
+                    "agent_id": agent_id,
+                    "response": body,
+                    "size_bytes": len(body.encode("utf-8")),
+                    "input_tokens": usage.get("input_tokens"),
+                    "output_tokens": usage.get("output_tokens"),
+                    "latency_ms": latency_ms,
+                    "ttl_s": self.ttl_s,
+                })
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            get_pool().putconn(conn)
+
+        with self._lock:
+            self._writes += 1
+            due = self.evict_every > 0 and self._writes % self.evict_every == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> Tuple[int, int]:
+        """Delete expired entries, then the least recently hit ones past max_bytes; returns both counts."""
+        conn = get_pool().getconn()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(EVICT_SQL, {"max_bytes": self.max_bytes})
+                expired, evicted = cursor.fetchone()
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            get_pool().putconn(conn)
+        return expired, evicted
+
+    def cached_call(
+        self,
+        model: str,
+        model_version: Optional[str],
+        prompt: Any,
+        params: Optional[Dict[str, Any]],
+        call: Callable[[], Any],
+        agent_id: Optional[str] = None,
+        usage: Optional[Callable[[Any], Dict[str, Any]]] = None,
+    ) -> Any:
+        """Return the cached response for this call, or run call() and cache its result.
+
+        A JSON-serializable result is cached and returned as decoded JSON, exactly as a
+        later hit would return it; anything else is returned as is and not cached.
+        usage, if given, extracts {"input_tokens", "output_tokens"} from a response for
+        the cache row. Cache errors, and errors from usage, never fail the call.
+        """
+        if not self.enabled:
+            return call()
+        hash_ = prompt_hash(prompt)
+        key = cache_key(model, model_version, hash_, params)
+        try:
+            found, cached = self.get(key)
+        except (psycopg2.Error, PoolTimeout):
+            found, cached = False, None
+        if found:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        started = time.perf_counter()
+        response = call()
+        latency_ms = int((time.perf_counter() - started) * 1000)
+        try:
+            body = json.dumps(response, allow_nan=False)
+        except (TypeError, ValueError):
+            # A hit would replay decoded JSON, not this object; don't cache it
+            return response
+        try:
+            token_usage = usage(response) if usage else None
+        except Exception:
+            token_usage = None
+        try:
+            self._store(key, model, model_version, hash_, params, body, agent_id, token_usage, latency_ms)
+        except (psycopg2.Error, PoolTimeout):
+            pass
+        return json.loads(body)
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Process-wide cache configured from the LLM_CACHE_* environment variables."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache()
+        return _cache
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Inspect and maintain the LLM response cache.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Entries, bytes and hits per model")
+    sub.add_parser("evict", help="Apply TTL and size limits now")
+    clear = sub.add_parser("clear", help="Delete cached responses")
+    clear.add_argument("--model", help="Only this model")
+    args = parser.parse_args()
+
+    cache = get_llm_cache()
+    conn = None
+    try:
+        if args.command == "evict":
+            expired, evicted = cache.evict()
+            print(f"✅ Removed {expired} expired and {evicted} over-budget entries")
+            return 0
+
+        conn = get_pool().getconn()
+        with conn.cursor() as cursor:
+            if args.command == "clear":
+                cursor.execute(
+                    "DELETE FROM public.llm_response_cache WHERE %(model)s::text IS NULL OR model = %(model)s",
+                    {"model": args.model},
+                )
+                print(f"✅ Deleted {cursor.rowcount} entries")
+            else:
+                cursor.execute(STATS_SQL)
+                print(f"{'model':30s} {'version':16s} {'entries':>8s} {'MB':>9s} {'hits':>8s} {'expired':>8s}")
+                for model, version, entries, size, hits, expired in cursor.fetchall():
+                    print(f"{model:30s} {str(version or '-'):16s} {entries:8d} {size / 1048576:9.2f} {hits:8d} {expired:8d}")
+        conn.commit()
+    except psycopg2.Error as e:
+        print(f"❌ Cache {args.command} failed: {e}")
+        return 1
+    finally:
+        if conn is not None:
+            get_pool().putconn(conn)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Restore a COPY-format QSE dump written by backup_qse_docs.py.
+
+Each COPY block is streamed into a temp staging table and merged into
+public.assets with one INSERT ... ON CONFLICT (id) statement, instead of
+replaying one INSERT per document.
+
+With --defer-triggers the organization, timestamp and BELONGS_TO_PROJECT edge
+triggers on public.assets are disabled for the load. The merge always
+resolves organization_id from the project, and the due_sla_at/scheduled_at/
+requested_for_at columns and BELONGS_TO_PROJECT edges are rebuilt afterwards
+with one set-based statement each. Disabling triggers needs table ownership; everything happens in one
+transaction, so a failed restore leaves the triggers enabled.
+"""
+
+import argparse
+import re
+import sys
+
+import psycopg2
+
+from backup_qse_docs import get_db_connection, open_backup_for_read
+
+
+# Names as of migrations/013_statement_level_asset_triggers.sql
+ASSET_TRIGGERS = [
+    "trg_assets_set_org",
+    "trg_assets_compute_timestamps",
+    "trg_assets_compute_timestamps_upd",
+    "trg_assets_belongs_to_project_edge_ins",
+    "trg_assets_belongs_to_project_edge_upd",
+]
+
+COPY_HEADER = re.compile(r"^COPY\s+(?:public\.)?assets\s*\(([^)]*)\)\s+FROM\s+stdin;\s*$", re.IGNORECASE)
+
+# Columns the merge is allowed to touch; anything else in a dump header is rejected
+RESTORABLE_COLUMNS = {
+    "id", "asset_uid", "version", "is_current", "type", "name", "organization_id", "project_id",
+    "document_number", "revision_code", "metadata", "content", "created_at", "updated_at",
+}
+
+
+class CopyBlockStream:
+    """File-like view over the data lines of one COPY block, stopping at the \\. terminator."""
+
+    def __init__(self, f):
+        self._f = f
+        self._done = False
+        self.rows = 0
+
+    def read(self, size=-1):
+        if self._done:
+            return ""
+        line = self._f.readline()
+        if not line or line.rstrip("\r\n") == "\\.":
+            self._done = True
+            return ""
+        self.rows += 1
+        return line
+
+
+def merge_sql(columns):
+    """Upsert staged rows by id, deriving organization_id from the project like trg_assets_set_org."""
+    select_cols = []
+    for col in columns:
+        if col == "organization_id":
+            select_cols.append("COALESCE(p.organization_id, s.organization_id)")
+        else:
+            select_cols.append(f"s.{col}")
+    updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in columns if col != "id")
+    return f"""
+        INSERT INTO public.assets ({", ".join(columns)})
+        SELECT {", ".join(select_cols)}
+        FROM _qse_restore s
+        LEFT JOIN public.projects p ON p.id = s.project_id
+        ON CONFLICT (id) DO UPDATE SET {updates}
+    """
+
+
+# Current heads for the same asset_uid must be demoted before the merge (uq_assets_current_head)
+DEMOTE_HEADS_SQL = """
+    UPDATE public.assets a SET is_current = false
+    FROM _qse_restore s
+    WHERE s.is_current AND a.is_current
+      AND a.asset_uid = s.asset_uid AND a.id <> s.id
+"""
+
+REBUILD_TIMESTAMPS_SQL = """
+    UPDATE public.assets a SET
+      due_sla_at = NULLIF(a.content->>'sla_due_at','')::timestamptz,
+      scheduled_at = NULLIF(a.content->>'scheduled_at','')::timestamptz,
+      requested_for_at = NULLIF(a.content->>'requested_for','')::timestamptz
+    FROM _qse_restore s
+    WHERE a.id = s.id
+"""
+
+# Same edge ensure_belongs_to_project_edges() would write, keyed on its deterministic idempotency_key
+REBUILD_PROJECT_EDGES_SQL = """
+    INSERT INTO public.asset_edges (id, from_asset_id, to_asset_id, edge_type, properties, idempotency_key)
+    SELECT gen_random_uuid(), a.id, pa.id, 'BELONGS_TO_PROJECT', '{}'::jsonb, concat('BELONGS_TO_PROJECT:', a.id::text)
+    FROM _qse_restore s
+    JOIN public.assets a ON a.id = s.id
+    JOIN public.assets pa ON pa.id = a.project_id AND pa.type = 'project' AND pa.is_current AND NOT pa.is_deleted
+    ON CONFLICT (edge_type, idempotency_key) WHERE idempotency_key IS NOT NULL
+    DO UPDATE SET to_asset_id = EXCLUDED.to_asset_id
+"""
+
+
+def set_triggers(cursor, enabled):
+    action = "ENABLE" if enabled else "DISABLE"
+    for trigger in ASSET_TRIGGERS:
+        cursor.execute(f"ALTER TABLE public.assets {action} TRIGGER {trigger}")
+
+
+def restore_dump(path, defer_triggers=False):
+    """Load every COPY block in a dump and merge it into public.assets; returns rows restored."""
+    conn = get_db_connection()
+    restored = 0
+    try:
+        with conn.cursor() as cursor, open_backup_for_read(path) as f:
+            cursor.execute("""
+                CREATE TEMP TABLE _qse_restore (LIKE public.assets INCLUDING DEFAULTS) ON COMMIT DROP
+            """)
+            # Older dumps carry no organization_id; the merge fills it from the project
+            cursor.execute("ALTER TABLE _qse_restore ALTER COLUMN organization_id DROP NOT NULL")
+            if defer_triggers:
+                set_triggers(cursor, enabled=False)
+
+            for line in iter(f.readline, ""):
+                match = COPY_HEADER.match(line)
+                if not match:
+                    continue
+                columns = [c.strip() for c in match.group(1).split(",")]
+                unknown = set(columns) - RESTORABLE_COLUMNS
+                if unknown or "id" not in columns:
+                    raise ValueError(f"Unsupported columns in dump: {sorted(unknown) or 'missing id'}")
+
+                cursor.execute("TRUNCATE _qse_restore")
+                block = CopyBlockStream(f)
+                cursor.copy_expert(f"COPY _qse_restore ({', '.join(columns)}) FROM STDIN", block)
+                if "is_current" in columns and "asset_uid" in columns:
+                    cursor.execute(DEMOTE_HEADS_SQL)
+                cursor.execute(merge_sql(columns))
+                if defer_triggers:
+                    cursor.execute(REBUILD_TIMESTAMPS_SQL)
+                    cursor.execute(REBUILD_PROJECT_EDGES_SQL)
+                restored += block.rows
+                print(f"Restored {block.rows} rows from COPY block")
+
+            if defer_triggers:
+                set_triggers(cursor, enabled=True)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return restored
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Restore a COPY-format QSE dump into public.assets.")
+    parser.add_argument("dump", help="Path to qse_docs_backup_*.sql (optionally .gz/.zst)")
+    parser.add_argument("--defer-triggers", action="store_true",
+                        help="Disable the asset triggers during the load and rebuild their effects in bulk")
+    args = parser.parse_args()
+
+    try:
+        restored = restore_dump(args.dump, defer_triggers=args.defer_triggers)
+    except (psycopg2.Error, ValueError) as e:
+        print(f"Error during restore: {e}")
+        return 1
+    print(f"Restore completed: {restored} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
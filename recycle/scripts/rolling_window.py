@@ -1,35 +1,377 @@
 #!/usr/bin/env python3
 import argparse
+import asyncio
+import json
+import mmap
 import os
+import select
+import signal
+import stat
+import struct
 import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+
+class RingBuffer:
+    """Fixed-size circular byte buffer; input is read straight into it and never reallocated."""
+
+    def __init__(self, capacity: int, buf=None):
+        self.capacity = capacity
+        self._view = memoryview(buf if buf is not None else bytearray(capacity))
+        self._head = 0  # next write position
+        self._size = 0
+
+    def read_from(self, fd: int, limit: int = 65536) -> int:
+        """Read up to `limit` bytes from fd into the free/oldest region; returns bytes read (0 on EOF)."""
+        end = min(self.capacity, self._head + limit)
+        n = os.readv(fd, [self._view[self._head:end]])
+        if n:
+            self._head = (self._head + n) % self.capacity
+            self._size = min(self.capacity, self._size + n)
+        return n
+
+    def segments(self):
+        """The retained bytes oldest-first, as at most two zero-copy memoryview slices."""
+        if self._size < self.capacity:
+            return [self._view[:self._head]]
+        return [self._view[self._head:], self._view[:self._head]]
+
+    def write_to(self, path: str) -> None:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.writev(fd, self.segments())
+        finally:
+            os.close(fd)
+
+
+# --mmap window file layout: a fixed header followed by the ring itself.
+#   magic, format version, capacity, head (next write offset), size (bytes retained), seq
+# seq is a seqlock counter: odd while the writer is mid-update, bumped to even when done.
+WINDOW_MAGIC = b"RWIN"
+WINDOW_VERSION = 1
+WINDOW_HEADER = struct.Struct("<4sHxxQQQQ")
+WINDOW_DATA_OFFSET = 64
+
+
+class MmapRingBuffer(RingBuffer):
+    """RingBuffer living in a shared mmap'd file, so readers see every chunk with no rewrite."""
+
+    def __init__(self, path: str, capacity: int):
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        os.ftruncate(self._fd, WINDOW_DATA_OFFSET + capacity)
+        self._map = mmap.mmap(self._fd, WINDOW_DATA_OFFSET + capacity)
+        super().__init__(capacity, memoryview(self._map)[WINDOW_DATA_OFFSET:])
+        self._seq = 0
+        self._publish()
+
+    def _publish(self) -> None:
+        WINDOW_HEADER.pack_into(self._map, 0, WINDOW_MAGIC, WINDOW_VERSION,
+                                self.capacity, self._head, self._size, self._seq)
+
+    def read_from(self, fd: int, limit: int = 65536) -> int:
+        # Only call once fd is readable, so the odd (in-progress) seq is held for one read
+        self._seq += 1
+        self._publish()
+        try:
+            return super().read_from(fd, limit)
+        finally:
+            self._seq += 1
+            self._publish()
+
+    def close(self) -> None:
+        self._view.release()
+        self._map.close()
+        os.close(self._fd)
+
+
+class WindowReader:
+    """Read the ordered tail of a --mmap window file without copying it out of the mapping."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, capacity, _, _, _ = WINDOW_HEADER.unpack_from(self._map, 0)
+        if magic != WINDOW_MAGIC or version != WINDOW_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a rolling window file")
+        self.capacity = capacity
+        self._data = memoryview(self._map)[WINDOW_DATA_OFFSET:WINDOW_DATA_OFFSET + capacity]
+
+    @property
+    def seq(self) -> int:
+        return WINDOW_HEADER.unpack_from(self._map, 0)[5]
+
+    def segments(self) -> Tuple[int, List[memoryview]]:
+        """Return (seq, oldest-first views). Views alias the live ring: check seq before trusting them."""
+        while True:
+            _, _, _, head, size, seq = WINDOW_HEADER.unpack_from(self._map, 0)
+            if seq % 2 == 0:
+                break
+            time.sleep(0)
+        if size < self.capacity:
+            return seq, [self._data[:head]]
+        return seq, [self._data[head:], self._data[:head]]
+
+    def changed_since(self, seq: int) -> bool:
+        return self.seq != seq
+
+    def read(self) -> bytes:
+        """Consistent copy of the current window, retrying if the writer moved mid-read."""
+        while True:
+            seq, views = self.segments()
+            data = b"".join(views)
+            if not self.changed_since(seq):
+                return data
+
+    def close(self) -> None:
+        self._data.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_window(path: str) -> bytes:
+    with WindowReader(path) as reader:
+        return reader.read()
+
+
+def run_mmap(fd: int, path: str, max_bytes: int) -> None:
+    ring = MmapRingBuffer(path, max_bytes)
+    try:
+        while True:
+            select.select([fd], [], [])
+            if not ring.read_from(fd):
+                break
+    finally:
+        ring.close()
+
+
+class StreamWindow:
+    """One multiplexed input: a pipe or FIFO feeding its own bounded window file."""
+
+    def __init__(self, name: str, source: str, window_path: str, capacity: int, use_mmap: bool):
+        self.name = name
+        self.source = source
+        self.window_path = window_path
+        self.temp_path = f"{window_path}.tmp"
+        self.use_mmap = use_mmap
+        self.ring = MmapRingBuffer(window_path, capacity) if use_mmap else RingBuffer(capacity)
+        self.pending = 0
+        self.bytes_seen = 0
+        self.last_data_at: Optional[str] = None
+        self.eof = False
+        self.fd = self._open()
+
+    def _open(self) -> int:
+        if self.source == "-":
+            fd = sys.stdin.buffer.fileno()
+        elif stat.S_ISFIFO(os.stat(self.source).st_mode):
+            # O_RDWR keeps a writer attached, so the FIFO never reports EOF/HUP between producers
+            # and a restarted process can reopen it and carry on in the same window
+            fd = os.open(self.source, os.O_RDWR | os.O_NONBLOCK)
+        else:
+            fd = os.open(self.source, os.O_RDONLY | os.O_NONBLOCK)
+        os.set_blocking(fd, False)
+        return fd
+
+    def on_readable(self, flush_bytes: int) -> None:
+        try:
+            n = self.ring.read_from(self.fd)
+        except BlockingIOError:
+            return
+        if not n:
+            self.eof = True
+            return
+        self.pending += n
+        self.bytes_seen += n
+        self.last_data_at = datetime.now(timezone.utc).isoformat()
+        if self.pending >= flush_bytes:
+            self.flush()
+
+    def flush(self) -> None:
+        # mmap windows are already current; only plain files need rewriting
+        if self.pending and not self.use_mmap:
+            self.ring.write_to(self.temp_path)
+            os.replace(self.temp_path, self.window_path)
+        self.pending = 0
+
+    def describe(self) -> Dict[str, object]:
+        return {
+            "source": self.source,
+            "window": self.window_path,
+            "format": "mmap" if self.use_mmap else "plain",
+            "capacity": self.ring.capacity,
+            "bytes_seen": self.bytes_seen,
+            "last_data_at": self.last_data_at,
+            "eof": self.eof,
+        }
+
+    def close(self) -> None:
+        if self.fd != sys.stdin.buffer.fileno():
+            os.close(self.fd)
+        if self.use_mmap:
+            self.ring.close()
+
+
+def write_index(index_path: str, windows: List[StreamWindow]) -> None:
+    index = {
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "streams": {w.name: w.describe() for w in windows},
+    }
+    temp_path = f"{index_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    os.replace(temp_path, index_path)
+
+
+async def run_multiplexed(windows: List[StreamWindow], index_path: str,
+                          flush_interval: float, flush_bytes: int) -> None:
+    """Read every stream from one event loop; flush windows and the index once per interval."""
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    watched, drained = [], []
+    for w in windows:
+        try:
+            loop.add_reader(w.fd, w.on_readable, flush_bytes)
+            watched.append(w)
+        except PermissionError:
+            # Regular files can't be registered with epoll; they are always readable, so drain per tick
+            drained.append(w)
+    write_index(index_path, windows)
+    try:
+        while not stop.is_set() and not all(w.eof for w in windows):
+            try:
+                await asyncio.wait_for(stop.wait(), flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            changed = False
+            for w in list(drained):
+                while not w.eof:
+                    before = w.bytes_seen
+                    w.on_readable(flush_bytes)
+                    if w.bytes_seen == before:
+                        break
+                    changed = True
+                if w.eof:
+                    drained.remove(w)
+                    changed = True
+            for w in windows:
+                changed = changed or bool(w.pending)
+                w.flush()
+                if w.eof and w in watched:
+                    loop.remove_reader(w.fd)
+                    watched.remove(w)
+                    changed = True
+            if changed:
+                write_index(index_path, windows)
+    finally:
+        for w in watched:
+            loop.remove_reader(w.fd)
+        for w in windows:
+            w.flush()
+        write_index(index_path, windows)
+
+
+def parse_streams(specs: List[str]) -> List[Tuple[str, str]]:
+    streams = []
+    for spec in specs:
+        name, sep, source = spec.partition("=")
+        if not sep or not name or not source or os.sep in name:
+            raise ValueError(f"--stream expects NAME=PATH, got {spec!r}")
+        streams.append((name, source))
+    if len({name for name, _ in streams}) != len(streams):
+        raise ValueError("--stream names must be unique")
+    return streams
 
 
 def main() -> int:
     parser = argparse.ArgumentParser(description="Maintain a rolling window of the last N bytes from stdin.")
-    parser.add_argument("--output", required=True, help="Path to output file that will always contain the latest N bytes")
+    parser.add_argument("--output", required=True,
+                        help="Path to output file that will always contain the latest N bytes "
+                             "(with --stream: the JSON index; windows are written to <output>.<name>)")
     parser.add_argument("--bytes", type=int, default=10000, help="Number of bytes to retain (default: 10000)")
+    parser.add_argument("--flush-interval", type=float, default=0.5,
+                        help="Rewrite the output at most this often while input keeps arriving, in seconds (default: 0.5)")
+    parser.add_argument("--flush-bytes", type=int, default=None,
+                        help="Also rewrite once this many new bytes are pending (default: the window size)")
+    parser.add_argument("--mmap", action="store_true",
+                        help="Keep the window as a shared-memory ring file updated in place (read it with WindowReader)")
+    parser.add_argument("--stream", action="append", default=[], metavar="NAME=PATH",
+                        help="Multiplex a pipe or FIFO (or - for stdin) into its own window; repeatable")
     args = parser.parse_args()
 
     target_path = os.path.abspath(args.output)
     temp_path = f"{target_path}.tmp"
     max_bytes = max(1, args.bytes)
 
-    buffer = bytearray()
-    read = sys.stdin.buffer.read
+    if args.stream:
+        try:
+            streams = parse_streams(args.stream)
+        except ValueError as e:
+            parser.error(str(e))
+        windows = [StreamWindow(name, source, f"{target_path}.{name}", max_bytes, args.mmap)
+                   for name, source in streams]
+        flush_bytes = max(1, args.flush_bytes or max_bytes)
+        try:
+            asyncio.run(run_multiplexed(windows, target_path, max(0.01, args.flush_interval), flush_bytes))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for w in windows:
+                w.close()
+        return 0
+
+    if args.mmap:
+        try:
+            run_mmap(sys.stdin.buffer.fileno(), target_path, max_bytes)
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    flush_interval = max(0.0, args.flush_interval)
+    flush_bytes = max(1, args.flush_bytes or max_bytes)
+
+    ring = RingBuffer(max_bytes)
+    fd = sys.stdin.buffer.fileno()
+    pending = 0
+    last_flush = time.monotonic()
+
+    def flush() -> None:
+        nonlocal pending, last_flush
+        ring.write_to(temp_path)
+        os.replace(temp_path, target_path)
+        pending = 0
+        last_flush = time.monotonic()
 
     try:
         while True:
-            chunk = read(8192)
-            if not chunk:
+            if pending:
+                # Wake up in time to publish a quiet stream's last lines
+                timeout = max(0.0, last_flush + flush_interval - time.monotonic())
+                ready, _, _ = select.select([fd], [], [], timeout)
+                if not ready:
+                    flush()
+                    continue
+            n = ring.read_from(fd)
+            if not n:
                 break
-            buffer += chunk
-            if len(buffer) > max_bytes:
-                buffer = buffer[-max_bytes:]
-            with open(temp_path, "wb") as tmpf:
-                tmpf.write(buffer)
-            os.replace(temp_path, target_path)
+            pending += n
+            if pending >= flush_bytes or time.monotonic() - last_flush >= flush_interval:
+                flush()
+        if pending:
+            flush()
     except KeyboardInterrupt:
-        pass
+        if pending:
+            flush()
     except Exception as exc:
         # Write the error into the window file for visibility, then exit non-zero
         try:
@@ -44,5 +386,3 @@ def main() -> int:
 
 if __name__ == "__main__":
     raise SystemExit(main())
-
-
@@ -1,38 +1,6 @@
-import os
 import sys
-import time
-from typing import Optional, Dict, Any
 
-from sqlalchemy import create_engine, text
-
-
-def get_db_url() -> str:
-    url = os.getenv("DATABASE_URL")
-    if url:
-        # Normalize scheme for SQLAlchemy if needed
-        if url.startswith("postgres://"):
-            url = url.replace("postgres://", "postgresql+psycopg2://", 1)
-        if url.startswith("postgresql://"):
-            url = url.replace("postgresql://", "postgresql+psycopg2://", 1)
-        return url
-    host = os.getenv("DB_HOST", "localhost")
-    port = os.getenv("DB_PORT", "5555")
-    user = os.getenv("DB_USER", "postgres")
-    password = os.getenv("DB_PASSWORD", "password")
-    database = os.getenv("DB_NAME", "projectpro")
-    return f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}"
-
-
-def wait_for_row(query: str, params: Dict[str, Any], timeout_s: int = 30) -> Optional[Dict[str, Any]]:
-    engine = create_engine(get_db_url())
-    deadline = time.time() + timeout_s
-    with engine.connect() as conn:
-        while time.time() < deadline:
-            row = conn.execute(text(query), params).mappings().fetchone()
-            if row:
-                return dict(row)
-            time.sleep(0.5)
-    return None
+from asset_wait import wait_for_row
 
 
 def verify_document_extraction_upsert(project_id: str, source_document_id: str) -> bool:
@@ -1,97 +1,144 @@
-import os
+import re
 import sys
 import time
-from typing import Optional, Dict, Any
-
-from sqlalchemy import create_engine, text
-
-
-def get_db_url() -> str:
-    url = os.getenv("DATABASE_URL")
-    if url:
-        # Normalize scheme for SQLAlchemy if needed
-        if url.startswith("postgres://"):
-            url = url.replace("postgres://", "postgresql+psycopg2://", 1)
-        if url.startswith("postgresql://"):
-            url = url.replace("postgresql://", "postgresql+psycopg2://", 1)
-        return url
-    host = os.getenv("DB_HOST", "localhost")
-    port = os.getenv("DB_PORT", "5555")
-    user = os.getenv("DB_USER", "postgres")
-    password = os.getenv("DB_PASSWORD", "password")
-    database = os.getenv("DB_NAME", "projectpro")
-    return f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}"
-
-
-def wait_for_row(query: str, params: Dict[str, Any], timeout_s: int = 30) -> Optional[Dict[str, Any]]:
-    engine = create_engine(get_db_url())
-    deadline = time.time() + timeout_s
-    with engine.connect() as conn:
-        while time.time() < deadline:
-            row = conn.execute(text(query), params).mappings().fetchone()
-            if row:
-                return dict(row)
-            time.sleep(0.5)
-    return None
+from typing import Optional, Dict, Any, List, Tuple
 
+from sqlalchemy import text
 
-def verify_processed_document(project_id: str, source_document_id: str) -> bool:
-    row = wait_for_row(
-        query=(
+from asset_wait import AssetWriteWaiter, get_engine, wait_for_row
+
+
+def check_query(kind: str, project_id: str, arg: Optional[str] = None) -> Tuple[str, str, Dict[str, Any]]:
+    """Return (label, query, params) for one check; shared by the single and batch runners."""
+    if kind == "processed_document":
+        return "processed_document", (
             "SELECT id, type, name, idempotency_key FROM public.assets "
             "WHERE project_id = :pid AND type = 'document' "
             "AND content->>'source_document_id' = :sdid AND is_current = true"
-        ),
-        params={"pid": project_id, "sdid": source_document_id},
-    )
-    print({"check": "processed_document", "found": bool(row), "row": row})
+        ), {"pid": project_id, "sdid": arg}
+    if kind == "project_details":
+        return "project_details", (
+            "SELECT id, type, name, idempotency_key FROM public.assets "
+            "WHERE project_id = :pid AND type = 'project' "
+            "AND idempotency_key = :ikey AND is_current = true"
+        ), {"pid": project_id, "ikey": f"project_details:{project_id}"}
+    if kind == "standards":
+        return "standards", (
+            "SELECT id FROM public.assets WHERE project_id = :pid AND type = 'standard' AND is_current = true LIMIT 1"
+        ), {"pid": project_id}
+    if kind == "plan":
+        return f"plan:{arg}", (
+            "SELECT id, type, name, idempotency_key FROM public.assets "
+            "WHERE project_id = :pid AND type = 'plan' AND is_current = true "
+            "AND idempotency_key = :ikey"
+        ), {"pid": project_id, "ikey": f"plan:{project_id}:{arg}"}
+    raise ValueError(f"Unknown check: {kind}")
+
+
+def verify_processed_document(project_id: str, source_document_id: str) -> bool:
+    label, query, params = check_query("processed_document", project_id, source_document_id)
+    row = wait_for_row(query=query, params=params)
+    print({"check": label, "found": bool(row), "row": row})
     return bool(row)
 
 
 def verify_project_details(project_id: str) -> bool:
-    row = wait_for_row(
-        query=(
-            "SELECT id, type, name, idempotency_key FROM public.assets "
-            "WHERE project_id = :pid AND type = 'project' "
-            "AND idempotency_key = :ikey AND is_current = true"
-        ),
-        params={"pid": project_id, "ikey": f"project_details:{project_id}"},
-    )
-    print({"check": "project_details", "found": bool(row), "row": row})
+    label, query, params = check_query("project_details", project_id)
+    row = wait_for_row(query=query, params=params)
+    print({"check": label, "found": bool(row), "row": row})
     return bool(row)
 
 
 def verify_standards(project_id: str) -> bool:
-    row = wait_for_row(
-        query=(
-            "SELECT id FROM public.assets WHERE project_id = :pid AND type = 'standard' AND is_current = true LIMIT 1"
-        ),
-        params={"pid": project_id},
-    )
-    print({"check": "standards", "found": bool(row), "row": row})
+    label, query, params = check_query("standards", project_id)
+    row = wait_for_row(query=query, params=params)
+    print({"check": label, "found": bool(row), "row": row})
     return bool(row)
 
 
 def verify_plan_asset(project_id: str, plan_type: str) -> bool:
-    row = wait_for_row(
-        query=(
-            "SELECT id, type, name, idempotency_key FROM public.assets "
-            "WHERE project_id = :pid AND type = 'plan' AND is_current = true "
-            "AND idempotency_key = :ikey"
-        ),
-        params={"pid": project_id, "ikey": f"plan:{project_id}:{plan_type}"},
-    )
-    print({"check": f"plan:{plan_type}", "found": bool(row), "row": row})
+    label, query, params = check_query("plan", project_id, plan_type)
+    row = wait_for_row(query=query, params=params)
+    print({"check": label, "found": bool(row), "row": row})
     return bool(row)
 
 
+def batch_query(checks: List[Tuple[str, str, Dict[str, Any]]]) -> Tuple[str, Dict[str, Any]]:
+    """UNION ALL the pending checks into one statement returning (check_name, row) per resolved check."""
+    branches = []
+    params: Dict[str, Any] = {}
+    for i, (label, query, check_params) in enumerate(checks):
+        # Suffix bind names so every branch keeps its own parameters (:pid -> :pid_0)
+        branch = re.sub(r"(?<!:):(\w+)", lambda m: f":{m.group(1)}_{i}", query)
+        branches.append(f"(SELECT :check_{i} AS check_name, to_jsonb(q) AS row FROM ({branch}) q LIMIT 1)")
+        params.update({f"{key}_{i}": value for key, value in check_params.items()})
+        params[f"check_{i}"] = label
+    return "\nUNION ALL\n".join(branches), params
+
+
+def run_checks(project_id: str, specs: List[Tuple[str, Optional[str]]], timeout_s: int = 30) -> bool:
+    """Evaluate many checks with one round trip per poll, reporting each as soon as it resolves."""
+    pending = {}
+    for kind, arg in specs:
+        _, query, params = check_query(kind, project_id, arg)
+        # Label by kind and argument so several processed_document checks stay distinct
+        label = f"{kind}:{arg}" if arg else kind
+        pending[label] = (label, query, params)
+
+    engine = get_engine()
+    deadline = time.monotonic() + timeout_s
+    waiter = AssetWriteWaiter(engine)
+    try:
+        with engine.connect() as conn:
+            while pending:
+                query, params = batch_query(list(pending.values()))
+                for check_name, row in conn.execute(text(query), params):
+                    pending.pop(check_name, None)
+                    print({"check": check_name, "found": True, "row": row})
+                remaining = deadline - time.monotonic()
+                if not pending or remaining <= 0:
+                    break
+                # Any write to this project may resolve one of the remaining checks
+                waiter.wait({"project_id": project_id}, remaining)
+    finally:
+        waiter.close()
+
+    for label in pending:
+        print({"check": label, "found": False, "row": None})
+    return not pending
+
+
+def parse_check_specs(args: List[str]) -> List[Tuple[str, Optional[str]]]:
+    """Parse batch arguments such as processed_document:<id>, project_details, standards, plan:<type>."""
+    specs = []
+    for arg in args:
+        kind, _, value = arg.partition(":")
+        if kind in ("processed_document", "plan") and not value:
+            raise ValueError(f"{kind} needs an argument, e.g. {kind}:<value>")
+        specs.append((kind, value or None))
+    return specs
+
+
 if __name__ == "__main__":
     if len(sys.argv) < 3:
         print("Usage: python scripts/verify_upserts.py <check> <project_id> [extra]")
         print("Checks: processed_document <source_document_id> | project_details | standards | plan <plan_type>")
+        print("   or: python scripts/verify_upserts.py batch <project_id> <check>[:<extra>] ...")
         sys.exit(2)
     check = sys.argv[1]
     pid = sys.argv[2]
+    if check == "batch":
+        try:
+            specs = parse_check_specs(sys.argv[3:])
+            if not specs:
+                raise ValueError("batch needs at least one check")
+            for kind, arg in specs:
+                check_query(kind, pid, arg)
+        except ValueError as e:
+            print(e)
+            sys.exit(2)
+        ok = run_checks(pid, specs)
+        sys.exit(0 if ok else 1)
     if check == "processed_document":
         ok = verify_processed_document(pid, sys.argv[3])
         sys.exit(0 if ok else 1)
@@ -106,6 +153,3 @@ if __name__ == "__main__":
         sys.exit(0 if ok else 1)
     print("Unknown check")
     sys.exit(2)
-
-
-
@@ -9,6 +9,18 @@ import uuid
 import importlib.util
 from typing import Dict, List, Any
 
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_asset_repo = None
+
+def load_asset_repo():
+    """Load the shared repo helpers (and their process-wide connection pool) once"""
+    global _asset_repo
+    if _asset_repo is None:
+        spec = importlib.util.spec_from_file_location("asset_repo", os.path.join(_HERE, "scripts", "asset_repo.py"))
+        _asset_repo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(_asset_repo)
+    return _asset_repo
+
 def test_upsert_function_directly():
     """Test the upsertAssetsAndEdges function directly without any package imports"""
     print("🔍 Testing upsertAssetsAndEdges Function Directly")
@@ -22,7 +34,9 @@ def test_upsert_function_directly():
 
     # Import action_graph_repo directly using importlib
     print("\n📦 Importing action_graph_repo directly...")
-    spec = importlib.util.spec_from_file_location("action_graph_repo", "services/langgraph_v10/src/agent/action_graph_repo.py")
+    spec = importlib.util.spec_from_file_location(
+        "action_graph_repo", os.path.join(_HERE, "services", "langgraph_v10", "src", "agent", "action_graph_repo.py")
+    )
 
     # Create a clean module without the agent package initialization
     action_graph_repo = importlib.util.module_from_spec(spec)
@@ -112,26 +126,13 @@ def setup_test_environment():
     """Set up test project and documents in database"""
     print("🏗️ Setting up test environment...")
 
-    # Import database functions directly
-    spec = importlib.util.spec_from_file_location("action_graph_repo", "services/langgraph_v10/src/agent/action_graph_repo.py")
-    action_graph_repo = importlib.util.module_from_spec(spec)
-
-    # Set up minimal modules
-    import psycopg2
-    from psycopg2.extras import Json
-    sys.modules['psycopg2'] = psycopg2
-    sys.modules['psycopg2.extras'] = psycopg2.extras
-
-    spec.loader.exec_module(action_graph_repo)
-    get_database_url = action_graph_repo.get_database_url
-
-    import psycopg2
     from psycopg2.extras import Json
 
+    pool = load_asset_repo().get_pool()
     conn = None
     cursor = None
     try:
-        conn = psycopg2.connect(get_database_url())
+        conn = pool.getconn()
         cursor = conn.cursor()
 
         # Create test organization
@@ -172,7 +173,7 @@ def setup_test_environment():
 
         conn.commit()
         cursor.close()
-        conn.close()
+        pool.putconn(conn)
 
         print(f"✅ Created test project: {project_id}")
         print(f"✅ Created {len(doc_ids)} test documents")
@@ -181,7 +182,7 @@ def setup_test_environment():
 
     except Exception as e:
         if cursor: cursor.close()
-        if conn: conn.close()
+        if conn: pool.putconn(conn)
         print(f"❌ Failed to setup test environment: {e}")
         raise
 
@@ -530,22 +531,11 @@ def verify_database_results(project_id: str):
     """Verify all assets were persisted successfully"""
     print(f"\n🔍 Verifying database results for project {project_id}...")
 
-    # Import database functions directly to avoid package issues
-    spec = importlib.util.spec_from_file_location("action_graph_repo", "services/langgraph_v10/src/agent/action_graph_repo.py")
-    action_graph_repo = importlib.util.module_from_spec(spec)
-
-    import psycopg2
-    from psycopg2.extras import Json
-    sys.modules['psycopg2'] = psycopg2
-    sys.modules['psycopg2.extras'] = psycopg2.extras
-
-    spec.loader.exec_module(action_graph_repo)
-    get_database_url = action_graph_repo.get_database_url
-
+    pool = load_asset_repo().get_pool()
     conn = None
     cursor = None
     try:
-        conn = psycopg2.connect(get_database_url())
+        conn = pool.getconn()
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -574,33 +564,22 @@ def verify_database_results(project_id: str):
             print(f"⚠️ Only {total_count} assets found, expected at least 7")
 
         cursor.close()
-        conn.close()
+        pool.putconn(conn)
 
     except Exception as e:
         if cursor: cursor.close()
-        if conn: conn.close()
+        if conn: pool.putconn(conn)
         print(f"❌ Database verification failed: {e}")
 
 def cleanup_test_environment(project_id: str, doc_ids: List[str]):
     """Clean up test environment"""
     print("\n🧹 Cleaning up test environment...")
 
-    # Import database functions directly
-    spec = importlib.util.spec_from_file_location("action_graph_repo", "services/langgraph_v10/src/agent/action_graph_repo.py")
-    action_graph_repo = importlib.util.module_from_spec(spec)
-
-    import psycopg2
-    from psycopg2.extras import Json
-    sys.modules['psycopg2'] = psycopg2
-    sys.modules['psycopg2.extras'] = psycopg2.extras
-
-    spec.loader.exec_module(action_graph_repo)
-    get_database_url = action_graph_repo.get_database_url
-
+    pool = load_asset_repo().get_pool()
     conn = None
     cursor = None
     try:
-        conn = psycopg2.connect(get_database_url())
+        conn = pool.getconn()
         cursor = conn.cursor()
 
         # Delete test data
@@ -613,13 +592,13 @@ def cleanup_test_environment(project_id: str, doc_ids: List[str]):
 
         conn.commit()
         cursor.close()
-        conn.close()
+        pool.putconn(conn)
 
         print("✅ Test environment cleanup completed")
 
     except Exception as e:
         if cursor: cursor.close()
-        if conn: conn.close()
+        if conn: pool.putconn(conn)
         print(f"⚠️ Cleanup failed: {e}")
 
 def main():
@@ -650,5 +629,8 @@ def main():
         import traceback
         traceback.print_exc()
 
+    print(f"\n🔌 Connection pool: {load_asset_repo().pool_stats()}")
+    load_asset_repo().close_pool()
+
 if __name__ == "__main__":
     main()